@@ -0,0 +1,56 @@
+"""
+Runs the benchmark suite, and either saves its timings as the baseline or fails on any
+benchmark slower than its baseline by more than the threshold.
+
+    python -m benchmarks [--save | --compare] [--threshold 0.25] [--noise-floor-us 20]
+        [--max-rows 100000] [--filter hasher]
+"""
+import argparse
+import sys
+from pathlib import Path
+
+from benchmarks.harness import compare, load_baseline, save_baseline
+from benchmarks.suite import run
+
+BASELINE_FILE = Path(__file__).parent / "baselines.json"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--save", action="store_true", help="store the timings as the baseline")
+    mode.add_argument("--compare", action="store_true", help="fail on regressions from baseline")
+    parser.add_argument("--baseline", default=str(BASELINE_FILE), help="baseline json file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="tolerated slowdown ratio")
+    parser.add_argument(
+        "--noise-floor-us", type=float, default=20, help="tolerated slowdown in microseconds"
+    )
+    parser.add_argument(
+        "--max-rows", type=int, default=10**5, help="largest table size, up to 10**7"
+    )
+    parser.add_argument("--filter", default="", help="only benchmarks named with this")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.baseline)
+    if args.compare and baseline is None:
+        sys.exit(f"No baseline at {args.baseline}, run with --save first")
+
+    results = run(args.max_rows, args.filter)
+
+    if args.save:
+        save_baseline(args.baseline, {**(baseline or {}), **results})
+        print(f"Saved {len(results)} timings to {args.baseline}")
+    elif args.compare:
+        regressions = compare(baseline, results, args.threshold, args.noise_floor_us / 1e6)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression.name}: {regression.baseline_secs * 1e6:.2f} us -> "
+                f"{regression.current_secs * 1e6:.2f} us ({regression.ratio:.2f}x)"
+            )
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
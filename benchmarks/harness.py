@@ -0,0 +1,95 @@
+"""
+Timing, baselines and regression checks for the benchmark suite.
+"""
+import asyncio
+import json
+import platform
+import statistics
+import time
+import timeit
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Text
+
+MIN_TIMING_SECS = 0.2
+REPEAT = 5
+ASYNC_REPEAT = 15
+
+
+def measure(op: Callable[[], object]) -> float:
+    """The best of a few timings of `op`, in seconds per call, each timing long enough to count."""
+    timer = timeit.Timer(op)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=REPEAT, number=number)) / number
+
+
+def measure_async(op: Callable[[], Awaitable[object]]) -> float:
+    """
+    As `measure`, for a coroutine function, awaited back to back within a single loop. Hops onto
+    threads vary a lot from one timing to the next, so it takes the median of more timings.
+    """
+
+    async def timed(number: int) -> float:
+        started_at = time.perf_counter()
+        for _ in range(number):
+            await op()
+        return time.perf_counter() - started_at
+
+    async def median() -> float:
+        number = 1
+        while await timed(number) < MIN_TIMING_SECS:
+            number *= 2
+        return statistics.median([await timed(number) for _ in range(ASYNC_REPEAT)]) / number
+
+    return asyncio.run(median())
+
+
+@dataclass(frozen=True)
+class Regression:
+    name: Text
+    baseline_secs: float
+    current_secs: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current_secs / self.baseline_secs
+
+
+def compare(
+    baseline: Dict[Text, float],
+    current: Dict[Text, float],
+    threshold: float,
+    noise_floor_secs: float = 0.0,
+) -> List[Regression]:
+    """
+    The benchmarks of both runs slower now than `threshold` past their baseline, and by more
+    than `noise_floor_secs`, below which timings of a few microseconds swing run to run.
+    """
+    return [
+        Regression(name, baseline[name], current[name])
+        for name in sorted(baseline.keys() & current.keys())
+        if current[name] > baseline[name] * (1 + threshold)
+        and current[name] - baseline[name] > noise_floor_secs
+    ]
+
+
+def save_baseline(path: Text, results: Dict[Text, float]) -> None:
+    with open(path, "w") as f:
+        json.dump(
+            {
+                "machine": platform.platform(),
+                "python": platform.python_version(),
+                "seconds_per_op": results,
+            },
+            f,
+            indent=2,
+            sort_keys=True,
+        )
+        f.write("\n")
+
+
+def load_baseline(path: Text) -> Optional[Dict[Text, float]]:
+    try:
+        with open(path) as f:
+            return json.load(f)["seconds_per_op"]
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,90 @@
+"""
+Times decoding whole TransportApi public journey responses against streaming out just their
+first route, for every recorded response under `tests/fixtures/transportapi`, with every json
+decoder available.
+
+    python -m benchmarks.parse_responses [--number 200]
+"""
+import argparse
+import json
+import timeit
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from contilio.clients.transport_api.client import STREAM_CHUNK_BYTES
+from contilio.clients.transport_api.parsing import JsonDecoder, RoutesExtractor
+
+FIXTURES_DIRECTORY = Path(__file__).parent.parent / "tests" / "fixtures" / "transportapi"
+
+
+def json_decoders() -> Dict[str, JsonDecoder]:
+    decoders: Dict[str, JsonDecoder] = {"json": json.loads}
+    try:
+        import orjson
+
+        decoders["orjson"] = orjson.loads
+    except ImportError:
+        pass
+    return decoders
+
+
+def decode_whole(body: bytes, decoder: JsonDecoder) -> Callable[[], Any]:
+    return lambda: decoder(body)["routes"][0]
+
+
+def stream_first_route(body: bytes, decoder: JsonDecoder) -> Callable[[], Any]:
+    # Chunked ahead of time, so that only the parsing is timed
+    chunks = [
+        body[start:][:STREAM_CHUNK_BYTES] for start in range(0, len(body), STREAM_CHUNK_BYTES)
+    ]
+
+    def parse() -> Any:
+        parser = RoutesExtractor(decoder=decoder)
+        for chunk in chunks:
+            if not parser.feed(chunk):
+                break
+        return parser.result()["routes"][0]
+
+    return parse
+
+
+def run(number: int) -> List[Dict[str, Any]]:
+    results = []
+    for fixture in sorted(FIXTURES_DIRECTORY.glob("public_journey_*.json")):
+        body = fixture.read_bytes()
+        if "routes" not in json.loads(body):
+            continue
+        for decoder_name, decoder in json_decoders().items():
+            timings = {}
+            for method, parse in (
+                ("whole", decode_whole(body, decoder)),
+                ("streamed", stream_first_route(body, decoder)),
+            ):
+                timings[method] = min(timeit.repeat(parse, number=number, repeat=3)) / number
+            results.append(
+                dict(
+                    fixture=fixture.name,
+                    payload_bytes=len(body),
+                    decoder=decoder_name,
+                    whole_us=round(timings["whole"] * 1e6, 1),
+                    streamed_us=round(timings["streamed"] * 1e6, 1),
+                )
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--number", type=int, default=200, help="parses per timing")
+    args = parser.parse_args()
+
+    print(f"{'fixture':<32}{'bytes':>10}{'decoder':>10}{'whole us':>12}{'streamed us':>14}")
+    for result in run(args.number):
+        print(
+            f"{result['fixture']:<32}{result['payload_bytes']:>10}{result['decoder']:>10}"
+            f"{result['whole_us']:>12}{result['streamed_us']:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
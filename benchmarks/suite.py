@@ -0,0 +1,169 @@
+"""
+The tracked benchmarks: route hashing, persistence reads and writes over growing tables,
+dispatch onto the task executor and a journey plan answered wholly from the route cache.
+"""
+import asyncio
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Callable, ContextManager, Dict, Iterator, List, Text, Tuple
+
+import sqlalchemy as sqla
+
+from benchmarks.harness import measure, measure_async
+from contilio.api.service import SCHEMA, get_app
+from contilio.clients.transport_api import AppCreds, TransportApiClient
+from contilio.clients.transport_api.client import AioHttpClient
+from contilio.domain.enums import UKTrainStationCode
+from contilio.journey_planner.model import Base
+from contilio.persistence.in_memory import InMemoryPersistence, InMemoryPersistenceFactory
+from contilio.persistence.journey_planner import JourneyPlannerPersistence
+from contilio.persistence.protocol import Persistence, RouteRecord
+from contilio.task_executor.executor import get_task_executor, make_awaitable
+from contilio.utils.hasher import generate_hash
+
+ROUTE_LENGTHS = (2, 5, 10, 50)
+TABLE_SIZES = (10**3, 10**4, 10**5, 10**6, 10**7)
+DISTINCT_HASHES = 1000
+WRITE_BATCH = 10_000
+
+service_day = datetime(2030, 1, 7)
+STATIONS = list(UKTrainStationCode)
+
+Benchmark = Tuple[Text, Callable[[], float]]
+
+
+def hasher_benchmarks() -> Iterator[Benchmark]:
+    for length in ROUTE_LENGTHS:
+        route = STATIONS[:length]
+        yield f"hasher.generate_hash[stations={length}]", lambda route=route: measure(
+            lambda: generate_hash(route)
+        )
+
+
+def _fill(persistence: Persistence, rows: int) -> List[Text]:
+    """Writes `rows` routes over a day, spread over a thousand hashes, in batches."""
+    hashes = [generate_hash([STATIONS[i], STATIONS[i + 1]]) for i in range(DISTINCT_HASHES)]
+    for batch_start in range(0, rows, WRITE_BATCH):
+        persistence.write_routes(
+            [
+                RouteRecord(
+                    hashed=hashes[row % DISTINCT_HASHES],
+                    departure_at=service_day + timedelta(seconds=row * 86_400 // rows),
+                    arrival_at=service_day + timedelta(seconds=row * 86_400 // rows + 900),
+                )
+                for row in range(batch_start, min(batch_start + WRITE_BATCH, rows))
+            ]
+        )
+    return hashes
+
+
+def _persistence_benchmarks(
+    name: Text, create: Callable[[], ContextManager[Persistence]], rows: int
+) -> Iterator[Benchmark]:
+    def read_route() -> float:
+        with create() as persistence:
+            hashes = _fill(persistence, rows)
+            noon = service_day + timedelta(hours=12)
+            return measure(lambda: persistence.read_route(hashes[rows // 2 % len(hashes)], noon))
+
+    def write_route() -> float:
+        with create() as persistence:
+            _fill(persistence, rows)
+            arrival_at = service_day + timedelta(hours=1)
+            return measure(lambda: persistence.write_route("benchmark", service_day, arrival_at))
+
+    yield f"{name}.read_route[rows={rows}]", read_route
+    yield f"{name}.write_route[rows={rows}]", write_route
+
+
+@contextmanager
+def _in_memory_persistence() -> Iterator[Persistence]:
+    yield InMemoryPersistence()
+
+
+@contextmanager
+def _journey_planner_persistence() -> Iterator[Persistence]:
+    with tempfile.TemporaryDirectory(prefix="contilio-benchmarks-") as directory:
+        engine = sqla.create_engine(f"sqlite:///{directory}/journey_planner.db")
+        Base.metadata.create_all(engine)
+        try:
+            yield JourneyPlannerPersistence(engine)
+        finally:
+            engine.dispose()
+
+
+def persistence_benchmarks(max_rows: int) -> Iterator[Benchmark]:
+    for rows in (size for size in TABLE_SIZES if size <= max_rows):
+        yield from _persistence_benchmarks("in_memory", _in_memory_persistence, rows)
+        yield from _persistence_benchmarks("journey_planner", _journey_planner_persistence, rows)
+
+
+def task_executor_benchmarks() -> Iterator[Benchmark]:
+    def dispatch() -> float:
+        with get_task_executor() as task_executor:
+            app = SimpleNamespace(extra={"task_executor": task_executor})
+            info = SimpleNamespace(context={"request": SimpleNamespace(app=app)})
+
+            async def run() -> None:
+                await make_awaitable(info)(lambda: None)
+
+            return measure_async(run)
+
+    yield "task_executor.make_awaitable", dispatch
+
+
+def resolver_benchmarks() -> Iterator[Benchmark]:
+    def cached_journey_plan() -> float:
+        route = [UKTrainStationCode.LBG, UKTrainStationCode.SAJ, UKTrainStationCode.ABW]
+        persistence_factory = InMemoryPersistenceFactory()
+        persistence = persistence_factory.create()
+        departure_at = service_day + timedelta(hours=9, minutes=5)
+        for sub_route in (route[:2], route[1:], route):
+            persistence.write_route(
+                generate_hash(sub_route), departure_at, departure_at + timedelta(minutes=30)
+            )
+
+        query = (
+            f"{{ journeyPlan(userInput: {{ routeCrsIds: [{', '.join(s.name for s in route)}], "
+            f'datetimeOfInterest: "{service_day:%Y-%m-%d} 09:00" }}) {{ arrivalTime }} }}'
+        )
+        with get_task_executor() as task_executor:
+            app = get_app(
+                persistence_factory=persistence_factory,
+                # Never called, as every leg is cached
+                transportapi_client=TransportApiClient(
+                    AppCreds("benchmark", "benchmark"),
+                    AioHttpClient(),
+                    base_url="http://0.0.0.0:9",
+                ),
+                task_executor=task_executor,
+            )
+            context = {"request": SimpleNamespace(app=app)}
+
+            async def run() -> None:
+                result = await SCHEMA.execute(query, context_value=context)
+                assert not result.errors, result.errors
+
+            return measure_async(run)
+
+    yield "resolver.journey_plan[cached,stations=3]", cached_journey_plan
+
+
+def all_benchmarks(max_rows: int) -> Iterator[Benchmark]:
+    yield from hasher_benchmarks()
+    yield from persistence_benchmarks(max_rows)
+    yield from task_executor_benchmarks()
+    yield from resolver_benchmarks()
+
+
+def run(max_rows: int, name_filter: Text = "") -> Dict[Text, float]:
+    results = {}
+    for name, benchmark in all_benchmarks(max_rows):
+        if name_filter in name:
+            results[name] = benchmark()
+            print(f"{name:<56}{results[name] * 1e6:>14.2f} us", flush=True)
+    # The thread pools are gone, but the default loop of the main thread is not
+    asyncio.set_event_loop(asyncio.new_event_loop())
+    return results
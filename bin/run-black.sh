@@ -1,2 +1,2 @@
 #!/usr/bin/env bash
-poetry run black src tests
+poetry run black src tests benchmarks
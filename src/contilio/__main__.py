@@ -20,6 +20,11 @@ def main(
     if initialise_journey_planner_db:
         logger.info("Initialising Journey Planner database...")
         persistence.init_service(env, env.JP_RUN_ALEMBIC_MIGRATIONS)
+    if env.NUM_UVICORN_WORKERS > 1:
+        logger.warning(
+            "Each of the %s workers answers /metrics with its own metrics only",
+            env.NUM_UVICORN_WORKERS,
+        )
     uvicorn.run(
         "contilio.__main__:app",
         host="0.0.0.0",
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Text
+from urllib.parse import parse_qs
+
+logger = getLogger(__name__)
+
+Scope = Dict[Text, Any]
+Message = Dict[Text, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+@dataclass(frozen=True)
+class CapturedOperation:
+    at: float
+    query: Text
+    variables: Optional[Dict[Text, Any]] = None
+    operation_name: Optional[Text] = None
+
+
+def _query_id(query: Text) -> Text:
+    return hashlib.sha1(query.encode()).hexdigest()[:16]
+
+
+class TrafficRecorder:
+    """
+    Appends the graphql operations received to a json lines file, each query text written only
+    the first time it is seen and then referred to by its hash.
+
+    Every line goes out in a single append, so the workers of the service can all record to
+    the same file without their lines interleaving.
+    """
+
+    def __init__(self, path: Text, clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self.clock = clock
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._written_queries: Set[Text] = set()
+        self._lock = threading.Lock()
+
+    def record(
+        self,
+        query: Text,
+        variables: Optional[Dict[Text, Any]] = None,
+        operation_name: Optional[Text] = None,
+        at: Optional[float] = None,
+    ) -> None:
+        query_id = _query_id(query)
+        operation: Dict[Text, Any] = {
+            "at": round(self.clock() if at is None else at, 6),
+            "query_id": query_id,
+        }
+        if variables:
+            operation["variables"] = variables
+        if operation_name:
+            operation["operation_name"] = operation_name
+
+        lines = ""
+        with self._lock:
+            if query_id not in self._written_queries:
+                self._written_queries.add(query_id)
+                lines += _dumps({"query_id": query_id, "query": query})
+            os.write(self._fd, (lines + _dumps(operation)).encode())
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+def _dumps(line: Dict[Text, Any]) -> Text:
+    return json.dumps(line, separators=(",", ":")) + "\n"
+
+
+def read_capture(path: Text) -> List[CapturedOperation]:
+    """The operations of a capture file, in the order they were received."""
+    queries: Dict[Text, Text] = {}
+    operations: List[CapturedOperation] = []
+    with open(path) as f:
+        for line in f:
+            entry = json.loads(line)
+            if "query" in entry:
+                queries[entry["query_id"]] = entry["query"]
+                continue
+            operations.append(
+                CapturedOperation(
+                    at=entry["at"],
+                    query=queries[entry["query_id"]],
+                    variables=entry.get("variables"),
+                    operation_name=entry.get("operation_name"),
+                )
+            )
+    # Workers append as they go, so lines of one may land ahead of an earlier request's
+    return sorted(operations, key=lambda operation: operation.at)
+
+
+class CaptureMiddleware:
+    """Records every graphql operation sent to `path`, passing requests on untouched."""
+
+    def __init__(self, app: ASGIApp, recorder: TrafficRecorder, path: Text = "/graphql") -> None:
+        self.app = app
+        self.recorder = recorder
+        self.path = path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].rstrip("/") != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        at = self.recorder.clock()
+        if scope["method"] == "GET":
+            params = {
+                key: values[0]
+                for key, values in parse_qs(scope.get("query_string", b"").decode()).items()
+            }
+            self._record(params, at, variables_encoded=True)
+            await self.app(scope, receive, send)
+            return
+
+        messages: List[Message] = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            messages.append(message)
+            more_body = message["type"] == "http.request" and message.get("more_body", False)
+
+        try:
+            payload = json.loads(b"".join(m.get("body", b"") for m in messages))
+        except ValueError:
+            payload = None
+        for operation in payload if isinstance(payload, list) else [payload]:
+            if isinstance(operation, dict):
+                self._record(operation, at)
+
+        async def replay_receive() -> Message:
+            return messages.pop(0) if messages else await receive()
+
+        await self.app(scope, replay_receive, send)
+
+    def _record(
+        self, operation: Dict[Text, Any], at: float, variables_encoded: bool = False
+    ) -> None:
+        query = operation.get("query")
+        if not isinstance(query, str):
+            return
+        variables = operation.get("variables")
+        try:
+            if variables_encoded and variables:
+                variables = json.loads(variables)
+            self.recorder.record(query, variables, operation.get("operationName"), at=at)
+        except (ValueError, TypeError, OSError) as e:
+            logger.warning("Could not capture graphql operation: %s", e)
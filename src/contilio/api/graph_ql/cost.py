@@ -0,0 +1,16 @@
+from typing import Any, Dict, Text
+
+from strawberry.extensions import SchemaExtension
+
+from contilio.metrics import current_request_cost
+
+
+class RequestCostExtension(SchemaExtension):
+    """
+    Reports the cost of the request in the `cost` extension of the response, as far as it was
+    measured by then, when measured at all, see `ServerTimingMiddleware`.
+    """
+
+    def get_results(self) -> Dict[Text, Any]:
+        cost = current_request_cost()
+        return {"cost": cost.to_dict()} if cost is not None else {}
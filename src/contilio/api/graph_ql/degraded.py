@@ -0,0 +1,141 @@
+import asyncio
+from datetime import datetime, timedelta
+from logging import getLogger
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+from strawberry.types import Info as GraphQLResolveInfo
+
+from contilio.clients.transport_api import TrainRoutePlan
+from contilio.clients.transport_api.client import TransportApiClientException
+from contilio.domain.enums import UKTrainStationCode
+from contilio.persistence.protocol import Persistence, Route
+from contilio.utils.hasher import generate_hash
+
+logger = getLogger(__name__)
+
+ESTIMATE_LOOKBACK_IN_DAYS = 7
+
+# Keeps the upstream requests, and cache writes, carrying on in the background referenced
+_background_fetches: Set["asyncio.Future[Any]"] = set()
+
+
+def leg_deadline_from_request_context(info: GraphQLResolveInfo) -> Optional[float]:
+    if not info.context:
+        raise ValueError("Context needs to be present")
+    return info.context["request"].app.extra.get("leg_deadline_secs")
+
+
+class DegradedMode:
+    """
+    Bounds how long a leg waits on upstream, answering with an estimate past the deadline.
+
+    Timetables repeat from one day to the next, so the estimate is preferably the nearest
+    departure cached within the last week at the same time of day. Failing that, it is made up
+    from the leg statistics: half a headway of waiting, then the median duration. Either way the
+    upstream request carries on in the background and caches the real departure once it lands.
+    With no deadline configured, or nothing to estimate from, upstream is simply awaited.
+    """
+
+    def __init__(
+        self,
+        concurrently: Callable[[Callable[[], Any]], Awaitable[Any]],
+        persistence: Persistence,
+        deadline_secs: Optional[float],
+        max_wait: timedelta,
+    ) -> None:
+        self._concurrently = concurrently
+        self._persistence = persistence
+        self._deadline_secs = deadline_secs
+        self._max_wait = max_wait
+
+    async def get_train_route_plan(
+        self,
+        fetch: Awaitable[TrainRoutePlan],
+        point_a: UKTrainStationCode,
+        point_b: UKTrainStationCode,
+        datetime_of_interest: datetime,
+    ) -> TrainRoutePlan:
+        if self._deadline_secs is None:
+            return await fetch
+
+        task = asyncio.ensure_future(fetch)
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self._deadline_secs)
+        except TransportApiClientException:
+            raise
+        except Exception as e:
+            logger.warning(
+                "Leg from %s to %s not resolved in time, estimating: %r", point_a, point_b, e
+            )
+
+        estimate = await self._concurrently(
+            lambda: self._estimate(point_a, point_b, datetime_of_interest)
+        )
+        if estimate is None:
+            return await task
+
+        _background_fetches.add(task)
+        task.add_done_callback(lambda t: self._cache_late_route_plan(t, point_a, point_b))
+        return estimate
+
+    def _estimate(
+        self,
+        point_a: UKTrainStationCode,
+        point_b: UKTrainStationCode,
+        datetime_of_interest: datetime,
+    ) -> Optional[TrainRoutePlan]:
+        history: List[Route] = self._persistence.read_routes(
+            generate_hash([point_a, point_b]),
+            datetime_of_interest - timedelta(days=ESTIMATE_LOOKBACK_IN_DAYS),
+            datetime_of_interest,
+        )
+        nearest: Optional[Route] = None
+        nearest_wait = self._max_wait
+        for leg in history:
+            # The same time of day on the first day no earlier than the time of interest
+            days_back = -((leg.departure_at - datetime_of_interest) // timedelta(days=1))
+            wait = leg.departure_at + timedelta(days=days_back) - datetime_of_interest
+            if timedelta(0) <= wait <= nearest_wait:
+                nearest, nearest_wait = leg, wait
+        if nearest:
+            departure_at = datetime_of_interest + nearest_wait
+            return TrainRoutePlan(
+                departure_at=departure_at,
+                arrival_at=departure_at + (nearest.arrival_at - nearest.departure_at),
+                estimated=True,
+            )
+
+        statistics = self._persistence.read_leg_statistics(point_a.name, point_b.name)
+        if not statistics or not statistics.count:
+            return None
+        headway = statistics.headway_in_minutes(datetime_of_interest.hour) or 0
+        departure_at = datetime_of_interest + timedelta(minutes=headway / 2)
+        return TrainRoutePlan(
+            departure_at=departure_at,
+            arrival_at=departure_at + timedelta(minutes=statistics.duration_quantile(0.5)),
+            estimated=True,
+        )
+
+    def _cache_late_route_plan(
+        self,
+        task: "asyncio.Task[TrainRoutePlan]",
+        point_a: UKTrainStationCode,
+        point_b: UKTrainStationCode,
+    ) -> None:
+        _background_fetches.discard(task)
+        if task.cancelled() or task.exception():
+            return
+        route_plan = task.result()
+        write = asyncio.ensure_future(
+            self._concurrently(
+                lambda: self._persistence.write_route(
+                    route_hash=generate_hash([point_a, point_b]),
+                    departure_at=route_plan.departure_at,
+                    arrival_at=route_plan.arrival_at,
+                    origin_crs=point_a.name,
+                    destination_crs=point_b.name,
+                )
+            )
+        )
+        _background_fetches.add(write)
+        write.add_done_callback(_background_fetches.discard)
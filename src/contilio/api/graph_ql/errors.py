@@ -20,3 +20,43 @@ class NotThatPatientError(Exception):
     """
 
     pass
+
+
+class SameOriginAndDestinationError(Exception):
+    """
+    Raised when the origin and destination of a journey queried are the same station.
+    """
+
+    pass
+
+
+class NoCachedJourneyError(Exception):
+    """
+    Raised when the cached timetable holds no journey between the stations queried.
+    """
+
+    pass
+
+
+class StationSetSizeError(Exception):
+    """
+    Raised when the set of stations queried for an arrival matrix is too small or too large.
+    """
+
+    pass
+
+
+class TimeBudgetError(Exception):
+    """
+    Raised when the time budget queried is not positive or goes past the timetable horizon.
+    """
+
+    pass
+
+
+class DepartureWindowError(Exception):
+    """
+    Raised when the departure window queried is empty or goes past the timetable horizon.
+    """
+
+    pass
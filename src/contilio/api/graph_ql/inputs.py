@@ -14,3 +14,52 @@ class RoutesInput:
     datetime_of_interest: datetime = strawberry.field(
         description="Starting date and time to look for departures given a specific route."
     )
+
+
+@strawberry.input
+class OriginDestinationInput:
+    origin_crs_id: UKTrainStationCode = strawberry.field(
+        description="Unique 3 letter code UK train station crs identifier to start the journey at"
+    )
+    destination_crs_id: UKTrainStationCode = strawberry.field(
+        description="Unique 3 letter code UK train station crs identifier to end the journey at"
+    )
+    datetime_of_interest: datetime = strawberry.field(
+        description="Starting date and time to look for departures from the origin station."
+    )
+
+
+@strawberry.input
+class StationSetInput:
+    crs_ids: List[UKTrainStationCode] = strawberry.field(
+        description="Unique 3 letter code UK train station crs identifiers to pair up"
+    )
+    datetime_of_interest: datetime = strawberry.field(
+        description="Date and time to look for departures from every station in the set."
+    )
+
+
+@strawberry.input
+class IsochroneInput:
+    crs_id: UKTrainStationCode = strawberry.field(
+        description="Unique 3 letter code UK train station crs identifier to start from"
+    )
+    datetime_of_interest: datetime = strawberry.field(
+        description="Starting date and time to look for departures from the station."
+    )
+    time_budget_in_minutes: int = strawberry.field(
+        description="How long the traveller is willing to spend getting to the stations"
+    )
+
+
+@strawberry.input
+class RouteWindowInput:
+    route_crs_ids: List[UKTrainStationCode] = strawberry.field(
+        description="Unique 3 letter code UK train station crs identifiers defining the route"
+    )
+    departure_from: datetime = strawberry.field(
+        description="Earliest date and time to leave the first station of the route."
+    )
+    departure_until: datetime = strawberry.field(
+        description="Date and time by which to have left the first station of the route."
+    )
@@ -0,0 +1,61 @@
+import time
+from inspect import isawaitable
+from typing import Any, Callable
+
+from strawberry.extensions import SchemaExtension
+from graphql import GraphQLResolveInfo
+
+from contilio.metrics import REGISTRY
+
+RESOLVER_SECONDS = REGISTRY.histogram(
+    "graphql_resolver_seconds",
+    "Time taken resolving top level graphql fields, by field and outcome",
+    ["field", "outcome"],
+)
+ROUTE_CACHE_LOOKUPS = REGISTRY.counter(
+    "route_cache_lookups_total",
+    "Route cache lookups of journey plans, of whole prefixes of the route or single legs",
+    ["kind", "result"],
+)
+JOURNEY_PLAN_LEGS = REGISTRY.histogram(
+    "journey_plan_legs",
+    "Legs of the routes journey plans are asked for",
+    buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15, 20),
+)
+
+
+class ResolverMetrics(SchemaExtension):
+    """Times the resolvers of top level fields, such as `journeyPlan`, leaving out the rest."""
+
+    def resolve(
+        self, _next: Callable, root: Any, info: GraphQLResolveInfo, *args: Any, **kwargs: Any
+    ) -> Any:
+        if info.path.prev is not None:
+            return _next(root, info, *args, **kwargs)
+
+        started_at = time.perf_counter()
+
+        def observe(outcome: str) -> None:
+            RESOLVER_SECONDS.observe(
+                time.perf_counter() - started_at, field=info.field_name, outcome=outcome
+            )
+
+        try:
+            result = _next(root, info, *args, **kwargs)
+        except Exception:
+            observe("error")
+            raise
+        if not isawaitable(result):
+            observe("ok")
+            return result
+
+        async def timed() -> Any:
+            try:
+                resolved = await result
+            except Exception:
+                observe("error")
+                raise
+            observe("ok")
+            return resolved
+
+        return timed()
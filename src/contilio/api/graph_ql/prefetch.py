@@ -0,0 +1,159 @@
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from logging import getLogger
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from strawberry.types import Info as GraphQLResolveInfo
+
+from contilio.clients.transport_api import Priority, TrainRoutePlan, TransportApiClient
+from contilio.domain.enums import UKTrainStationCode
+from contilio.persistence.protocol import Persistence
+from contilio.utils.hasher import generate_hash
+
+logger = getLogger(__name__)
+
+# Low enough for predictions to rarely overshoot the real arrival
+PREDICTION_QUANTILE = 0.1
+
+
+def speculative_prefetch_from_request_context(info: GraphQLResolveInfo) -> bool:
+    if not info.context:
+        raise ValueError("Context needs to be present")
+    return bool(info.context["request"].app.extra.get("speculative_prefetch"))
+
+
+@dataclass
+class LegPrefetch:
+    predicted_datetime_of_interest: datetime
+    task: "asyncio.Task[TrainRoutePlan]"
+
+    def is_valid_for(self, route_plan: TrainRoutePlan, datetime_of_interest: datetime) -> bool:
+        """
+        The prefetched departure is the one `datetime_of_interest` would have got, as long as
+        the prediction was not later than it and the departure is not earlier than it.
+        """
+        return (
+            self.predicted_datetime_of_interest.timestamp()
+            <= datetime_of_interest.timestamp()
+            <= route_plan.departure_at.timestamp()
+        )
+
+
+def _swallow_exception(task: "asyncio.Task[Any]") -> None:
+    if not task.cancelled() and task.exception():
+        logger.debug("Speculative prefetch failed: %s", task.exception())
+
+
+async def _not_cached() -> None:
+    return None
+
+
+class SpeculativePrefetcher:
+    """
+    Fires the upstream requests for all legs of a route at once, rather than one leg at a time.
+
+    The time of interest of every leg is predicted by adding up the low quantile durations, out of
+    the leg statistics, of the legs before it. Once the real arrival at a station is known, the
+    prefetched departure is used if still valid, otherwise that leg alone is fetched again.
+    Without a prefetch for a leg, it falls back to a plain upstream request.
+    """
+
+    def __init__(
+        self,
+        concurrently: Callable[[Callable[[], Any]], Awaitable[Any]],
+        persistence: Persistence,
+        transportapi_client: TransportApiClient,
+    ) -> None:
+        self._concurrently = concurrently
+        self._persistence = persistence
+        self._transportapi_client = transportapi_client
+        self._prefetches: Dict[int, LegPrefetch] = {}
+
+    def _predicted_duration(
+        self, point_a: UKTrainStationCode, point_b: UKTrainStationCode
+    ) -> Optional[timedelta]:
+        statistics = self._persistence.read_leg_statistics(point_a.name, point_b.name)
+        minutes = statistics.duration_quantile(PREDICTION_QUANTILE) if statistics else None
+        # Upstream only deals in whole minutes
+        return None if minutes is None else timedelta(minutes=round(minutes))
+
+    async def start(
+        self, station_crs_codes: List[UKTrainStationCode], datetime_of_interest: datetime
+    ) -> None:
+        legs = list(zip(station_crs_codes, station_crs_codes[1:]))
+        leg_hashes = [generate_hash([point_a, point_b]) for point_a, point_b in legs]
+        durations = [self._predicted_duration(point_a, point_b) for point_a, point_b in legs]
+
+        predictions = [datetime_of_interest]
+        for duration in durations[:-1]:
+            if duration is None:
+                break
+            predictions.append(predictions[-1] + duration)
+
+        cached_legs = await asyncio.gather(
+            *[
+                self._concurrently(
+                    lambda leg_hash=leg_hash, prediction=prediction: self._persistence.read_route(
+                        route_hash=leg_hash, datetime_of_interest=prediction
+                    )
+                )
+                if self._persistence.might_contain_route(leg_hash)
+                else _not_cached()
+                for leg_hash, prediction in zip(leg_hashes, predictions)
+            ]
+        )
+
+        for i, (prediction, cached_leg) in enumerate(zip(predictions, cached_legs)):
+            if cached_leg:
+                continue
+            point_a, point_b = legs[i]
+            task = asyncio.create_task(
+                self._transportapi_client.get_train_route_plan(
+                    point_a.name,
+                    point_b.name,
+                    datetime_of_interest=prediction,
+                    priority=Priority.PREFETCH,
+                )
+            )
+            task.add_done_callback(_swallow_exception)
+            self._prefetches[i] = LegPrefetch(predicted_datetime_of_interest=prediction, task=task)
+
+    async def get_train_route_plan(
+        self,
+        leg_index: int,
+        point_a: UKTrainStationCode,
+        point_b: UKTrainStationCode,
+        datetime_of_interest: datetime,
+    ) -> TrainRoutePlan:
+        prefetch = self._prefetches.pop(leg_index, None)
+        if prefetch:
+            try:
+                route_plan = await prefetch.task
+            except Exception:
+                route_plan = None
+
+            if route_plan and prefetch.is_valid_for(route_plan, datetime_of_interest):
+                return route_plan
+
+            if route_plan:
+                # Mispredicted, but still a real departure worth caching
+                await self._concurrently(
+                    lambda: self._persistence.write_route(
+                        route_hash=generate_hash([point_a, point_b]),
+                        departure_at=route_plan.departure_at,
+                        arrival_at=route_plan.arrival_at,
+                        origin_crs=point_a.name,
+                        destination_crs=point_b.name,
+                    )
+                )
+
+        return await self._transportapi_client.get_train_route_plan(
+            point_a.name, point_b.name, datetime_of_interest=datetime_of_interest
+        )
+
+    def cancel(self) -> None:
+        """Cancels the prefetches of legs resolved from the cache, or never reached as one failed."""
+        for prefetch in self._prefetches.values():
+            prefetch.task.cancel()
+        self._prefetches.clear()
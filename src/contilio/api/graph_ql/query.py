@@ -1,18 +1,45 @@
 import strawberry
 from logging import getLogger
+from typing import Any, Awaitable, Callable, List, Optional
 
 from datetime import datetime, timedelta
 from dateutil import tz
 
 from contilio.persistence import persistence_from_request_context
-from contilio.task_executor.executor import make_awaitable
+from contilio.task_executor.executor import make_awaitable, routing_executor_from_request_context
 from contilio.api.graph_ql import errors
-from contilio.api.graph_ql.inputs import RoutesInput
+from contilio.api.graph_ql.degraded import DegradedMode, leg_deadline_from_request_context
+from contilio.api.graph_ql.metrics import JOURNEY_PLAN_LEGS, ROUTE_CACHE_LOOKUPS
+from contilio.metrics import current_request_cost
+from contilio.api.graph_ql.prefetch import (
+    SpeculativePrefetcher,
+    speculative_prefetch_from_request_context,
+)
+from contilio.api.graph_ql.inputs import (
+    IsochroneInput,
+    OriginDestinationInput,
+    RoutesInput,
+    RouteWindowInput,
+    StationSetInput,
+)
 from contilio.clients.transport_api import (
     transport_api_client_from_request_context,
     TrainRoutePlan,
+    TransportApiClient,
+)
+from contilio.domain.enums import UKTrainStationCode
+from contilio.persistence.protocol import Persistence, Route
+from contilio.routing import (
+    JourneyOption,
+    LegProfile,
+    Timetable,
+    chain_arrivals,
+    earliest_arrival,
+    earliest_arrival_matrix,
+    pareto_options,
+    reachable_within,
 )
-from contilio.persistence.protocol import Route
+from contilio.tracing import TRACER, Span
 from contilio.utils.hasher import generate_hash
 
 from strawberry.types import Info
@@ -21,6 +48,8 @@ logger = getLogger(__name__)
 
 MAX_WAIT_TIME_IN_MINUTES = 60
 DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+TIMETABLE_HORIZON_IN_HOURS = 12
+MAX_MATRIX_STATIONS = 200
 
 
 @strawberry.type
@@ -28,6 +57,49 @@ class RouteResponse:
     arrival_time: str = strawberry.field(
         description="Arrival date time at the destination station"
     )
+    estimated: bool = strawberry.field(
+        default=False,
+        description="Whether upstream was too slow and some legs were estimated from history",
+    )
+
+
+@strawberry.type
+class JourneyResponse:
+    arrival_time: str = strawberry.field(
+        description="Arrival date time at the destination station"
+    )
+    route_crs_ids: List[UKTrainStationCode] = strawberry.field(
+        description="Train stations the journey calls at, from origin to destination"
+    )
+
+
+@strawberry.type
+class ArrivalMatrixResponse:
+    crs_ids: List[UKTrainStationCode] = strawberry.field(
+        description="Train stations labelling both the rows (origins) and columns (destinations)"
+    )
+    departure_time: str = strawberry.field(
+        description="Departure date time the arrival offsets are relative to"
+    )
+    arrival_minutes: List[Optional[int]] = strawberry.field(
+        description="Row-major minutes from departure to arrival, null when there is no journey"
+    )
+
+
+@strawberry.type
+class ReachableStationResponse:
+    crs_id: UKTrainStationCode = strawberry.field(description="Train station reached")
+    arrival_time: str = strawberry.field(description="Earliest arrival date time at the station")
+
+
+@strawberry.type
+class JourneyOptionResponse:
+    departure_time: str = strawberry.field(
+        description="Departure date time from the first station of the route"
+    )
+    arrival_time: str = strawberry.field(
+        description="Arrival date time at the destination station"
+    )
 
 
 @strawberry.type
@@ -46,10 +118,16 @@ class Query:
 
         If the route does exist in the db, the function uses the existing route data. If the route does
         not exist, the function uses the transport API client to get the route plan between these
-        two stations, writes both that route and the current sub route to persistence.
+        two stations, writes both that route and the current sub route to persistence. Routes in the
+        db departing later than the maximum wait are looked up upstream all the same.
 
         This process repeats until the function iterates over all station pairs.
 
+        With speculative prefetching on, the upstream requests of all legs are fired up front at
+        predicted times of interest, see `SpeculativePrefetcher`. With a leg deadline set, legs
+        upstream is too slow for are estimated instead, see `DegradedMode`. Estimated legs, and
+        sub routes built on them, are not written to persistence.
+
         At the end, it returns the arrival time at the final station as a RouteResponse.
         """
         concurrently = make_awaitable(info)
@@ -59,73 +137,400 @@ class Query:
         _validate_input(user_input)
 
         station_crs_codes = user_input.route_crs_ids
+        JOURNEY_PLAN_LEGS.observe(len(station_crs_codes) - 1)
+
+        prefetcher = SpeculativePrefetcher(concurrently, persistence, transportapi_client)
+        if speculative_prefetch_from_request_context(info):
+            await prefetcher.start(station_crs_codes, user_input.datetime_of_interest)
+        degraded_mode = DegradedMode(
+            concurrently,
+            persistence,
+            deadline_secs=leg_deadline_from_request_context(info),
+            max_wait=timedelta(minutes=MAX_WAIT_TIME_IN_MINUTES),
+        )
+        estimated = False
 
         departure_times = {}
         current_datetime_of_interest = user_input.datetime_of_interest
         sub_route = [station_crs_codes[0]]
-        for i in range(len(station_crs_codes) - 1):
-            point_a = station_crs_codes[i]
-            point_b = station_crs_codes[i + 1]
-            sub_route.append(point_b)
+        try:
+            for i in range(len(station_crs_codes) - 1):
+                point_a = station_crs_codes[i]
+                point_b = station_crs_codes[i + 1]
+                with TRACER.span(
+                    "journey_plan.leg", leg=i, origin=point_a.name, destination=point_b.name
+                ) as leg_span:
+                    sub_route.append(point_b)
+
+                    a_b_hash = generate_hash([point_a, point_b])
+                    sub_route_hash = generate_hash(sub_route)
+
+                    # Hashes the persistence has certainly never seen skip the round trip to the db
+                    existing_sub_route: Optional[Route] = (
+                        _departing_within_wait(
+                            await concurrently(
+                                lambda: persistence.read_route(
+                                    route_hash=sub_route_hash,
+                                    datetime_of_interest=user_input.datetime_of_interest,
+                                )
+                            ),
+                            user_input.datetime_of_interest,
+                        )
+                        if persistence.might_contain_route(sub_route_hash)
+                        else None
+                    )
 
-            a_b_hash = generate_hash([point_a, point_b])
-            sub_route_hash = generate_hash(sub_route)
+                    previous_arrival_time = current_datetime_of_interest
+                    ROUTE_CACHE_LOOKUPS.inc(
+                        kind="leg" if sub_route_hash == a_b_hash else "prefix",
+                        result="hit" if existing_sub_route else "miss",
+                    )
 
-            existing_sub_route: Route = await concurrently(
-                lambda: persistence.read_route(
-                    route_hash=sub_route_hash, datetime_of_interest=user_input.datetime_of_interest
-                )
+                    if existing_sub_route:
+                        _record_leg_cache(
+                            leg_span,
+                            point_a,
+                            point_b,
+                            "leg_hit" if sub_route_hash == a_b_hash else "prefix_hit",
+                        )
+                        current_datetime_of_interest = existing_sub_route.arrival_at
+                        departure_times[point_a.name] = existing_sub_route.departure_at
+                        _check_waiting_time(previous_arrival_time, existing_sub_route.departure_at)
+                    else:
+                        existing_a_b_route: Optional[Route] = (
+                            _departing_within_wait(
+                                await concurrently(
+                                    lambda: persistence.read_route(
+                                        route_hash=a_b_hash,
+                                        datetime_of_interest=current_datetime_of_interest,
+                                    )
+                                ),
+                                current_datetime_of_interest,
+                            )
+                            if persistence.might_contain_route(a_b_hash)
+                            else None
+                        )
+                        if a_b_hash != sub_route_hash:
+                            ROUTE_CACHE_LOOKUPS.inc(
+                                kind="leg", result="hit" if existing_a_b_route else "miss"
+                            )
+
+                        if existing_a_b_route:
+                            _record_leg_cache(leg_span, point_a, point_b, "leg_hit")
+                            current_datetime_of_interest = existing_a_b_route.arrival_at
+                            departure_times[point_a.name] = existing_a_b_route.departure_at
+                            _check_waiting_time(
+                                previous_arrival_time, existing_a_b_route.departure_at
+                            )
+                        else:
+                            _record_leg_cache(leg_span, point_a, point_b, "miss")
+                            route_plan: TrainRoutePlan = await degraded_mode.get_train_route_plan(
+                                prefetcher.get_train_route_plan(
+                                    i,
+                                    point_a,
+                                    point_b,
+                                    datetime_of_interest=current_datetime_of_interest,
+                                ),
+                                point_a,
+                                point_b,
+                                datetime_of_interest=current_datetime_of_interest,
+                            )
+
+                            _check_waiting_time(previous_arrival_time, route_plan.departure_at)
+
+                            estimated = estimated or route_plan.estimated
+                            if not route_plan.estimated:
+                                await concurrently(
+                                    lambda: persistence.write_route(
+                                        route_hash=a_b_hash,
+                                        departure_at=route_plan.departure_at,
+                                        arrival_at=route_plan.arrival_at,
+                                        origin_crs=point_a.name,
+                                        destination_crs=point_b.name,
+                                    )
+                                )
+
+                            departure_times[point_a.name] = route_plan.departure_at
+
+                            current_datetime_of_interest = route_plan.arrival_at
+
+                        if a_b_hash != sub_route_hash and not estimated:
+                            await concurrently(
+                                lambda: persistence.write_route(
+                                    route_hash=sub_route_hash,
+                                    departure_at=departure_times[station_crs_codes[0].name],
+                                    arrival_at=current_datetime_of_interest,
+                                )
+                            )
+        finally:
+            prefetcher.cancel()
+
+        arrival_time = current_datetime_of_interest.strftime(DATETIME_FORMAT)
+        return RouteResponse(arrival_time=arrival_time, estimated=estimated)
+
+    @strawberry.field
+    async def free_journey_plan(
+        self, user_input: OriginDestinationInput, info: Info
+    ) -> JourneyResponse:
+        """
+        Resolves the earliest arrival between two stations, letting the service pick the changes.
+
+        Only legs already cached by `journey_plan` are considered, so no upstream calls are made.
+        The legs departing within the timetable horizon are loaded in one go and searched with
+        RAPTOR, honouring the same maximum waiting time at every station.
+        """
+        concurrently = make_awaitable(info)
+        persistence = persistence_from_request_context(info)
+
+        _validate_origin_destination_input(user_input)
+
+        departure_from = user_input.datetime_of_interest
+        departure_until = departure_from + timedelta(hours=TIMETABLE_HORIZON_IN_HOURS)
+        legs = await concurrently(lambda: persistence.read_legs(departure_from, departure_until))
+
+        journey = await concurrently(
+            lambda: earliest_arrival(
+                Timetable(legs),
+                origin_crs=user_input.origin_crs_id.name,
+                destination_crs=user_input.destination_crs_id.name,
+                datetime_of_interest=user_input.datetime_of_interest,
+                max_wait=timedelta(minutes=MAX_WAIT_TIME_IN_MINUTES),
+            )
+        )
+        if journey is None:
+            raise errors.NoCachedJourneyError(
+                f"No cached journey from {user_input.origin_crs_id.name} "
+                f"to {user_input.destination_crs_id.name}"
             )
 
-            previous_arrival_time = current_datetime_of_interest
+        return JourneyResponse(
+            arrival_time=journey.arrival_at.strftime(DATETIME_FORMAT),
+            route_crs_ids=[UKTrainStationCode[code] for code in journey.station_crs_codes],
+        )
 
-            if existing_sub_route:
-                current_datetime_of_interest = existing_sub_route.arrival_at
-                departure_times[point_a.name] = existing_sub_route.departure_at
-                _check_waiting_time(previous_arrival_time, existing_sub_route.departure_at)
-            else:
-                existing_a_b_route: Route = await concurrently(
-                    lambda: persistence.read_route(
-                        route_hash=a_b_hash, datetime_of_interest=current_datetime_of_interest
-                    )
-                )
-
-                if existing_a_b_route:
-                    current_datetime_of_interest = existing_a_b_route.arrival_at
-                    departure_times[point_a.name] = existing_a_b_route.departure_at
-                    _check_waiting_time(previous_arrival_time, existing_a_b_route.departure_at)
-                else:
-                    route_plan: TrainRoutePlan = await transportapi_client.get_train_route_plan(
-                        point_a.name,
-                        point_b.name,
-                        datetime_of_interest=current_datetime_of_interest,
-                    )
+    @strawberry.field
+    async def arrival_matrix(
+        self, user_input: StationSetInput, info: Info
+    ) -> ArrivalMatrixResponse:
+        """
+        Resolves the earliest arrival between every pair of the given stations.
 
-                    _check_waiting_time(previous_arrival_time, route_plan.departure_at)
+        Like `free_journey_plan`, only cached legs are searched. One connection scan runs per
+        origin, spread over the routing process pool when the app has one. The matrix is
+        flattened row by row into minute offsets to keep large responses compact.
+        """
+        concurrently = make_awaitable(info)
+        persistence = persistence_from_request_context(info)
+        routing_executor = routing_executor_from_request_context(info)
+
+        _validate_station_set_input(user_input)
+
+        stations = list(dict.fromkeys(user_input.crs_ids))
+        departure_from = user_input.datetime_of_interest
+        departure_until = departure_from + timedelta(hours=TIMETABLE_HORIZON_IN_HOURS)
+        legs = await concurrently(lambda: persistence.read_legs(departure_from, departure_until))
+
+        matrix = await concurrently(
+            lambda: earliest_arrival_matrix(
+                Timetable(legs),
+                station_crs_codes=[station.name for station in stations],
+                departure_at=departure_from,
+                max_wait=timedelta(minutes=MAX_WAIT_TIME_IN_MINUTES),
+                executor=routing_executor,
+            )
+        )
 
-                    await concurrently(
-                        lambda: persistence.write_route(
-                            route_hash=a_b_hash,
-                            departure_at=route_plan.departure_at,
-                            arrival_at=route_plan.arrival_at,
-                        )
-                    )
+        return ArrivalMatrixResponse(
+            crs_ids=stations,
+            departure_time=departure_from.strftime(DATETIME_FORMAT),
+            arrival_minutes=[
+                None if minutes is None else round(minutes) for row in matrix for minutes in row
+            ],
+        )
 
-                    departure_times[point_a.name] = route_plan.departure_at
+    @strawberry.field
+    async def reachable_stations(
+        self, user_input: IsochroneInput, info: Info
+    ) -> List[ReachableStationResponse]:
+        """
+        Resolves every station reachable from the given one within the time budget.
 
-                    current_datetime_of_interest = route_plan.arrival_at
+        A single forward connection scan over the legs cached within the budget answers it,
+        rather than a `journey_plan` call per candidate station.
+        """
+        concurrently = make_awaitable(info)
+        persistence = persistence_from_request_context(info)
 
-                if a_b_hash != sub_route_hash:
-                    await concurrently(
-                        lambda: persistence.write_route(
-                            route_hash=sub_route_hash,
-                            departure_at=departure_times[station_crs_codes[0].name],
-                            arrival_at=route_plan.arrival_at,
-                        )
-                    )
+        _validate_isochrone_input(user_input)
 
-        arrival_time = current_datetime_of_interest.strftime(DATETIME_FORMAT)
-        return RouteResponse(arrival_time=arrival_time)
+        departure_from = user_input.datetime_of_interest
+        budget = timedelta(minutes=user_input.time_budget_in_minutes)
+        legs = await concurrently(
+            lambda: persistence.read_legs(departure_from, departure_from + budget)
+        )
+
+        reachable = await concurrently(
+            lambda: reachable_within(
+                Timetable(legs),
+                origin_crs=user_input.crs_id.name,
+                departure_at=departure_from,
+                budget=budget,
+                max_wait=timedelta(minutes=MAX_WAIT_TIME_IN_MINUTES),
+            )
+        )
+
+        return [
+            ReachableStationResponse(
+                crs_id=UKTrainStationCode[code], arrival_time=arrival_at.strftime(DATETIME_FORMAT)
+            )
+            for code, arrival_at in reachable
+        ]
+
+    @strawberry.field
+    async def journey_profile(
+        self, user_input: RouteWindowInput, info: Info
+    ) -> List[JourneyOptionResponse]:
+        """
+        Resolves every worthwhile journey along the route leaving within the departure window.
+
+        Rather than a `journey_plan` per departure, each leg is looked up once for the whole
+        window: its cached departures are read in one go, and only when they leave gaps longer
+        than the maximum waiting time are the upstream departures paged through and cached.
+        Every departure off the first station is then carried along the route at once, and
+        journeys beaten by a later departure arriving no later are dropped.
+        """
+        concurrently = make_awaitable(info)
+        persistence = persistence_from_request_context(info)
+        transportapi_client = transport_api_client_from_request_context(info)
+
+        _validate_route_window_input(user_input)
+
+        station_crs_codes = user_input.route_crs_ids
+        max_wait = timedelta(minutes=MAX_WAIT_TIME_IN_MINUTES)
+
+        window_from, window_until = user_input.departure_from, user_input.departure_until
+        first_legs: List[Route] = []
+        last_legs: List[Route] = []
+        for i in range(len(station_crs_codes) - 1):
+            leg_profile = await _read_leg_profile(
+                concurrently,
+                persistence,
+                transportapi_client,
+                station_crs_codes[i],
+                station_crs_codes[i + 1],
+                window_from,
+                window_until,
+            )
+
+            if i == 0:
+                first_legs = last_legs = leg_profile.legs
+            else:
+                next_legs = chain_arrivals(last_legs, leg_profile, max_wait)
+                journeys = [
+                    (first, last) for first, last in zip(first_legs, next_legs) if last is not None
+                ]
+                first_legs = [first for first, _ in journeys]
+                last_legs = [last for _, last in journeys]
+
+            if not last_legs:
+                return []
+            window_from = min(leg.arrival_at for leg in last_legs)
+            window_until = max(leg.arrival_at for leg in last_legs) + max_wait
+
+        options = pareto_options(
+            [
+                JourneyOption(departure_at=first.departure_at, arrival_at=last.arrival_at)
+                for first, last in zip(first_legs, last_legs)
+            ]
+        )
+        return [
+            JourneyOptionResponse(
+                departure_time=option.departure_at.strftime(DATETIME_FORMAT),
+                arrival_time=option.arrival_at.strftime(DATETIME_FORMAT),
+            )
+            for option in options
+        ]
+
+
+async def _read_leg_profile(
+    concurrently: Callable[[Callable[[], Any]], Awaitable[Any]],
+    persistence: Persistence,
+    transportapi_client: TransportApiClient,
+    point_a: UKTrainStationCode,
+    point_b: UKTrainStationCode,
+    departure_from: datetime,
+    departure_until: datetime,
+) -> LegProfile:
+    a_b_hash = generate_hash([point_a, point_b])
+    cached_legs: List[Route] = (
+        await concurrently(
+            lambda: persistence.read_routes(a_b_hash, departure_from, departure_until)
+        )
+        if persistence.might_contain_route(a_b_hash)
+        else []
+    )
+
+    leg_profile = LegProfile(cached_legs)
+    if leg_profile.covers(
+        departure_from, departure_until, timedelta(minutes=MAX_WAIT_TIME_IN_MINUTES)
+    ):
+        return leg_profile
+
+    route_plans = await transportapi_client.get_train_route_plans(
+        point_a.name, point_b.name, departure_from, departure_until
+    )
+    cached_departures = {leg.departure_at.timestamp() for leg in cached_legs}
+    new_route_plans = [
+        route_plan
+        for route_plan in route_plans
+        if route_plan.departure_at.timestamp() not in cached_departures
+    ]
+
+    def write_legs() -> List[Route]:
+        return [
+            Route(
+                id=persistence.write_route(
+                    route_hash=a_b_hash,
+                    departure_at=route_plan.departure_at,
+                    arrival_at=route_plan.arrival_at,
+                    origin_crs=point_a.name,
+                    destination_crs=point_b.name,
+                ),
+                hashed=a_b_hash,
+                departure_at=route_plan.departure_at,
+                arrival_at=route_plan.arrival_at,
+                origin_crs=point_a.name,
+                destination_crs=point_b.name,
+            )
+            for route_plan in new_route_plans
+        ]
+
+    new_legs = await concurrently(write_legs)
+    return LegProfile(cached_legs + new_legs)
+
+
+def _record_leg_cache(
+    leg_span: Span, point_a: UKTrainStationCode, point_b: UKTrainStationCode, cache: str
+) -> None:
+    leg_span.set_attribute("cache", cache)
+    cost = current_request_cost()
+    if cost is not None:
+        cost.add_leg(point_a.name, point_b.name, cache)
+
+
+def _departing_within_wait(
+    route: Optional[Route], datetime_of_interest: datetime
+) -> Optional[Route]:
+    """
+    The cached route, unless it departs later than the maximum wait after the time of interest.
+    Only some departures are cached, so an earlier train upstream knows of may well run instead.
+    """
+    if route is None:
+        return None
+    latest_departure = datetime_of_interest + timedelta(minutes=MAX_WAIT_TIME_IN_MINUTES)
+    if route.departure_at.astimezone(tz.tzutc()) > latest_departure.astimezone(tz.tzutc()):
+        return None
+    return route
 
 
 def _check_waiting_time(
@@ -148,3 +553,50 @@ def _validate_input(user_input: RoutesInput) -> None:
 
     if user_input.datetime_of_interest < datetime.now():
         raise errors.DateTimeInThePastError("Date & Time of interest should be in the future.")
+
+
+def _validate_station_set_input(user_input: StationSetInput) -> None:
+    if not 2 <= len(set(user_input.crs_ids)) <= MAX_MATRIX_STATIONS:
+        raise errors.StationSetSizeError(
+            f"Between 2 and {MAX_MATRIX_STATIONS} distinct train station codes are required"
+        )
+
+    if user_input.datetime_of_interest < datetime.now():
+        raise errors.DateTimeInThePastError("Date & Time of interest should be in the future.")
+
+
+def _validate_route_window_input(user_input: RouteWindowInput) -> None:
+    if len(user_input.route_crs_ids) < 2:
+        raise errors.TrainStationCodesLengthError(
+            "At minimum two train station codes are required"
+        )
+
+    window = user_input.departure_until - user_input.departure_from
+    if not timedelta(0) < window <= timedelta(hours=TIMETABLE_HORIZON_IN_HOURS):
+        raise errors.DepartureWindowError(
+            f"Departure window should end after it starts and last at most "
+            f"{TIMETABLE_HORIZON_IN_HOURS} hours"
+        )
+
+    if user_input.departure_from < datetime.now():
+        raise errors.DateTimeInThePastError("Date & Time of interest should be in the future.")
+
+
+def _validate_isochrone_input(user_input: IsochroneInput) -> None:
+    if not 0 < user_input.time_budget_in_minutes <= TIMETABLE_HORIZON_IN_HOURS * 60:
+        raise errors.TimeBudgetError(
+            f"Time budget should be between 1 and {TIMETABLE_HORIZON_IN_HOURS * 60} minutes"
+        )
+
+    if user_input.datetime_of_interest < datetime.now():
+        raise errors.DateTimeInThePastError("Date & Time of interest should be in the future.")
+
+
+def _validate_origin_destination_input(user_input: OriginDestinationInput) -> None:
+    if user_input.origin_crs_id == user_input.destination_crs_id:
+        raise errors.SameOriginAndDestinationError(
+            "Origin and destination train stations should differ"
+        )
+
+    if user_input.datetime_of_interest < datetime.now():
+        raise errors.DateTimeInThePastError("Date & Time of interest should be in the future.")
@@ -0,0 +1,37 @@
+import time
+from inspect import isawaitable
+from typing import Any, Callable
+
+from strawberry.extensions import SchemaExtension
+from graphql import GraphQLResolveInfo
+
+from contilio.tracing import TRACER
+
+
+class ResolverTracing(SchemaExtension):
+    """
+    Traces the resolvers of top level fields, such as `journeyPlan`, as the first span of the
+    request, for the spans of the db reads and upstream calls they make to nest within.
+
+    The span of an async resolver is current for as long as it is awaited. Sync resolvers are
+    only recorded once they return, leaving any spans of theirs to traces of their own.
+    """
+
+    def resolve(
+        self, _next: Callable, root: Any, info: GraphQLResolveInfo, *args: Any, **kwargs: Any
+    ) -> Any:
+        if info.path.prev is not None or TRACER.exporter is None:
+            return _next(root, info, *args, **kwargs)
+
+        name = f"graphql.{info.field_name}"
+        started_at_ns = time.time_ns()
+        result = _next(root, info, *args, **kwargs)
+        if not isawaitable(result):
+            TRACER.record(name, started_at_ns, time.time_ns())
+            return result
+
+        async def traced() -> Any:
+            with TRACER.span(name):
+                return await result
+
+        return traced()
@@ -0,0 +1,57 @@
+import time
+from typing import List, Text
+
+from contilio.api.capture import ASGIApp, Message, Receive, Scope, Send
+from contilio.metrics import RequestCost, measure_request_cost
+
+
+def _duration_ms(secs: float) -> Text:
+    return f"{secs * 1000:.3f}"
+
+
+def server_timing(cost: RequestCost, total_secs: float) -> Text:
+    """The cost of a request as a `Server-Timing` header, its legs in the order planned."""
+    metrics: List[Text] = [
+        f'db;dur={_duration_ms(cost.db_secs)};desc="{cost.db_calls} calls"',
+        f'upstream;dur={_duration_ms(cost.upstream_secs)};desc="{cost.upstream_calls} calls"',
+        f"executor-wait;dur={_duration_ms(cost.executor_wait_secs)}",
+    ]
+    metrics.extend(
+        f'leg-{i};desc="{leg["origin"]}-{leg["destination"]} {leg["cache"]}"'
+        for i, leg in enumerate(cost.legs)
+    )
+    metrics.append(f"total;dur={_duration_ms(total_secs)}")
+    return ", ".join(metrics)
+
+
+class ServerTimingMiddleware:
+    """
+    Measures the cost of every request, see `RequestCost`, and reports it in a `Server-Timing`
+    header, for clients and proxies to tell what a slow request was slow on. Graphql responses
+    also report it in their `cost` extension.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.perf_counter()
+        with measure_request_cost() as cost:
+
+            async def send_with_server_timing(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    header = server_timing(cost, time.perf_counter() - started_at)
+                    message = {
+                        **message,
+                        "headers": [
+                            *message.get("headers", []),
+                            (b"server-timing", header.encode()),
+                        ],
+                    }
+                await send(message)
+
+            await self.app(scope, receive, send_with_server_timing)
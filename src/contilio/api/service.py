@@ -1,19 +1,29 @@
+import asyncio
 import logging
 
 from concurrent.futures._base import Executor
-from typing import Optional
+from typing import List, Optional, Text
 
 from contilio.clients.transport_api import TransportApiClient
+from contilio.jobs import TimetableSweeper
 from contilio.persistence.protocol import PersistenceFactory
 from fastapi.applications import FastAPI
+from fastapi.responses import PlainTextResponse
 from strawberry import Schema
 from strawberry.fastapi import GraphQLRouter
 
 
+from contilio.api.capture import CaptureMiddleware, TrafficRecorder
+from contilio.api.graph_ql.cost import RequestCostExtension
+from contilio.api.graph_ql.metrics import ResolverMetrics
 from contilio.api.graph_ql.query import Query
+from contilio.api.graph_ql.tracing import ResolverTracing
+from contilio.api.server_timing import ServerTimingMiddleware
 
 from contilio.config import SERVICE_NAME
+from contilio.metrics import CONTENT_TYPE, REGISTRY, render
 from contilio.task_executor.executor import get_task_executor
+from contilio.tracing import TRACER, SpanExporter
 
 logger = logging.getLogger("uvicorn.error")
 
@@ -22,28 +32,75 @@ def _startup() -> None:
     logger.info("Starting up %s worker. Hello!", SERVICE_NAME)
 
 
-SCHEMA = Schema(Query)
+SCHEMA = Schema(Query, extensions=[ResolverMetrics, ResolverTracing, RequestCostExtension])
 
 
 def get_app(
     persistence_factory: PersistenceFactory,
     transportapi_client: TransportApiClient,
     task_executor: Optional[Executor] = None,
+    routing_executor: Optional[Executor] = None,
+    timetable_sweeper: Optional[TimetableSweeper] = None,
+    speculative_prefetch: bool = False,
+    leg_deadline_secs: Optional[float] = None,
+    capture_file: Optional[Text] = None,
+    span_exporter: Optional[SpanExporter] = None,
+    trace_sample_ratio: float = 1.0,
+    server_timing: bool = False,
 ) -> FastAPI:
-    """Builds a FastAPI app with supplied dependencies"""
+    """
+    Builds a FastAPI app with supplied dependencies. With a capture file, every graphql
+    operation received is appended to it, for `contilio.loadtest.replay` to send again. With a
+    span exporter, `trace_sample_ratio` of requests are traced to it, until shutdown. With
+    server timing, responses report what they cost, see `ServerTimingMiddleware`.
+    """
     task_executor_instance = task_executor or get_task_executor()
 
     app = FastAPI(
         title=SERVICE_NAME,
         task_executor=task_executor_instance,
+        routing_executor=routing_executor,
         persistence_factory=persistence_factory,
         transportapi_client=transportapi_client,
+        speculative_prefetch=speculative_prefetch,
+        leg_deadline_secs=leg_deadline_secs,
     )
 
+    recorder = TrafficRecorder(capture_file) if capture_file else None
+    if recorder:
+        app.add_middleware(CaptureMiddleware, recorder=recorder)
+    if server_timing:
+        app.add_middleware(ServerTimingMiddleware)
+
+    if span_exporter:
+        TRACER.configure(span_exporter, trace_sample_ratio)
+
+    background_tasks: List[asyncio.Task] = []
+
+    async def _load_persistence() -> None:
+        await asyncio.get_running_loop().run_in_executor(
+            task_executor_instance, persistence_factory.load
+        )
+
+    async def _start_background_tasks() -> None:
+        if timetable_sweeper:
+            background_tasks.append(asyncio.create_task(timetable_sweeper.run_forever()))
+
     def _shutdown() -> None:
         logger.info("Shutting down %s worker. Bye!", SERVICE_NAME)
+        for task in background_tasks:
+            task.cancel()
+        if routing_executor:
+            routing_executor.shutdown(cancel_futures=True)
+        if recorder:
+            recorder.close()
+        if span_exporter:
+            TRACER.shutdown()
 
     app.add_event_handler("startup", _startup)
+    # Loaded before the sweeper starts writing through the persistences
+    app.add_event_handler("startup", _load_persistence)
+    app.add_event_handler("startup", _start_background_tasks)
     app.add_event_handler("shutdown", _shutdown)
 
     @app.get("/")
@@ -54,6 +111,10 @@ def get_app(
     def health():
         return {"health": "I am feeling ok!!"}
 
+    @app.get("/metrics")
+    def metrics():
+        return PlainTextResponse(render(REGISTRY), media_type=CONTENT_TYPE)
+
     graphql_app = GraphQLRouter(SCHEMA)
     app.include_router(graphql_app, prefix="/graphql")
 
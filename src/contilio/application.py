@@ -1,14 +1,30 @@
 import os
+from datetime import timedelta
 from logging import getLogger
 
 import dotenv
 from fastapi.applications import FastAPI
 
 from contilio.api import service
-from contilio.clients.transport_api import AppCreds, create_transportapi_client
+from contilio.clients.transport_api import (
+    AdaptiveConcurrencyLimiter,
+    AppCreds,
+    CircuitBreaker,
+    HedgePolicy,
+    NegativeCache,
+    RequestHedger,
+    RetryPolicy,
+    TokenBucketRateLimiter,
+    create_transportapi_client,
+    is_transient_error,
+    load_unroutable_pairs,
+)
 from contilio.config import RequiredEnviron
+from contilio.jobs import TimetableSweeper, parse_legs
 from contilio.persistence.journey_planner import JourneyPlannerPersistenceFactory
-from contilio.task_executor.executor import get_task_executor
+from contilio.task_executor.executor import get_routing_executor, get_task_executor
+from contilio.tracing import create_span_exporter
+from contilio.utils.bloom import SharedBloomFilter
 from contilio.utils.db_connection import create_engine
 
 logger = getLogger(__name__)
@@ -19,16 +35,87 @@ def init_app() -> FastAPI:
     env = RequiredEnviron.parse_obj(os.environ)
 
     jp_db_engine = create_engine(env)
-    persistence_factory = JourneyPlannerPersistenceFactory(jp_db_engine)
+    route_filter = SharedBloomFilter(
+        env.JP_ROUTE_FILTER_FILE_NAME or f"{jp_db_engine.url.database}.routes.bloom",
+        capacity=env.JP_ROUTE_FILTER_CAPACITY,
+        false_positive_rate=env.JP_ROUTE_FILTER_FALSE_POSITIVE_RATE,
+    )
+    persistence_factory = JourneyPlannerPersistenceFactory(jp_db_engine, route_filter=route_filter)
 
     transportapi_client = create_transportapi_client(
-        app_creds=AppCreds(app_id=env.TRANSPORT_API_APP_ID, app_key=env.TRANSPORT_API_APP_KEY)
+        app_creds=AppCreds(app_id=env.TRANSPORT_API_APP_ID, app_key=env.TRANSPORT_API_APP_KEY),
+        base_url=env.TRANSPORT_API_BASE_URL,
+        retry_policy=RetryPolicy(
+            max_attempts=env.TRANSPORT_API_MAX_ATTEMPTS,
+            base_delay_secs=env.TRANSPORT_API_RETRY_BASE_DELAY_SECS,
+            max_delay_secs=env.TRANSPORT_API_RETRY_MAX_DELAY_SECS,
+        ),
+        circuit_breaker=CircuitBreaker(
+            failure_threshold=env.TRANSPORT_API_BREAKER_FAILURE_THRESHOLD,
+            reset_timeout_secs=env.TRANSPORT_API_BREAKER_RESET_SECS,
+        ),
+        hedger=(
+            RequestHedger(
+                HedgePolicy(
+                    quantile=env.TRANSPORT_API_HEDGE_QUANTILE,
+                    budget_ratio=env.TRANSPORT_API_HEDGE_BUDGET,
+                )
+            )
+            if env.TRANSPORT_API_HEDGING
+            else None
+        ),
+        concurrency_limiter=AdaptiveConcurrencyLimiter(
+            initial_limit=env.TRANSPORT_API_INITIAL_CONCURRENCY,
+            max_limit=env.TRANSPORT_API_MAX_CONCURRENCY,
+            is_drop=is_transient_error,
+        ),
+        negative_cache=NegativeCache(
+            ttl_secs=env.TRANSPORT_API_NEGATIVE_CACHE_TTL_SECS,
+            known_unroutable=(
+                load_unroutable_pairs(env.TRANSPORT_API_UNROUTABLE_PAIRS_FILE)
+                if env.TRANSPORT_API_UNROUTABLE_PAIRS_FILE
+                else None
+            ),
+        ),
+        rate_limiter=TokenBucketRateLimiter(
+            calls_per_minute=env.TRANSPORT_API_CALLS_PER_MINUTE,
+            burst=env.TRANSPORT_API_RATE_LIMIT_BURST,
+        ),
+    )
+
+    task_executor = get_task_executor(
+        max_workers=env.JP_TASK_EXECUTOR_MAX_WORKERS,
+        min_workers=env.JP_TASK_EXECUTOR_MIN_WORKERS,
+        adaptive=env.JP_TASK_EXECUTOR_ADAPTIVE,
+    )
+
+    sweep_legs = parse_legs(env.JP_SWEEP_LEGS)
+    timetable_sweeper = (
+        TimetableSweeper(
+            legs=sweep_legs,
+            persistence_factory=persistence_factory,
+            transportapi_client=transportapi_client,
+            task_executor=task_executor,
+            horizon=timedelta(hours=env.JP_SWEEP_HORIZON_HOURS),
+            interval=timedelta(minutes=env.JP_SWEEP_INTERVAL_MINUTES),
+        )
+        if sweep_legs
+        else None
     )
 
     app = service.get_app(
         persistence_factory=persistence_factory,
         transportapi_client=transportapi_client,
-        task_executor=get_task_executor(max_workers=16),
+        task_executor=task_executor,
+        routing_executor=get_routing_executor(max_workers=env.NUM_ROUTING_PROCESSES),
+        timetable_sweeper=timetable_sweeper,
+        speculative_prefetch=env.JP_SPECULATIVE_PREFETCH,
+        leg_deadline_secs=env.JP_LEG_DEADLINE_SECS,
+        capture_file=env.JP_CAPTURE_FILE,
+        span_exporter=create_span_exporter(env.JP_TRACE_FILE, env.JP_TRACE_ENDPOINT),
+        trace_sample_ratio=env.JP_TRACE_SAMPLE_RATIO,
+        server_timing=env.JP_SERVER_TIMING,
     )
+    app.add_event_handler("shutdown", route_filter.close)
 
     return app
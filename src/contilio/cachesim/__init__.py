@@ -0,0 +1,25 @@
+from contilio.cachesim.policies import LruCache, SimulatedCache, TinyLfuCache
+from contilio.cachesim.simulator import (
+    PolicyVariant,
+    SimulationResult,
+    simulate,
+    simulate_variants,
+)
+from contilio.cachesim.trace import (
+    JourneyRequest,
+    journey_requests_from_capture,
+    synthetic_journey_requests,
+)
+
+__all__ = (
+    "JourneyRequest",
+    "LruCache",
+    "PolicyVariant",
+    "SimulatedCache",
+    "SimulationResult",
+    "TinyLfuCache",
+    "journey_requests_from_capture",
+    "simulate",
+    "simulate_variants",
+    "synthetic_journey_requests",
+)
@@ -0,0 +1,108 @@
+"""
+Simulates cache policies over recorded journey plan requests, and reports the hit rate,
+upstream calls saved and memory of each, best first, as json lines.
+
+    python -m contilio.cachesim --capture capture.jsonl --policies lru,tinylfu,ttl \
+        --capacities 1000,10000,100000 --ttls 600,3600 --prefetches none,interval,periodic
+
+Every combination of the policies with their capacities or ttls and the prefetches is a
+variant, simulated across a pool of `--processes`. Without `--capture`, the trace is made up
+by the load test workload instead.
+"""
+import argparse
+import json
+import sys
+import time
+from itertools import product
+from typing import List, Optional, Sequence
+
+from contilio.api.capture import read_capture
+from contilio.cachesim.simulator import POLICIES, PREFETCHES, PolicyVariant, simulate_variants
+from contilio.cachesim.trace import (
+    JourneyRequest,
+    journey_requests_from_capture,
+    synthetic_journey_requests,
+)
+from contilio.loadtest.workload import Workload
+from contilio.transport_api_stub import SyntheticTimetable
+
+
+def _list(parse):
+    return lambda values: [parse(value) for value in values.split(",") if value]
+
+
+def arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--capture", help="file captured with JP_CAPTURE_FILE")
+    parser.add_argument("--synthetic-requests", type=int, default=100_000)
+    parser.add_argument("--requests-per-sec", type=float, default=2)
+    parser.add_argument("--stations", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--policies", type=_list(str), default=list(POLICIES))
+    parser.add_argument("--capacities", type=_list(int), default=[10_000, 100_000])
+    parser.add_argument("--ttls", type=_list(float), default=[3600.0], help="seconds")
+    parser.add_argument("--prefetches", type=_list(str), default=list(PREFETCHES))
+    parser.add_argument("--processes", type=int, help="defaults to all cpus")
+    parser.add_argument("--output", help="file to write the results to, stdout otherwise")
+    return parser
+
+
+def variants(
+    policies: Sequence[str],
+    capacities: Sequence[int],
+    ttls: Sequence[float],
+    prefetches: Sequence[str],
+) -> List[PolicyVariant]:
+    bounds: List[dict] = []
+    for policy in policies:
+        if policy in ("lru", "tinylfu"):
+            bounds += [dict(policy=policy, capacity=capacity) for capacity in capacities]
+        elif policy == "ttl":
+            bounds += [dict(policy=policy, ttl_secs=ttl) for ttl in ttls]
+        else:
+            bounds.append(dict(policy=policy))
+    return [
+        PolicyVariant(**bound, prefetch=prefetch)
+        for bound, prefetch in product(bounds, prefetches)
+    ]
+
+
+def trace(args: argparse.Namespace) -> List[JourneyRequest]:
+    if args.capture:
+        return list(journey_requests_from_capture(read_capture(args.capture)))
+    workload = Workload(num_stations=args.stations, seed=args.seed)
+    return list(
+        synthetic_journey_requests(workload, args.synthetic_requests, args.requests_per_sec)
+    )
+
+
+def main(args: argparse.Namespace, output: Optional[str] = None) -> None:
+    journey_requests = trace(args)
+    policy_variants = variants(args.policies, args.capacities, args.ttls, args.prefetches)
+    started_at = time.monotonic()
+    results = simulate_variants(
+        journey_requests,
+        policy_variants,
+        SyntheticTimetable(seed=args.seed),
+        processes=args.processes,
+    )
+    print(
+        f"Simulated {len(policy_variants)} variants over {len(journey_requests)} requests "
+        f"in {time.monotonic() - started_at:.1f}s",
+        file=sys.stderr,
+    )
+
+    lines = [
+        json.dumps(result.to_dict())
+        for result in sorted(results, key=lambda result: -result.upstream_calls_saved)
+    ]
+    if output:
+        with open(output, "w") as f:
+            f.write("\n".join(lines) + "\n")
+    else:
+        print("\n".join(lines))
+
+
+if __name__ == "__main__":
+    parsed = arg_parser().parse_args()
+    main(parsed, parsed.output)
@@ -0,0 +1,255 @@
+import hashlib
+import sys
+from bisect import bisect_left, insort
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Sequence, Text, Tuple
+
+from contilio.persistence.protocol import Persistence, Route, RouteId, RouteRecord
+from contilio.statistics import LegStatistics
+
+RowKey = Tuple[Text, datetime]
+
+
+def _estimated_row_bytes() -> int:
+    """What a single leg row takes in memory: the route, its datetimes, hash and crs codes."""
+    departure_at, arrival_at = datetime(2030, 1, 7, 9), datetime(2030, 1, 7, 9, 30)
+    route = Route(0, "0" * 64, departure_at, arrival_at, "LBG", "SAJ")
+    return sum(
+        sys.getsizeof(part)
+        for part in (route, route.__dict__, route.hashed, departure_at, arrival_at, "LBG", "SAJ")
+    )
+
+
+ROW_BYTES = _estimated_row_bytes()
+
+
+class SimulatedCache(Persistence):
+    """
+    The route cache as a persistence in memory, with rows expiring `ttl_secs` after being
+    written when set, and without any bound on the number of rows otherwise.
+
+    Subclasses bound it by evicting rows, as they see fit, once it holds more than their
+    `capacity`. Time is that of `clock`, in seconds, so that it can follow the requests replayed.
+    """
+
+    capacity: Optional[int] = None
+
+    def __init__(self, clock: Callable[[], float], ttl_secs: Optional[float] = None) -> None:
+        self.clock = clock
+        self.ttl_secs = ttl_secs
+        self.rows = 0
+        self.peak_rows = 0
+        self._departures: Dict[Text, List[datetime]] = {}
+        self._routes: Dict[RowKey, Route] = {}
+        self._expiries: Deque[Tuple[float, RowKey]] = deque()
+        self._expires_at: Dict[RowKey, float] = {}
+        self._next_id = 0
+
+    @property
+    def peak_memory_bytes(self) -> int:
+        return self.peak_rows * ROW_BYTES
+
+    def read_route(self, route_hash: Text, datetime_of_interest: datetime) -> Optional[Route]:
+        self._expire()
+        departures = self._departures.get(route_hash, [])
+        i = bisect_left(departures, datetime_of_interest)
+        self._accessed(route_hash)
+        if i == len(departures):
+            return None
+        key = (route_hash, departures[i])
+        self._touched(key)
+        return self._routes[key]
+
+    def read_routes(
+        self, route_hash: Text, departure_from: datetime, departure_until: datetime
+    ) -> List[Route]:
+        self._expire()
+        departures = self._departures.get(route_hash, [])
+        start = bisect_left(departures, departure_from)
+        end = bisect_left(departures, departure_until)
+        return [self._routes[route_hash, departure_at] for departure_at in departures[start:end]]
+
+    def read_legs(self, departure_from: datetime, departure_until: datetime) -> List[Route]:
+        self._expire()
+        return [
+            route
+            for route in self._routes.values()
+            if route.origin_crs is not None
+            and departure_from <= route.departure_at < departure_until
+        ]
+
+    def write_route(
+        self,
+        route_hash: Text,
+        departure_at: datetime,
+        arrival_at: datetime,
+        origin_crs: Optional[Text] = None,
+        destination_crs: Optional[Text] = None,
+    ) -> RouteId:
+        self._expire()
+        key = (route_hash, departure_at)
+        if key in self._routes:
+            self._touched(key)
+            return self._routes[key].id
+        if not self._admitted(key):
+            return -1
+
+        route = Route(
+            self._next_id, route_hash, departure_at, arrival_at, origin_crs, destination_crs
+        )
+        self._next_id += 1
+        self._routes[key] = route
+        insort(self._departures.setdefault(route_hash, []), departure_at)
+        if self.ttl_secs is not None:
+            expires_at = self.clock() + self.ttl_secs
+            self._expiries.append((expires_at, key))
+            self._expires_at[key] = expires_at
+        self._inserted(key)
+        self.rows += 1
+
+        self._evict()
+        self.peak_rows = max(self.peak_rows, self.rows)
+        return route.id
+
+    def write_routes(self, routes: Sequence[RouteRecord]) -> None:
+        for route in routes:
+            self.write_route(
+                route.hashed,
+                route.departure_at,
+                route.arrival_at,
+                route.origin_crs,
+                route.destination_crs,
+            )
+
+    def read_leg_statistics(
+        self, origin_crs: Text, destination_crs: Text
+    ) -> Optional[LegStatistics]:
+        return None
+
+    def might_contain_route(self, route_hash: Text) -> bool:
+        return bool(self._departures.get(route_hash))
+
+    def _expire(self) -> None:
+        now = self.clock()
+        # Rows are written as time goes by, so they expire in the order they were written
+        while self._expiries and self._expiries[0][0] <= now:
+            expires_at, key = self._expiries.popleft()
+            # Unless the row was evicted since, and written again to expire later
+            if self._expires_at.get(key) == expires_at:
+                self._remove(key)
+
+    def _remove(self, key: RowKey) -> None:
+        route_hash, departure_at = key
+        del self._routes[key]
+        self._expires_at.pop(key, None)
+        departures = self._departures[route_hash]
+        departures.pop(bisect_left(departures, departure_at))
+        if not departures:
+            del self._departures[route_hash]
+        self._removed(key)
+        self.rows -= 1
+
+    def _accessed(self, route_hash: Text) -> None:
+        """A read of the hash, whether cached or not."""
+
+    def _touched(self, key: RowKey) -> None:
+        """A read or rewrite of a cached row."""
+
+    def _admitted(self, key: RowKey) -> bool:
+        return True
+
+    def _inserted(self, key: RowKey) -> None:
+        pass
+
+    def _removed(self, key: RowKey) -> None:
+        pass
+
+    def _evict(self) -> None:
+        """Removes rows until there are no more than the capacity, of which there is none here."""
+
+
+class LruCache(SimulatedCache):
+    """Evicts the row least recently read or written once it holds more than `capacity`."""
+
+    capacity: int
+
+    def __init__(
+        self, clock: Callable[[], float], capacity: int, ttl_secs: Optional[float] = None
+    ) -> None:
+        super().__init__(clock, ttl_secs)
+        self.capacity = capacity
+        self._recency: "OrderedDict[RowKey, None]" = OrderedDict()
+
+    def _touched(self, key: RowKey) -> None:
+        self._recency.move_to_end(key)
+
+    def _inserted(self, key: RowKey) -> None:
+        self._recency[key] = None
+
+    def _removed(self, key: RowKey) -> None:
+        del self._recency[key]
+
+    def _evict(self) -> None:
+        while self.rows > self.capacity:
+            self._remove(self._victim())
+
+    def _victim(self) -> RowKey:
+        return next(iter(self._recency))
+
+
+class FrequencySketch:
+    """
+    A count-min sketch of how often hashes are read, of 4 bit counters halved every
+    `sample_size` increments, so that it forgets about hashes no longer in demand.
+    """
+
+    MAX_COUNT = 15
+
+    def __init__(self, width: int, sample_size: int, depth: int = 4) -> None:
+        self._width = width
+        self._counters = [[0] * width for _ in range(depth)]
+        self._sample_size = sample_size
+        self._increments = 0
+
+    def _cells(self, item: Text) -> List[Tuple[List[int], int]]:
+        # Double hashing, as in the bloom filter
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(row, (h1 + i * h2) % self._width) for i, row in enumerate(self._counters)]
+
+    def frequency(self, item: Text) -> int:
+        return min(row[position] for row, position in self._cells(item))
+
+    def increment(self, item: Text) -> None:
+        for row, position in self._cells(item):
+            row[position] = min(row[position] + 1, self.MAX_COUNT)
+        self._increments += 1
+        if self._increments >= self._sample_size:
+            self._increments = 0
+            for row in self._counters:
+                row[:] = [count // 2 for count in row]
+
+
+class TinyLfuCache(LruCache):
+    """
+    An LRU cache only letting a row in when full, evicting its least recently used row, if the
+    hash of the row is read more often than that of the row it would evict, as per TinyLFU.
+    """
+
+    def __init__(
+        self, clock: Callable[[], float], capacity: int, ttl_secs: Optional[float] = None
+    ) -> None:
+        super().__init__(clock, capacity, ttl_secs)
+        width = 1 << max(capacity, 16).bit_length()
+        self.sketch = FrequencySketch(width, sample_size=10 * capacity)
+
+    def _accessed(self, route_hash: Text) -> None:
+        self.sketch.increment(route_hash)
+
+    def _admitted(self, key: RowKey) -> bool:
+        if self.rows < self.capacity:
+            return True
+        victim_hash, _ = self._victim()
+        return self.sketch.frequency(key[0]) > self.sketch.frequency(victim_hash)
@@ -0,0 +1,317 @@
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Text, Tuple
+
+from contilio.api.graph_ql.query import MAX_WAIT_TIME_IN_MINUTES, _departing_within_wait
+from contilio.cachesim.policies import LruCache, SimulatedCache, TinyLfuCache
+from contilio.cachesim.trace import JourneyRequest
+from contilio.domain.enums import UKTrainStationCode
+from contilio.transport_api_stub.timetable import LegTimetable, SyntheticTimetable
+from contilio.utils.hasher import generate_hash
+
+POLICIES = ("unbounded", "lru", "tinylfu", "ttl")
+PREFETCHES = ("none", "interval", "periodic")
+
+
+@dataclass(frozen=True)
+class PolicyVariant:
+    """
+    A cache policy to simulate: an eviction `policy` of `POLICIES`, bounded to `capacity` rows
+    for `lru` and `tinylfu`, with rows expiring after `ttl_secs` when set, which `ttl` needs.
+
+    The `prefetch` of `PREFETCHES` adds rows besides those `journey_plan` writes. With
+    `interval`, every upstream answer caches the `interval_departures` departures following
+    the one asked for, as if all the routes of a response were kept. With `periodic`, the
+    `sweep_legs` legs most asked for so far get every departure over the next
+    `sweep_horizon_secs` cached every `sweep_period_secs`, as the timetable sweeper does, at the
+    cost of an upstream call per departure.
+    """
+
+    policy: Text = "unbounded"
+    capacity: Optional[int] = None
+    ttl_secs: Optional[float] = None
+    prefetch: Text = "none"
+    interval_departures: int = 4
+    sweep_legs: int = 20
+    sweep_period_secs: float = 3600
+    sweep_horizon_secs: float = 6 * 3600
+
+    def __post_init__(self) -> None:
+        if self.policy not in POLICIES:
+            raise ValueError(f"Unknown cache policy {self.policy}, expected one of {POLICIES}")
+        if self.prefetch not in PREFETCHES:
+            raise ValueError(f"Unknown prefetch {self.prefetch}, expected one of {PREFETCHES}")
+        if self.policy in ("lru", "tinylfu") and not self.capacity:
+            raise ValueError(f"Expected a capacity for {self.policy}")
+        if self.policy == "ttl" and not self.ttl_secs:
+            raise ValueError("Expected a ttl for ttl")
+
+    @property
+    def name(self) -> Text:
+        parts = [self.policy]
+        if self.capacity:
+            parts.append(f"capacity={self.capacity}")
+        if self.ttl_secs:
+            parts.append(f"ttl={self.ttl_secs:g}s")
+        if self.prefetch == "interval":
+            parts.append(f"interval={self.interval_departures}")
+        elif self.prefetch == "periodic":
+            parts.append(f"periodic={self.sweep_legs}legs/{self.sweep_period_secs:g}s")
+        return ",".join(parts)
+
+    def create_cache(self, clock) -> SimulatedCache:
+        if self.policy == "lru":
+            return LruCache(clock, self.capacity, self.ttl_secs)
+        if self.policy == "tinylfu":
+            return TinyLfuCache(clock, self.capacity, self.ttl_secs)
+        return SimulatedCache(clock, ttl_secs=self.ttl_secs)
+
+
+@dataclass(frozen=True)
+class SimulationResult:
+    """
+    How a policy fared over a trace. A lookup is a leg to find a departure for, which without a
+    cache would take an upstream call, so `upstream_calls_saved` is how many fewer it took. A
+    stale hit is a cached departure later than the first train actually leaving after the time
+    asked for.
+    """
+
+    variant: Text
+    requests: int
+    errors: int
+    lookups: int
+    hits: int
+    stale_hits: int
+    upstream_calls: int
+    peak_rows: int
+    peak_memory_bytes: int
+
+    @property
+    def hit_rate(self) -> Optional[float]:
+        return self.hits / self.lookups if self.lookups else None
+
+    @property
+    def upstream_calls_saved(self) -> int:
+        return self.lookups - self.upstream_calls
+
+    def to_dict(self) -> Dict[Text, Any]:
+        return {
+            **asdict(self),
+            "hit_rate": self.hit_rate,
+            "upstream_calls_saved": self.upstream_calls_saved,
+        }
+
+
+@dataclass(frozen=True)
+class _Leg:
+    hashed: Text
+    origin_crs: Text
+    destination_crs: Text
+    timetable: Optional[LegTimetable]
+
+
+class _Simulation:
+    """Plans journeys the way `journey_plan` does, against a simulated cache and timetable."""
+
+    def __init__(self, variant: PolicyVariant, timetable: SyntheticTimetable) -> None:
+        self.variant = variant
+        self.timetable = timetable
+        self.now = 0.0
+        self.cache = variant.create_cache(lambda: self.now)
+        self.max_wait = timedelta(minutes=MAX_WAIT_TIME_IN_MINUTES)
+        self.errors = self.lookups = self.hits = self.stale_hits = self.upstream_calls = 0
+        # Routes repeat, so their legs and hashes are only worked out once
+        self._routes: Dict[Tuple[UKTrainStationCode, ...], List[Tuple[_Leg, Text]]] = {}
+        self._legs: Dict[Text, _Leg] = {}
+        self._leg_demand: "Counter[Text]" = Counter()
+        self._next_sweep_at: Optional[float] = None
+        self._swept_until: Dict[Text, datetime] = {}
+
+    def _route(self, route: Tuple[UKTrainStationCode, ...]) -> List[Tuple[_Leg, Text]]:
+        """Every leg of the route, with the hash of the sub route it ends."""
+        if route not in self._routes:
+            legs = []
+            for i in range(len(route) - 1):
+                point_a, point_b = route[i], route[i + 1]
+                a_b_hash = generate_hash([point_a, point_b])
+                if a_b_hash not in self._legs:
+                    self._legs[a_b_hash] = _Leg(
+                        a_b_hash,
+                        point_a.name,
+                        point_b.name,
+                        self.timetable.leg(point_a.name, point_b.name),
+                    )
+                legs.append((self._legs[a_b_hash], generate_hash(list(route[: i + 2]))))
+            self._routes[route] = legs
+        return self._routes[route]
+
+    def _write_leg(self, leg: _Leg, departure_at: datetime, arrival_at: datetime) -> None:
+        self.cache.write_route(
+            leg.hashed, departure_at, arrival_at, leg.origin_crs, leg.destination_crs
+        )
+
+    @staticmethod
+    def _is_stale(leg: _Leg, datetime_of_interest: datetime, departure_at: datetime) -> bool:
+        return leg.timetable is not None and (
+            departure_at > leg.timetable.departures_from(datetime_of_interest, 1)[0][0]
+        )
+
+    def _sweep(self) -> None:
+        now = datetime.fromtimestamp(self.now)
+        horizon_end = now + timedelta(seconds=self.variant.sweep_horizon_secs)
+        for a_b_hash, _ in self._leg_demand.most_common(self.variant.sweep_legs):
+            leg = self._legs[a_b_hash]
+            sweep_from = max(now, self._swept_until.get(a_b_hash, now))
+            if leg.timetable is None or sweep_from >= horizon_end:
+                continue
+            departures = leg.timetable.departures_from(sweep_from, 1)
+            while departures[-1][0] < horizon_end:
+                self.upstream_calls += 1
+                self._write_leg(leg, *departures[-1])
+                departures = leg.timetable.departures_from(
+                    departures[-1][0] + timedelta(minutes=1), 1
+                )
+            self._swept_until[a_b_hash] = horizon_end
+
+    def plan(self, request: JourneyRequest) -> None:
+        self.now = request.at
+        if self.variant.prefetch == "periodic":
+            # The first sweep waits a period for demand to tell which legs are hot
+            if self._next_sweep_at is None:
+                self._next_sweep_at = self.now + self.variant.sweep_period_secs
+            elif self.now >= self._next_sweep_at:
+                self._sweep()
+                self._next_sweep_at = self.now + self.variant.sweep_period_secs
+
+        legs = self._route(request.route)
+        current_datetime_of_interest = request.datetime_of_interest
+        first_departure_at: Optional[datetime] = None
+        for leg, sub_route_hash in legs:
+            self._leg_demand[leg.hashed] += 1
+            self.lookups += 1
+            previous_arrival_time = current_datetime_of_interest
+
+            # As in journeyPlan, cached routes departing past the maximum wait are fetched again
+            existing_sub_route = (
+                _departing_within_wait(
+                    self.cache.read_route(sub_route_hash, request.datetime_of_interest),
+                    request.datetime_of_interest,
+                )
+                if self.cache.might_contain_route(sub_route_hash)
+                else None
+            )
+            existing_a_b_route = (
+                _departing_within_wait(
+                    self.cache.read_route(leg.hashed, current_datetime_of_interest),
+                    current_datetime_of_interest,
+                )
+                if not existing_sub_route and self.cache.might_contain_route(leg.hashed)
+                else None
+            )
+            if existing_sub_route:
+                self.hits += 1
+                self.stale_hits += self._is_stale(
+                    legs[0][0], request.datetime_of_interest, existing_sub_route.departure_at
+                )
+                departure_at, arrival_at = (
+                    existing_sub_route.departure_at,
+                    existing_sub_route.arrival_at,
+                )
+            elif existing_a_b_route:
+                self.hits += 1
+                self.stale_hits += self._is_stale(
+                    leg, current_datetime_of_interest, existing_a_b_route.departure_at
+                )
+                departure_at, arrival_at = (
+                    existing_a_b_route.departure_at,
+                    existing_a_b_route.arrival_at,
+                )
+            else:
+                self.upstream_calls += 1
+                if leg.timetable is None:
+                    self.errors += 1
+                    return
+                interval_departures = (
+                    self.variant.interval_departures if self.variant.prefetch == "interval" else 0
+                )
+                upstream_departures = leg.timetable.departures_from(
+                    current_datetime_of_interest, 1 + interval_departures
+                )
+                departure_at, arrival_at = upstream_departures[0]
+
+            first_departure_at = first_departure_at or departure_at
+            if departure_at - previous_arrival_time > self.max_wait:
+                self.errors += 1
+                return
+            if not existing_sub_route and not existing_a_b_route:
+                for departure in upstream_departures:
+                    self._write_leg(leg, *departure)
+            current_datetime_of_interest = arrival_at
+            if not existing_sub_route and leg.hashed != sub_route_hash:
+                self.cache.write_route(sub_route_hash, first_departure_at, arrival_at)
+
+    def result(self, requests: int) -> SimulationResult:
+        return SimulationResult(
+            variant=self.variant.name,
+            requests=requests,
+            errors=self.errors,
+            lookups=self.lookups,
+            hits=self.hits,
+            stale_hits=self.stale_hits,
+            upstream_calls=self.upstream_calls,
+            peak_rows=self.cache.peak_rows,
+            peak_memory_bytes=self.cache.peak_memory_bytes,
+        )
+
+
+def simulate(
+    trace: Sequence[JourneyRequest],
+    variant: PolicyVariant,
+    timetable: Optional[SyntheticTimetable] = None,
+) -> SimulationResult:
+    """
+    Replays the journey plans of the trace, in order, against a cache of the given policy.
+    Upstream answers come from the synthetic timetable the TransportApi stub answers from.
+    """
+    simulation = _Simulation(variant, timetable or SyntheticTimetable())
+    for request in trace:
+        simulation.plan(request)
+    return simulation.result(len(trace))
+
+
+_worker_trace: Sequence[JourneyRequest] = ()
+_worker_timetable: Optional[SyntheticTimetable] = None
+
+
+def _init_worker(trace: Sequence[JourneyRequest], timetable: SyntheticTimetable) -> None:
+    global _worker_trace, _worker_timetable
+    _worker_trace, _worker_timetable = trace, timetable
+
+
+def _simulate_in_worker(variant: PolicyVariant) -> SimulationResult:
+    return simulate(_worker_trace, variant, _worker_timetable)
+
+
+def simulate_variants(
+    trace: Sequence[JourneyRequest],
+    variants: Sequence[PolicyVariant],
+    timetable: Optional[SyntheticTimetable] = None,
+    processes: Optional[int] = None,
+) -> List[SimulationResult]:
+    """
+    Simulates every variant over the trace, across a pool of `processes`, all cpus by default,
+    each of which is handed the trace only once. The results are in the order of the variants.
+    """
+    processes = processes or os.cpu_count() or 1
+    timetable = timetable or SyntheticTimetable()
+    if processes == 1 or len(variants) == 1:
+        return [simulate(trace, variant, timetable) for variant in variants]
+    with ProcessPoolExecutor(
+        max_workers=min(processes, len(variants)),
+        initializer=_init_worker,
+        initargs=(list(trace), timetable),
+    ) as pool:
+        return list(pool.map(_simulate_in_worker, variants))
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from graphql import FieldNode, GraphQLError, OperationDefinitionNode, parse, value_from_ast_untyped
+
+from contilio.api.capture import CapturedOperation
+from contilio.domain.enums import UKTrainStationCode
+from contilio.loadtest.workload import FIRST_HOUR_OF_INTEREST, Workload
+
+
+@dataclass(frozen=True)
+class JourneyRequest:
+    """A journey plan request, received `at` seconds since the epoch."""
+
+    at: float
+    route: Tuple[UKTrainStationCode, ...]
+    datetime_of_interest: datetime
+
+
+def _journey_plan_input(
+    query: str, variables: Optional[Dict[str, Any]]
+) -> Iterator[Dict[str, Any]]:
+    for definition in parse(query).definitions:
+        if not isinstance(definition, OperationDefinitionNode):
+            continue
+        for selection in definition.selection_set.selections:
+            if not isinstance(selection, FieldNode) or selection.name.value != "journeyPlan":
+                continue
+            for argument in selection.arguments:
+                if argument.name.value == "userInput":
+                    yield value_from_ast_untyped(argument.value, variables)
+
+
+def journey_requests_from_capture(
+    operations: Iterable[CapturedOperation],
+) -> Iterator[JourneyRequest]:
+    """The journey plans of captured operations, leaving out any other query and bad input."""
+    for operation in operations:
+        try:
+            user_inputs = list(_journey_plan_input(operation.query, operation.variables))
+        except GraphQLError:
+            continue
+        for user_input in user_inputs:
+            try:
+                route = tuple(UKTrainStationCode[code] for code in user_input["routeCrsIds"])
+                datetime_of_interest = datetime.fromisoformat(user_input["datetimeOfInterest"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            if len(route) > 1:
+                yield JourneyRequest(operation.at, route, datetime_of_interest)
+
+
+def synthetic_journey_requests(
+    workload: Workload, count: int, requests_per_sec: float
+) -> Iterator[JourneyRequest]:
+    """
+    Journey plans of the load test workload, received at a steady rate from the first hour of
+    interest of its service day on.
+    """
+    started_at: Optional[float] = None
+    for i in range(count):
+        request = workload.next_request()
+        if started_at is None:
+            service_day = request.datetime_of_interest.replace(hour=0, minute=0)
+            started_at = (service_day + timedelta(hours=FIRST_HOUR_OF_INTEREST)).timestamp()
+        yield JourneyRequest(
+            at=started_at + i / requests_per_sec,
+            route=tuple(UKTrainStationCode[code] for code in request.route_crs_ids),
+            datetime_of_interest=request.datetime_of_interest,
+        )
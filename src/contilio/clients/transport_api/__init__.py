@@ -3,17 +3,40 @@ from strawberry.types import Info as GraphQLResolveInfo
 
 from contilio.clients.transport_api.client import (
     TransportApiClient,
+    TransportApiUnavailableError,
     TrainRoutePlan,
     AppCreds,
     create_transportapi_client,
+    is_transient_error,
 )
+from contilio.clients.transport_api.concurrency import AdaptiveConcurrencyLimiter
+from contilio.clients.transport_api.hedging import HedgePolicy, RequestHedger
+from contilio.clients.transport_api.negative_cache import NegativeCache, load_unroutable_pairs
+from contilio.clients.transport_api.rate_limit import (
+    Priority,
+    RateLimitExceededError,
+    TokenBucketRateLimiter,
+)
+from contilio.clients.transport_api.resilience import CircuitBreaker, RetryPolicy
 
 __all__ = (
+    "AdaptiveConcurrencyLimiter",
     "TransportApiClient",
+    "TransportApiUnavailableError",
     "transport_api_client_from_request_context",
     "TrainRoutePlan",
     "AppCreds",
+    "CircuitBreaker",
+    "HedgePolicy",
+    "NegativeCache",
+    "Priority",
+    "RateLimitExceededError",
+    "RequestHedger",
+    "RetryPolicy",
+    "TokenBucketRateLimiter",
     "create_transportapi_client",
+    "is_transient_error",
+    "load_unroutable_pairs",
 )
 
 
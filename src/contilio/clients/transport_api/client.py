@@ -1,16 +1,45 @@
+import asyncio
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 from dataclasses import dataclass
-from typing import Any, Mapping, Optional, Protocol
+from typing import Any, Callable, List, Mapping, Optional, Protocol
 
 import aiohttp
 from aiohttp import ContentTypeError
 
+from contilio.clients.transport_api.concurrency import AdaptiveConcurrencyLimiter
+from contilio.clients.transport_api.hedging import RequestHedger
+from contilio.clients.transport_api.negative_cache import NegativeCache
+from contilio.clients.transport_api.parsing import (
+    STREAM_PARSE_MIN_BYTES,
+    JsonDecoder,
+    ResponseParser,
+    RoutesExtractor,
+    get_json_decoder,
+)
+from contilio.clients.transport_api.rate_limit import Priority, TokenBucketRateLimiter
+from contilio.clients.transport_api.resilience import RETRIES, CircuitBreaker, RetryPolicy
+from contilio.metrics import REGISTRY, current_request_cost
+from contilio.tracing import TRACER
 
 logger = logging.getLogger(__name__)
 
+REQUEST_SECONDS = REGISTRY.histogram(
+    "transportapi_request_seconds",
+    "Time taken by every upstream request, each retry and hedge apart, by outcome",
+    ["client", "outcome"],
+)
+UPSTREAM_ERRORS = REGISTRY.counter(
+    "transportapi_errors_total",
+    "Upstream requests failed or answered without a route, by error",
+    ["client", "error"],
+)
+
 TRANSPORT_API_BASE_URL = "https://transportapi.com/v3/uk/public_journey.json"
 DEFAULT_TIMEOUT_SECS = 10
+MAX_PAGES = 96
+STREAM_CHUNK_BYTES = 16 * 1024
 
 
 @dataclass
@@ -23,6 +52,7 @@ class AppCreds:
 class TrainRoutePlan:
     departure_at: datetime
     arrival_at: datetime
+    estimated: bool = False
 
     @classmethod
     def from_dict(cls, d: Mapping[str, Any]) -> "TrainRoutePlan":
@@ -44,8 +74,32 @@ class AsyncHttpClient(Protocol):
 
 
 class AioHttpClient(AsyncHttpClient):  # pragma: no cover
-    def __init__(self, default_timeout: Optional[float] = None) -> None:
+    """
+    With a response parser factory, json bodies of unknown or large size are streamed through a
+    fresh parser, and the rest of the body is only read through once the parser is done.
+    """
+
+    def __init__(
+        self,
+        default_timeout: Optional[float] = None,
+        json_decoder: Optional[JsonDecoder] = None,
+        response_parser_factory: Optional[Callable[[], ResponseParser]] = None,
+    ) -> None:
         self._default_timeout = default_timeout
+        self._json_decoder = json_decoder or get_json_decoder()
+        self._response_parser_factory = response_parser_factory
+
+    async def _parse_streaming(self, response: aiohttp.ClientResponse) -> Any:
+        assert self._response_parser_factory is not None
+        parser = self._response_parser_factory()
+        chunks = response.content.iter_chunked(STREAM_CHUNK_BYTES)
+        async for chunk in chunks:
+            if not parser.feed(chunk):
+                break
+        # Read to the end without parsing, as a response broken off closes its connection
+        async for _ in chunks:
+            pass
+        return parser.result()
 
     async def _fetch(
         self,
@@ -65,8 +119,17 @@ class AioHttpClient(AsyncHttpClient):  # pragma: no cover
         ) as session:
             fn = getattr(session, http_verb)
             async with fn(url=url, params=params) as response:
+                if response.status >= 500 or response.status == 429:
+                    response.raise_for_status()
+                if (
+                    self._response_parser_factory is not None
+                    and response.content_type == "application/json"
+                    and (response.content_length or STREAM_PARSE_MIN_BYTES)
+                    >= STREAM_PARSE_MIN_BYTES
+                ):
+                    return await self._parse_streaming(response)
                 try:
-                    return await response.json()
+                    return await response.json(loads=self._json_decoder)
                 except ContentTypeError:
                     logger.debug(
                         f"Received bad response with content-type {response.content_type}: "
@@ -90,15 +153,123 @@ class TransportApiClientException(Exception):
     pass
 
 
+class TransportApiUnavailableError(Exception):
+    """
+    Raised when failing fast as the circuit breaker is open, upstream being deemed down.
+    """
+
+    pass
+
+
+def is_transient_error(e: BaseException) -> bool:
+    """Timeouts, connection errors, throttling and server errors may well pass on a retry."""
+    if isinstance(e, aiohttp.ClientResponseError):
+        return e.status >= 500 or e.status == 429
+    return isinstance(e, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+
 class TransportApiClient:
     """
     The transport api http client with a single get journey method.
+
+    Requests are retried on transient errors, as per the retry policy, and go through a circuit
+    breaker shared by all requests of the client. With a hedger, slow requests get hedged. With
+    a rate limiter, every request, retries and hedges included, waits on it for its turn. With
+    a concurrency limiter, only so many of them are in flight at once. With a negative cache,
+    pairs upstream recently found no route for are not asked for again.
     """
 
-    def __init__(self, app_creds: AppCreds, http_client: AsyncHttpClient) -> None:
+    def __init__(
+        self,
+        app_creds: AppCreds,
+        http_client: AsyncHttpClient,
+        base_url: str = TRANSPORT_API_BASE_URL,
+        retry_policy: Optional[RetryPolicy] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None,
+        hedger: Optional[RequestHedger] = None,
+        rate_limiter: Optional[TokenBucketRateLimiter] = None,
+        concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+        negative_cache: Optional[NegativeCache] = None,
+    ) -> None:
         self._app_creds = app_creds
-        self._base_url = TRANSPORT_API_BASE_URL
+        self._base_url = base_url
         self._http_client = http_client
+        self._retry_policy = retry_policy or RetryPolicy()
+        self._circuit_breaker = circuit_breaker or CircuitBreaker()
+        self._hedger = hedger
+        self._rate_limiter = rate_limiter
+        self._concurrency_limiter = concurrency_limiter
+        self._negative_cache = negative_cache
+
+    async def _timed_get(self, params: Mapping[str, str]) -> Any:
+        client = self._circuit_breaker.name
+        started_at = time.perf_counter()
+        outcome = "error"
+        with TRACER.span(
+            "transportapi.request", client=client, route=f"{params['from']}-{params['to']}"
+        ) as span:
+            try:
+                response = await self._http_client.get(url=self._base_url, params=params)
+                outcome = "ok"
+                return response
+            except asyncio.CancelledError:
+                # Lost hedges are cancelled, which is no failure of upstream
+                outcome = "cancelled"
+                raise
+            except Exception as e:
+                UPSTREAM_ERRORS.inc(client=client, error=type(e).__name__)
+                raise
+            finally:
+                span.set_attribute("outcome", outcome)
+                elapsed = time.perf_counter() - started_at
+                REQUEST_SECONDS.observe(elapsed, client=client, outcome=outcome)
+                cost = current_request_cost()
+                if cost is not None:
+                    cost.add_upstream_call(elapsed)
+
+    async def _send(self, params: Mapping[str, str]) -> Any:
+        if self._concurrency_limiter is None:
+            return await self._timed_get(params)
+        return await self._concurrency_limiter.run(lambda: self._timed_get(params))
+
+    async def _get(self, params: Mapping[str, str]) -> Any:
+        if self._hedger is None:
+            return await self._send(params)
+        return await self._hedger.run(
+            lambda: self._send(params),
+            # Hedges only go out on spare quota, never queueing
+            admit_hedge=self._rate_limiter.try_acquire if self._rate_limiter else None,
+        )
+
+    async def _get_with_retries(
+        self, params: Mapping[str, str], priority: Priority, deadline_secs: Optional[float]
+    ) -> Any:
+        attempt = 1
+        while True:
+            if self._rate_limiter is not None:
+                await self._rate_limiter.acquire(priority, deadline_secs)
+            if not self._circuit_breaker.allow_request():
+                raise TransportApiUnavailableError("TransportApi circuit breaker is open")
+            try:
+                response = await self._get(params)
+            except Exception as e:
+                if not is_transient_error(e):
+                    self._circuit_breaker.record_success()
+                    raise
+                self._circuit_breaker.record_failure()
+                if attempt >= self._retry_policy.max_attempts:
+                    raise
+                logger.info("Retrying TransportApi request after attempt %s: %r", attempt, e)
+                RETRIES.inc(client=self._circuit_breaker.name)
+                await asyncio.sleep(self._retry_policy.backoff_secs(attempt))
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled, such as a losing hedge, which says nothing about upstream
+                self._circuit_breaker.record_cancelled()
+                raise
+            self._circuit_breaker.record_success()
+            return response
 
     def _get_params(
         self, point_a: str, point_b: str, datetime_of_interest: datetime
@@ -114,7 +285,12 @@ class TransportApiClient:
         }
 
     async def get_train_route_plan(
-        self, point_a: str, point_b: str, datetime_of_interest: datetime
+        self,
+        point_a: str,
+        point_b: str,
+        datetime_of_interest: datetime,
+        priority: Priority = Priority.INTERACTIVE,
+        deadline_secs: Optional[float] = DEFAULT_TIMEOUT_SECS,
     ) -> TrainRoutePlan:
         """
         Hits the transport api base url and supplies the given params as part of the request
@@ -122,16 +298,97 @@ class TransportApiClient:
         :param point_a: source train station crs 3-letter code
         :param point_b: destination train station crs 3-letter code
         :param datetime_of_interest: date and time after which to look up available plans
+        :param priority: the turn of the request when waiting on the rate limiter
+        :param deadline_secs: longest the request may wait on the rate limiter, if at all
 
         :return: TrainRoutePlan holding departure and arrival times of queried route
         """
+        if self._negative_cache is not None and self._negative_cache.is_unroutable(
+            point_a, point_b, datetime_of_interest
+        ):
+            raise TransportApiClientException(f"Route from {point_a} to {point_b} not found")
+
         params = self._get_params(point_a, point_b, datetime_of_interest)
-        response = await self._http_client.get(url=self._base_url, params=params)
+        response = await self._get_with_retries(params, priority, deadline_secs)
         if not response or "error" in response:
+            # Such as failed authorisation or an exhausted quota, which says nothing of the route
+            UPSTREAM_ERRORS.inc(client=self._circuit_breaker.name, error="ErrorResponse")
+            raise TransportApiClientException(
+                f"Route from {point_a} to {point_b} not looked up: "
+                f"{response.get('error') if response else 'empty response'}"
+            )
+        if not response.get("routes"):
+            UPSTREAM_ERRORS.inc(client=self._circuit_breaker.name, error="NoRoute")
+            if self._negative_cache is not None:
+                self._negative_cache.record_unroutable(point_a, point_b, datetime_of_interest)
             raise TransportApiClientException(f"Route from {point_a} to {point_b} not found")
         return TrainRoutePlan.from_dict(response)
 
+    async def get_train_route_plans(
+        self,
+        point_a: str,
+        point_b: str,
+        departure_from: datetime,
+        departure_until: datetime,
+        priority: Priority = Priority.INTERACTIVE,
+        deadline_secs: Optional[float] = DEFAULT_TIMEOUT_SECS,
+    ) -> List[TrainRoutePlan]:
+        """
+        Pages through every departure within the given window, one request per departure, by
+        asking for the first departure a minute past the last one returned
+
+        :param point_a: source train station crs 3-letter code
+        :param point_b: destination train station crs 3-letter code
+        :param departure_from: date and time from which to look up available plans
+        :param departure_until: date and time after which to stop looking
+        :param priority: the turn of each request when waiting on the rate limiter
+        :param deadline_secs: longest each request may wait on the rate limiter, if at all
+
+        :return: TrainRoutePlans departing within the window, in order of departure
+        """
+        route_plans: List[TrainRoutePlan] = []
+        datetime_of_interest = departure_from
+        for _ in range(MAX_PAGES):
+            try:
+                route_plan = await self.get_train_route_plan(
+                    point_a,
+                    point_b,
+                    datetime_of_interest=datetime_of_interest,
+                    priority=priority,
+                    deadline_secs=deadline_secs,
+                )
+            except TransportApiClientException:
+                break
+            # Comparing timestamps, as upstream datetimes are timezone aware
+            if route_plan.departure_at.timestamp() >= departure_until.timestamp():
+                break
+            if not route_plans or route_plan.departure_at > route_plans[-1].departure_at:
+                route_plans.append(route_plan)
+            datetime_of_interest = route_plan.departure_at + timedelta(minutes=1)
+        return route_plans
+
 
-def create_transportapi_client(app_creds: AppCreds) -> TransportApiClient:
-    http_client = AioHttpClient(default_timeout=DEFAULT_TIMEOUT_SECS)
-    return TransportApiClient(app_creds=app_creds, http_client=http_client)
+def create_transportapi_client(
+    app_creds: AppCreds,
+    base_url: Optional[str] = None,
+    retry_policy: Optional[RetryPolicy] = None,
+    circuit_breaker: Optional[CircuitBreaker] = None,
+    hedger: Optional[RequestHedger] = None,
+    rate_limiter: Optional[TokenBucketRateLimiter] = None,
+    concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None,
+    negative_cache: Optional[NegativeCache] = None,
+) -> TransportApiClient:
+    http_client = AioHttpClient(
+        default_timeout=DEFAULT_TIMEOUT_SECS, response_parser_factory=RoutesExtractor
+    )
+    return TransportApiClient(
+        app_creds=app_creds,
+        http_client=http_client,
+        base_url=base_url or TRANSPORT_API_BASE_URL,
+        retry_policy=retry_policy,
+        circuit_breaker=circuit_breaker,
+        hedger=hedger,
+        rate_limiter=rate_limiter,
+        concurrency_limiter=concurrency_limiter,
+        negative_cache=negative_cache,
+    )
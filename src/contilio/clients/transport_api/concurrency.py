@@ -0,0 +1,171 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional, Text, TypeVar
+
+from contilio.metrics import REGISTRY
+
+T = TypeVar("T")
+
+CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "transportapi_concurrency_limit", "Upstream requests allowed in flight at once", ["client"]
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "transportapi_in_flight_requests", "Upstream requests currently in flight", ["client"]
+)
+CONCURRENCY_QUEUED = REGISTRY.gauge(
+    "transportapi_concurrency_queued",
+    "Upstream requests waiting for a free slot under the concurrency limit",
+    ["client"],
+)
+LIMIT_DECREASES = REGISTRY.counter(
+    "transportapi_concurrency_limit_decreases_total",
+    "Times the concurrency limit was cut on slow or failed upstream requests",
+    ["client"],
+)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps how many upstream requests are in flight at once, finding the cap as it goes, after
+    the gradient limit of Netflix's concurrency-limits.
+
+    Requests answered while the limit is barely in use make up the baseline, the
+    `baseline_quantile` of the last `window` of them. Requests answered while it is in use move
+    a recent latency, smoothed by `latency_smoothing`, and the gradient, `latency_tolerance`
+    times the baseline over the recent latency, give or take `latency_slack_secs` of jitter, is
+    kept between 0.5 and 1. The limit then moves `limit_smoothing` of the way to
+    `limit * gradient + sqrt(limit)`, the square root leaving room to grow while latency holds.
+    A quantile rather than the fastest latency, and smoothing over several requests, keep the
+    long tail of upstream latencies from cutting the limit.
+
+    A request failing as per `is_drop` halves the limit straight away. Requests started before
+    the last cut do not cut it again, as they were sent under the old limit.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        backoff_ratio: float = 0.5,
+        latency_tolerance: float = 2.0,
+        latency_slack_secs: float = 0.05,
+        baseline_quantile: float = 0.5,
+        latency_smoothing: float = 0.2,
+        limit_smoothing: float = 0.2,
+        window: int = 100,
+        is_drop: Callable[[BaseException], bool] = lambda e: True,
+        name: Text = "transportapi",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._backoff_ratio = backoff_ratio
+        self._latency_tolerance = latency_tolerance
+        self._latency_slack_secs = latency_slack_secs
+        self._baseline_quantile = baseline_quantile
+        self._latency_smoothing = latency_smoothing
+        self._limit_smoothing = limit_smoothing
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._recent_secs: Optional[float] = None
+        self._is_drop = is_drop
+        self._clock = clock
+        self._decreased_at = float("-inf")
+        self._in_flight = 0
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        CONCURRENCY_LIMIT.set(self.limit, client=name)
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _set_limit(self, limit: float) -> None:
+        self._limit = min(self._max_limit, max(self._min_limit, limit))
+        CONCURRENCY_LIMIT.set(self.limit, client=self.name)
+
+    def _decrease(self, started_at: float) -> None:
+        if started_at < self._decreased_at:
+            return
+        self._decreased_at = self._clock()
+        self._set_limit(self._limit * self._backoff_ratio)
+        LIMIT_DECREASES.inc(client=self.name)
+
+    def _baseline_secs(self) -> float:
+        latencies = sorted(self._latencies)
+        return latencies[min(int(self._baseline_quantile * len(latencies)), len(latencies) - 1)]
+
+    def _on_latency(self, started_at: float, latency_secs: float) -> None:
+        if self._in_flight * 2 < self._limit or not self._latencies:
+            # Answered with the limit barely in use, so without queueing on our part
+            self._latencies.append(latency_secs)
+            return
+
+        self._recent_secs = (
+            latency_secs
+            if self._recent_secs is None
+            else self._recent_secs + self._latency_smoothing * (latency_secs - self._recent_secs)
+        )
+        tolerated_secs = self._latency_tolerance * self._baseline_secs() + self._latency_slack_secs
+        gradient = max(0.5, min(1.0, tolerated_secs / self._recent_secs))
+        limit = self._limit * gradient + self._limit**0.5
+        limit = self._limit + self._limit_smoothing * (limit - self._limit)
+        if limit < self._limit:
+            LIMIT_DECREASES.inc(client=self.name)
+        self._set_limit(limit)
+
+    def _take_slot(self) -> None:
+        self._in_flight += 1
+        IN_FLIGHT.inc(client=self.name)
+
+    def _release_slot(self) -> None:
+        self._in_flight -= 1
+        IN_FLIGHT.dec(client=self.name)
+        while self._waiters and self._in_flight < self.limit:
+            waiter = self._waiters.popleft()
+            CONCURRENCY_QUEUED.dec(client=self.name)
+            if not waiter.done():
+                self._take_slot()
+                waiter.set_result(None)
+
+    async def _acquire(self) -> None:
+        if not self._waiters and self._in_flight < self.limit:
+            self._take_slot()
+            return
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        CONCURRENCY_QUEUED.inc(client=self.name)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if not waiter.cancelled():
+                # Cancelled right after being handed a slot, which goes to the next in line
+                self._release_slot()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+                CONCURRENCY_QUEUED.dec(client=self.name)
+            raise
+
+    async def run(self, request: Callable[[], Awaitable[T]]) -> T:
+        await self._acquire()
+        started_at = self._clock()
+        try:
+            result = await request()
+        except asyncio.CancelledError:
+            self._release_slot()
+            raise
+        except Exception as e:
+            if self._is_drop(e):
+                self._decrease(started_at)
+            self._release_slot()
+            raise
+        self._on_latency(started_at, self._clock() - started_at)
+        self._release_slot()
+        return result
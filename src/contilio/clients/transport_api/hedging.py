@@ -0,0 +1,144 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from threading import Lock
+from typing import Awaitable, Callable, Deque, Optional, Text, TypeVar
+
+from contilio.metrics import REGISTRY
+
+T = TypeVar("T")
+
+HEDGEABLE_REQUESTS = REGISTRY.counter(
+    "transportapi_hedgeable_requests_total", "Upstream requests that could be hedged", ["client"]
+)
+HEDGES = REGISTRY.counter(
+    "transportapi_hedges_total", "Duplicate upstream requests fired as hedges", ["client"]
+)
+HEDGE_WINS = REGISTRY.counter(
+    "transportapi_hedge_wins_total",
+    "Hedges answering before the request they duplicated",
+    ["client"],
+)
+
+
+@dataclass(frozen=True)
+class HedgePolicy:
+    """
+    Hedge once a request has been waiting for longer than the `quantile` of recent latencies,
+    but keep the hedges under `budget_ratio` of any `budget_window` requests in a row, so that
+    a long quiet spell does not save up a burst of hedges for when upstream slows down.
+    """
+
+    quantile: float = 0.95
+    budget_ratio: float = 0.05
+    budget_window: int = 100
+    min_samples: int = 20
+    window: int = 1000
+
+
+class LatencyTracker:
+    """The latencies of the most recent requests, for a rough quantile."""
+
+    def __init__(self, window: int) -> None:
+        self._lock = Lock()
+        self._latencies: Deque[float] = deque(maxlen=window)
+
+    def __len__(self) -> int:
+        return len(self._latencies)
+
+    def record(self, latency_secs: float) -> None:
+        with self._lock:
+            self._latencies.append(latency_secs)
+
+    def quantile(self, q: float) -> float:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+
+
+class RequestHedger:
+    """
+    Fires a duplicate of a request that is slower than most, and takes whichever answers first.
+
+    Upstream latency is long tailed, so a duplicate fired past the p95 latency mostly beats the
+    original stuck in the tail, for a few percent more requests at most.
+    """
+
+    def __init__(self, policy: HedgePolicy, name: Text = "transportapi") -> None:
+        self.name = name
+        self._policy = policy
+        self._latencies = LatencyTracker(policy.window)
+        self._requests = 0
+        # The number of the request last made as each of the recent hedges fired
+        self._hedged_at: Deque[int] = deque()
+
+    def _within_budget(self) -> bool:
+        window = self._policy.budget_window
+        while self._hedged_at and self._hedged_at[0] <= self._requests - window:
+            self._hedged_at.popleft()
+        return len(self._hedged_at) + 1 <= self._policy.budget_ratio * min(self._requests, window)
+
+    def _hedge_delay_secs(self) -> Optional[float]:
+        if len(self._latencies) < self._policy.min_samples or not self._within_budget():
+            return None
+        return self._latencies.quantile(self._policy.quantile)
+
+    async def _timed(self, request: Callable[[], Awaitable[T]]) -> T:
+        started_at = time.monotonic()
+        try:
+            result = await request()
+        except asyncio.CancelledError:
+            # Mostly the loser of a hedge, which took at least this long. Left out, the slowest
+            # requests would go missing from the latencies, and hedges fire ever sooner
+            self._latencies.record(time.monotonic() - started_at)
+            raise
+        self._latencies.record(time.monotonic() - started_at)
+        return result
+
+    async def run(
+        self,
+        request: Callable[[], Awaitable[T]],
+        admit_hedge: Optional[Callable[[], bool]] = None,
+    ) -> T:
+        """
+        :param admit_hedge: asked right before firing a hedge, which is skipped if it says no
+        """
+        self._requests += 1
+        HEDGEABLE_REQUESTS.inc(client=self.name)
+
+        original = asyncio.ensure_future(self._timed(request))
+        tasks = [original]
+        try:
+            hedge_delay_secs = self._hedge_delay_secs()
+            if hedge_delay_secs is None:
+                return await original
+
+            done, _ = await asyncio.wait(tasks, timeout=hedge_delay_secs)
+            # Other requests may have spent the budget in the meantime
+            if (
+                done
+                or not self._within_budget()
+                or (admit_hedge is not None and not admit_hedge())
+            ):
+                return await original
+
+            self._hedged_at.append(self._requests)
+            HEDGES.inc(client=self.name)
+            hedge = asyncio.ensure_future(self._timed(request))
+            tasks.append(hedge)
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if not task.exception()), None)
+                if winner is not None:
+                    if winner is hedge:
+                        HEDGE_WINS.inc(client=self.name)
+                    return winner.result()
+            # Both failed, the original's error is as good as any
+            return original.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
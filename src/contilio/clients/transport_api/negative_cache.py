@@ -0,0 +1,91 @@
+import time
+from collections import OrderedDict
+from datetime import date, datetime, time as time_of_day
+from typing import Callable, Optional, Text, Tuple
+
+from contilio.metrics import REGISTRY
+from contilio.utils.bloom import BloomFilter
+
+NEGATIVE_CACHE_HITS = REGISTRY.counter(
+    "transportapi_negative_cache_hits_total",
+    "Requests for station pairs known to be unroutable, answered without asking upstream",
+    ["source"],
+)
+
+PairKey = Tuple[Text, Text, date]
+PairEntry = Tuple[time_of_day, float]
+
+
+def unroutable_pair_key(point_a: Text, point_b: Text) -> Text:
+    return f"{point_a}:{point_b}"
+
+
+def load_unroutable_pairs(path: Text, false_positive_rate: float = 1e-6) -> BloomFilter:
+    """
+    Loads station pairs with no route on any day, one `AAA:BBB` pair of crs codes per line, with
+    blank lines and `#` comments skipped.
+    """
+    with open(path) as f:
+        lines = (line.split("#")[0].strip() for line in f)
+        return BloomFilter.from_keys(
+            (line.replace(" ", "") for line in lines if line), false_positive_rate
+        )
+
+
+class NegativeCache:
+    """
+    Remembers the station pairs upstream found no route for, so that asking again fails fast.
+
+    Pairs are remembered per service day, as a pair with no trains on a Sunday may well have
+    some on Monday, and only for `ttl_secs` in case timetables change. Within the day, only
+    times past the earliest one found unroutable are, so that running out of trains late in the
+    evening does not rule out the morning. Pairs in the
+    `known_unroutable` filter have no route on any day, so are never asked for at all.
+    """
+
+    def __init__(
+        self,
+        ttl_secs: float,
+        max_entries: int = 10_000,
+        known_unroutable: Optional[BloomFilter] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ttl_secs = ttl_secs
+        self._max_entries = max_entries
+        self._known_unroutable = known_unroutable
+        self._clock = clock
+        self._entries: "OrderedDict[PairKey, PairEntry]" = OrderedDict()
+
+    def is_unroutable(self, point_a: Text, point_b: Text, datetime_of_interest: datetime) -> bool:
+        if (
+            self._known_unroutable is not None
+            and unroutable_pair_key(point_a, point_b) in self._known_unroutable
+        ):
+            NEGATIVE_CACHE_HITS.inc(source="known_unroutable")
+            return True
+
+        key = (point_a, point_b, datetime_of_interest.date())
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        unroutable_from, expires_at = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return False
+        if datetime_of_interest.time() < unroutable_from:
+            return False
+        NEGATIVE_CACHE_HITS.inc(source="ttl")
+        return True
+
+    def record_unroutable(
+        self, point_a: Text, point_b: Text, datetime_of_interest: datetime
+    ) -> None:
+        key = (point_a, point_b, datetime_of_interest.date())
+        unroutable_from = datetime_of_interest.time()
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry[1] > self._clock():
+            unroutable_from = min(unroutable_from, entry[0])
+        self._entries[key] = (unroutable_from, self._clock() + self._ttl_secs)
+        while len(self._entries) > self._max_entries:
+            # Entries all live as long, so the oldest expires first
+            self._entries.popitem(last=False)
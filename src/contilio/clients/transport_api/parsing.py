@@ -0,0 +1,123 @@
+import json
+import re
+from typing import Any, Callable, List, Optional, Protocol, Union
+
+JsonDecoder = Callable[[Union[bytes, str]], Any]
+
+# Smaller bodies decode whole faster than they scan
+STREAM_PARSE_MIN_BYTES = 64 * 1024
+
+# Only brackets and quotes matter to find where values start and end, strings being skipped
+# whole so that brackets within them do not count
+_STRUCTURAL = re.compile(rb'[{}\[\]"]')
+_ROUTE_RUN_END = re.compile(rb'["}]')
+_STRING_TAIL = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_QUOTE, _OPEN_OBJECT, _CLOSE_OBJECT, _OPEN_ARRAY, _CLOSE_ARRAY = b'"{}[]'
+_ROUTES_KEY = b"routes"
+
+
+def get_json_decoder() -> JsonDecoder:
+    """orjson when it is installed, as it decodes several times faster, json otherwise."""
+    try:
+        import orjson
+    except ImportError:
+        return json.loads
+    return orjson.loads
+
+
+class ResponseParser(Protocol):
+    def feed(self, chunk: bytes) -> bool:
+        """Takes the next chunk of the body, and tells whether the rest is needed at all."""
+        ...
+
+    def result(self) -> Any:
+        ...
+
+
+class RoutesExtractor(ResponseParser):
+    """
+    Picks the first `max_routes` routes out of a public journey response as it streams in.
+
+    Public journey responses list every route with all of its parts, when the client only ever
+    reads the departure and arrival of the first one. The body is scanned for the top level
+    `routes` array, and only the routes wanted are decoded, as soon as each is complete, so
+    that the rest of the body need not even be read. Bodies without enough routes, such as
+    errors, are decoded whole once they have been read in full.
+    """
+
+    def __init__(self, max_routes: int = 1, decoder: Optional[JsonDecoder] = None) -> None:
+        self._max_routes = max_routes
+        self._decode = decoder or get_json_decoder()
+        self._buffer = bytearray()
+        self._position = 0
+        self._depth = 0
+        self._last_key_span = (0, 0)
+        self._in_routes = False
+        self._route_start = 0
+        self._routes: List[Any] = []
+
+    @property
+    def done(self) -> bool:
+        return len(self._routes) >= self._max_routes
+
+    def feed(self, chunk: bytes) -> bool:
+        self._buffer += chunk
+        buffer = self._buffer
+        position, depth = self._position, self._depth
+        routes, max_routes = self._routes, self._max_routes
+        while len(routes) < max_routes:
+            if depth >= 3:
+                # Within a route, runs up to the next string or closing brace, such as lists of
+                # coordinates, cannot end it, so are skipped at once by counting brackets
+                run_end_match = _ROUTE_RUN_END.search(buffer, position)
+                run_end = len(buffer) if run_end_match is None else run_end_match.start()
+                depth += (
+                    buffer.count(b"[", position, run_end)
+                    + buffer.count(b"{", position, run_end)
+                    - buffer.count(b"]", position, run_end)
+                )
+                position = run_end
+                if run_end == len(buffer):
+                    break
+            match = _STRUCTURAL.search(buffer, position)
+            if match is None:
+                position = len(buffer)
+                break
+            index = match.start()
+            char = buffer[index]
+            if char == _QUOTE:
+                string_tail = _STRING_TAIL.match(buffer, index + 1)
+                if string_tail is None:
+                    # The rest of the string is yet to come
+                    position = index
+                    break
+                position = string_tail.end()
+                if depth == 1:
+                    # The last string before a value at the top level is always its key
+                    self._last_key_span = (index + 1, position - 1)
+                continue
+
+            position = index + 1
+            if char == _OPEN_ARRAY or char == _OPEN_OBJECT:
+                depth += 1
+                if depth == 2 and char == _OPEN_ARRAY:
+                    start, end = self._last_key_span
+                    self._in_routes = buffer[start:end] == _ROUTES_KEY
+                elif depth == 3 and self._in_routes and char == _OPEN_OBJECT:
+                    self._route_start = index
+            else:
+                depth -= 1
+                if depth == 2 and self._in_routes and char == _CLOSE_OBJECT:
+                    start = self._route_start
+                    routes.append(self._decode(bytes(buffer[start:position])))
+                elif depth == 1:
+                    self._in_routes = False
+        self._position, self._depth = position, depth
+        return not self.done
+
+    def result(self) -> Any:
+        if self.done:
+            return {"routes": self._routes}
+        if not self._buffer.strip():
+            return None
+        return self._decode(bytes(self._buffer))
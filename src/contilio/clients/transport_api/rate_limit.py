@@ -0,0 +1,136 @@
+import asyncio
+import heapq
+import itertools
+import time
+from enum import IntEnum
+from typing import Callable, List, Optional, Text, Tuple
+
+from contilio.metrics import REGISTRY
+
+QUEUED = REGISTRY.gauge(
+    "transportapi_rate_limit_queued", "Upstream requests waiting on the rate limiter", ["client"]
+)
+QUEUE_WAITS = REGISTRY.counter(
+    "transportapi_rate_limit_waits_total",
+    "Upstream requests let through by the rate limiter, by priority",
+    ["client", "priority"],
+)
+QUEUE_WAIT_SECONDS = REGISTRY.counter(
+    "transportapi_rate_limit_wait_seconds_total",
+    "Time upstream requests spent waiting on the rate limiter, by priority",
+    ["client", "priority"],
+)
+REJECTIONS = REGISTRY.counter(
+    "transportapi_rate_limit_rejections_total",
+    "Upstream requests rejected as they would have waited past their deadline, by priority",
+    ["client", "priority"],
+)
+
+
+class Priority(IntEnum):
+    """Lower values are let through first."""
+
+    INTERACTIVE = 0
+    PREFETCH = 1
+    SWEEP = 2
+
+
+class RateLimitExceededError(Exception):
+    """
+    Raised when a request would wait on the rate limiter for longer than its deadline.
+    """
+
+    pass
+
+
+Waiter = Tuple[int, int, "asyncio.Future[None]"]
+
+
+class TokenBucketRateLimiter:
+    """
+    Keeps the upstream requests of a worker within the calls per minute of the quota.
+
+    Tokens refill continuously up to `burst`, and each request takes one. Requests that have to
+    wait queue up by priority, first come first served within a priority, so that interactive
+    requests overtake background sweeps and prefetches.
+    """
+
+    def __init__(
+        self,
+        calls_per_minute: float,
+        burst: Optional[float] = None,
+        name: Text = "transportapi",
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self._rate = calls_per_minute / 60
+        self._burst = burst or max(1.0, self._rate)
+        self._clock = clock
+        self._tokens = self._burst
+        self._refilled_at = clock()
+        self._waiters: List[Waiter] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional["asyncio.Task[None]"] = None
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self._burst, self._tokens + (now - self._refilled_at) * self._rate)
+        self._refilled_at = now
+
+    def _expected_wait_secs(self, priority: Priority) -> float:
+        ahead = sum(1 for waiter_priority, _, _ in self._waiters if waiter_priority <= priority)
+        return max(0.0, (ahead + 1 - self._tokens) / self._rate)
+
+    def try_acquire(self) -> bool:
+        """Takes a token only if one is available straight away and nobody is queued."""
+        self._refill()
+        if self._waiters or self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def acquire(
+        self, priority: Priority = Priority.INTERACTIVE, deadline_secs: Optional[float] = None
+    ) -> None:
+        """
+        :raises RateLimitExceededError: straight away, if the request is expected to wait past
+            its deadline
+        """
+        if self.try_acquire():
+            QUEUE_WAITS.inc(client=self.name, priority=priority.name.lower())
+            return
+
+        if deadline_secs is not None and self._expected_wait_secs(priority) > deadline_secs:
+            REJECTIONS.inc(client=self.name, priority=priority.name.lower())
+            raise RateLimitExceededError(
+                f"TransportApi rate limit would hold a {priority.name.lower()} request "
+                f"for longer than {deadline_secs}s"
+            )
+
+        queued_at = self._clock()
+        future: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        QUEUED.inc(client=self.name)
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+        try:
+            await future
+        finally:
+            QUEUED.dec(client=self.name)
+        QUEUE_WAITS.inc(client=self.name, priority=priority.name.lower())
+        QUEUE_WAIT_SECONDS.inc(
+            self._clock() - queued_at, client=self.name, priority=priority.name.lower()
+        )
+
+    async def _dispatch(self) -> None:
+        while self._waiters:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self._rate)
+                continue
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                # The waiter was cancelled, so the token stays
+                continue
+            self._tokens -= 1
+            future.set_result(None)
@@ -0,0 +1,124 @@
+import random
+import time
+from dataclasses import dataclass
+from enum import Enum
+from threading import Lock
+from typing import Callable, Text
+
+from contilio.metrics import REGISTRY
+
+RETRIES = REGISTRY.counter(
+    "transportapi_retries_total", "Upstream requests retried after a transient failure", ["client"]
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    "transportapi_circuit_breaker_state",
+    "Circuit breaker state, 0 when closed, 1 when half open and 2 when open",
+    ["client"],
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    "transportapi_circuit_breaker_transitions_total",
+    "Circuit breaker state changes, by state changed to",
+    ["client", "state"],
+)
+CIRCUIT_REJECTIONS = REGISTRY.counter(
+    "transportapi_circuit_breaker_rejections_total",
+    "Upstream requests failed fast as the circuit breaker was open",
+    ["client"],
+)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: before retry n, sleep a random time of up to
+    `base_delay_secs * 2 ** (n - 1)`, capped at `max_delay_secs`.
+    """
+
+    max_attempts: int = 3
+    base_delay_secs: float = 0.2
+    max_delay_secs: float = 2.0
+
+    def backoff_secs(self, attempt: int) -> float:
+        """
+        :param attempt: the attempt that just failed, starting at 1
+        :return: how long to sleep before the next attempt
+        """
+        return random.uniform(
+            0, min(self.max_delay_secs, self.base_delay_secs * 2 ** (attempt - 1))
+        )
+
+
+class CircuitState(Enum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitBreaker:
+    """
+    Fails upstream requests fast once too many failed in a row.
+
+    After `failure_threshold` consecutive failures the circuit opens, and requests are rejected
+    without being made. Once `reset_timeout_secs` passed, a single probe request is let through
+    with the circuit half open: closing it again if it succeeds, re-opening it if not.
+    """
+
+    def __init__(
+        self,
+        name: Text = "transportapi",
+        failure_threshold: int = 5,
+        reset_timeout_secs: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout_secs = reset_timeout_secs
+        self._clock = clock
+        self._lock = Lock()
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.state = CircuitState.CLOSED
+        CIRCUIT_STATE.set(self.state.value, client=name)
+
+    def _transition(self, state: CircuitState) -> None:
+        if state is not self.state:
+            self.state = state
+            CIRCUIT_STATE.set(state.value, client=self.name)
+            CIRCUIT_TRANSITIONS.inc(client=self.name, state=state.name.lower())
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state is CircuitState.OPEN:
+                if self._clock() - self._opened_at < self._reset_timeout_secs:
+                    CIRCUIT_REJECTIONS.inc(client=self.name)
+                    return False
+                self._transition(CircuitState.HALF_OPEN)
+            if self.state is CircuitState.HALF_OPEN:
+                if self._probing:
+                    CIRCUIT_REJECTIONS.inc(client=self.name)
+                    return False
+                self._probing = True
+            return True
+
+    def record_cancelled(self) -> None:
+        """Lets another request probe, as the request let through gave up before its outcome."""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive_failures = 0
+            self._probing = False
+            self._transition(CircuitState.CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive_failures += 1
+            if (
+                self.state is CircuitState.HALF_OPEN
+                or self._consecutive_failures >= self._failure_threshold
+            ):
+                self._opened_at = self._clock()
+                self._probing = False
+                self._transition(CircuitState.OPEN)
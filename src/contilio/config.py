@@ -1,4 +1,4 @@
-from typing import Text
+from typing import Optional, Text
 
 from pydantic import BaseModel
 
@@ -14,7 +14,39 @@ class RequiredEnviron(BaseModel):
     JP_RUN_ALEMBIC_MIGRATIONS: bool
     TRANSPORT_API_APP_ID: Text
     TRANSPORT_API_APP_KEY: Text
+    TRANSPORT_API_BASE_URL: Optional[Text] = None
     ALEMBIC_TRANSACTION_PER_MIGRATION: bool = True
     NUM_UVICORN_WORKERS: int = 1
+    NUM_ROUTING_PROCESSES: int = 2
+    JP_TASK_EXECUTOR_MAX_WORKERS: int = 16
+    JP_TASK_EXECUTOR_MIN_WORKERS: int = 4
+    JP_TASK_EXECUTOR_ADAPTIVE: bool = False
+    TRANSPORT_API_CALLS_PER_MINUTE: int = 30
+    TRANSPORT_API_RATE_LIMIT_BURST: int = 5
+    TRANSPORT_API_INITIAL_CONCURRENCY: int = 8
+    TRANSPORT_API_MAX_CONCURRENCY: int = 64
+    TRANSPORT_API_MAX_ATTEMPTS: int = 3
+    TRANSPORT_API_RETRY_BASE_DELAY_SECS: float = 0.2
+    TRANSPORT_API_RETRY_MAX_DELAY_SECS: float = 2.0
+    TRANSPORT_API_BREAKER_FAILURE_THRESHOLD: int = 5
+    TRANSPORT_API_BREAKER_RESET_SECS: float = 30
+    TRANSPORT_API_HEDGING: bool = False
+    TRANSPORT_API_HEDGE_QUANTILE: float = 0.95
+    TRANSPORT_API_HEDGE_BUDGET: float = 0.05
+    TRANSPORT_API_NEGATIVE_CACHE_TTL_SECS: float = 3600
+    TRANSPORT_API_UNROUTABLE_PAIRS_FILE: Optional[Text] = None
+    JP_SWEEP_LEGS: Text = ""
+    JP_SWEEP_HORIZON_HOURS: int = 6
+    JP_SWEEP_INTERVAL_MINUTES: int = 60
+    JP_SPECULATIVE_PREFETCH: bool = False
+    JP_LEG_DEADLINE_SECS: Optional[float] = None
+    JP_ROUTE_FILTER_FILE_NAME: Optional[Text] = None
+    JP_ROUTE_FILTER_CAPACITY: int = 1_000_000
+    JP_ROUTE_FILTER_FALSE_POSITIVE_RATE: float = 0.01
+    JP_CAPTURE_FILE: Optional[Text] = None
+    JP_TRACE_FILE: Optional[Text] = None
+    JP_TRACE_ENDPOINT: Optional[Text] = None
+    JP_TRACE_SAMPLE_RATIO: float = 1.0
+    JP_SERVER_TIMING: bool = False
     SERVICE_PORT: int = 5002
     ALEMBIC_DIRECTORY: Text = "journey_planner"
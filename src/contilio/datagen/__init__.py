@@ -0,0 +1,3 @@
+from contilio.datagen.routes import SyntheticRouteCache, populate
+
+__all__ = ("SyntheticRouteCache", "populate")
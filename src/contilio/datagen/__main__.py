@@ -0,0 +1,79 @@
+"""
+Fills the journey planner database with a made up route cache of `--rows` rows, to see how its
+indexes and queries hold up at production scale.
+
+    python -m contilio.datagen --rows 5000000 --database scale.db
+
+The schema is built by the journey planner's alembic migrations, so the service finds the
+database at their latest revision as it starts. Workers of the service only read the hashes of
+cached routes into their route filter as they start, so start the service on the database once
+it is filled, or restart it.
+"""
+import argparse
+import time
+from datetime import datetime
+from logging import INFO, basicConfig, getLogger
+
+import sqlalchemy as sqla
+from alembic import command
+
+from contilio.datagen.routes import SyntheticRouteCache, populate
+from contilio.persistence.journey_planner import JourneyPlannerPersistence
+from contilio.utils.db_connection import alembic_config
+
+logger = getLogger(__name__)
+
+
+def arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument(
+        "--database", required=True, help="sqlite file to fill, created if need be"
+    )
+    parser.add_argument("--stations", type=int, default=500)
+    parser.add_argument("--routes", type=int, default=2000)
+    parser.add_argument("--max-legs", type=int, default=4)
+    parser.add_argument(
+        "--first-day", type=datetime.fromisoformat, help="YYYY-MM-DD, defaults to today"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--batch-size", type=int, default=50_000, help="rows per transaction")
+    return parser
+
+
+def main(args: argparse.Namespace) -> None:
+    engine = sqla.create_engine(f"sqlite:///{args.database}")
+    upgrade(engine)
+
+    route_cache = SyntheticRouteCache(
+        num_stations=args.stations,
+        num_routes=args.routes,
+        max_legs=args.max_legs,
+        first_day=args.first_day,
+        seed=args.seed,
+    )
+    started_at = time.monotonic()
+    written = populate(
+        JourneyPlannerPersistence(engine), route_cache.records(), args.rows, args.batch_size
+    )
+    logger.info(
+        "Wrote %s rows over %s legs and %s routes to %s in %.0fs",
+        written,
+        len(route_cache.legs),
+        len(route_cache.routes),
+        args.database,
+        time.monotonic() - started_at,
+    )
+
+
+def upgrade(engine: sqla.engine.Engine) -> None:
+    """Migrates the database of `engine` to the latest schema, stamping it as alembic would"""
+    cfg = alembic_config("journey_planner")
+    with engine.begin() as connection:
+        cfg.attributes["connection"] = connection
+        command.upgrade(cfg, "heads")
+
+
+if __name__ == "__main__":
+    basicConfig(level=INFO)
+    main(arg_parser().parse_args())
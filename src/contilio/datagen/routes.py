@@ -0,0 +1,115 @@
+import random
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from contilio.api.graph_ql.query import MAX_WAIT_TIME_IN_MINUTES
+from contilio.domain.enums import UKTrainStationCode
+from contilio.persistence.protocol import Persistence, RouteRecord
+from contilio.transport_api_stub.timetable import LegTimetable, SyntheticTimetable
+from contilio.utils.hasher import generate_hash
+
+Leg = Tuple[UKTrainStationCode, UKTrainStationCode]
+
+
+class SyntheticRouteCache:
+    """
+    Makes up the routes the journey planner would have cached after serving `num_routes`
+    routes between `num_stations` of `UKTrainStationCode` for days on end, from `first_day`.
+
+    Every leg gets all its departures of the day, as looked up leg by leg, after the timetable
+    the TransportApi stub answers from. Routes of more than one leg also get a row for every
+    prefix of two legs or more, for each departure from their first station, arriving when
+    connecting at the first train after each arrival does, as `journey_plan` writes them. As
+    there, a prefix waiting longer than `MAX_WAIT_TIME_IN_MINUTES` for a connection, and any
+    longer prefix, is left out.
+    """
+
+    def __init__(
+        self,
+        num_stations: int = 500,
+        num_routes: int = 2000,
+        max_legs: int = 4,
+        first_day: Optional[datetime] = None,
+        seed: int = 0,
+    ) -> None:
+        if max_legs < 1:
+            raise ValueError("Expected at least a leg per route")
+        rand = random.Random(seed)
+        stations = list(UKTrainStationCode)
+        rand.shuffle(stations)
+        stations = stations[: max(num_stations, max_legs + 1)]
+        self.routes: List[List[UKTrainStationCode]] = [
+            rand.sample(stations, rand.randint(1, max_legs) + 1) for _ in range(num_routes)
+        ]
+        self.timetable = SyntheticTimetable(seed=seed, unroutable_ratio=0)
+        self.legs: Dict[Leg, LegTimetable] = {
+            (a, b): self._leg(a, b) for route in self.routes for a, b in zip(route, route[1:])
+        }
+        self.max_wait = timedelta(minutes=MAX_WAIT_TIME_IN_MINUTES)
+        first_day = first_day or datetime.now()
+        self.first_day = datetime.combine(first_day.date(), datetime.min.time())
+
+    def _leg(self, origin: UKTrainStationCode, destination: UKTrainStationCode) -> LegTimetable:
+        leg = self.timetable.leg(origin.name, destination.name)
+        assert leg is not None, "Every leg is served without unroutable pairs"
+        return leg
+
+    def _departures_on(self, leg: LegTimetable, day: datetime) -> List[Tuple[datetime, datetime]]:
+        trains = (leg.last_departure_in_minutes - leg.first_departure_in_minutes) // (
+            leg.headway_in_minutes
+        )
+        return leg.departures_from(day, trains + 1)
+
+    def _prefixes(
+        self, route: Sequence[UKTrainStationCode], day: datetime
+    ) -> Iterator[RouteRecord]:
+        hashes = [generate_hash(list(route[: i + 1])) for i in range(2, len(route))]
+        connections = [self.legs[leg] for leg in zip(route[1:], route[2:])]
+        for departure_at, arrival_at in self._departures_on(self.legs[route[0], route[1]], day):
+            for prefix_hash, connection in zip(hashes, connections):
+                [(connecting_at, connection_arrival_at)] = connection.departures_from(
+                    arrival_at, 1
+                )
+                if connecting_at - arrival_at > self.max_wait:
+                    break
+                arrival_at = connection_arrival_at
+                yield RouteRecord(
+                    hashed=prefix_hash, departure_at=departure_at, arrival_at=arrival_at
+                )
+
+    def day(self, day: datetime) -> Iterator[RouteRecord]:
+        for (origin, destination), leg in self.legs.items():
+            leg_hash = generate_hash([origin, destination])
+            for departure_at, arrival_at in self._departures_on(leg, day):
+                yield RouteRecord(
+                    hashed=leg_hash,
+                    departure_at=departure_at,
+                    arrival_at=arrival_at,
+                    origin_crs=origin.name,
+                    destination_crs=destination.name,
+                )
+        for route in self.routes:
+            if len(route) > 2:
+                yield from self._prefixes(route, day)
+
+    def records(self) -> Iterator[RouteRecord]:
+        """Day after day of routes, without end."""
+        day = self.first_day
+        while True:
+            yield from self.day(day)
+            day += timedelta(days=1)
+
+
+def populate(
+    persistence: Persistence, records: Iterator[RouteRecord], rows: int, batch_size: int = 50_000
+) -> int:
+    """Writes the first `rows` records in batches, each in a transaction of its own."""
+    written = 0
+    while written < rows:
+        batch = list(islice(records, min(batch_size, rows - written)))
+        if not batch:
+            break
+        persistence.write_routes(batch)
+        written += len(batch)
+    return written
@@ -0,0 +1,7 @@
+from contilio.jobs.timetable_sweep import LegCoverage, TimetableSweeper, parse_legs
+
+__all__ = (
+    "LegCoverage",
+    "TimetableSweeper",
+    "parse_legs",
+)
@@ -0,0 +1,148 @@
+import asyncio
+import logging
+from concurrent.futures._base import Executor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Text, Tuple, TypeVar
+
+from contilio.clients.transport_api import Priority, TransportApiClient
+from contilio.domain.enums import UKTrainStationCode
+from contilio.persistence.protocol import PersistenceFactory, RouteRecord
+from contilio.utils.hasher import generate_hash
+
+logger = logging.getLogger(__name__)
+
+Leg = Tuple[UKTrainStationCode, UKTrainStationCode]
+
+T = TypeVar("T")
+
+
+def parse_legs(legs: Text) -> List[Leg]:
+    """
+    Parses legs given as comma separated pairs of crs codes, such as `LBG:SAJ,SAJ:ABW`.
+
+    :raises ValueError: when a pair is malformed or a code is not within `UKTrainStationCode`
+    """
+    parsed = []
+    for pair in filter(None, (p.strip() for p in legs.split(","))):
+        try:
+            point_a, point_b = pair.split(":")
+            parsed.append(
+                (UKTrainStationCode[point_a.strip()], UKTrainStationCode[point_b.strip()])
+            )
+        except (KeyError, ValueError):
+            raise ValueError(f"Invalid leg to sweep: {pair}")
+    return parsed
+
+
+@dataclass(frozen=True)
+class LegCoverage:
+    origin_crs: Text
+    destination_crs: Text
+    departures: int
+    new_departures: int
+    swept_until: datetime
+    largest_gap_in_minutes: Optional[float]
+
+
+class TimetableSweeper:
+    """
+    Pre-populates the cache with every departure of a few hot legs over the next hours.
+
+    `journey_plan` only ever asks upstream for the first departure after a given time, so the
+    cache fills one departure at a time. The sweeper instead pages through whole departure
+    boards, resuming each leg from where its previous sweep got to, and bulk inserts whatever
+    is not cached yet. Upstream requests go at sweep priority, so that they only take whatever
+    rate limit interactive requests leave over, however long they have to wait for it.
+    """
+
+    def __init__(
+        self,
+        legs: List[Leg],
+        persistence_factory: PersistenceFactory,
+        transportapi_client: TransportApiClient,
+        task_executor: Executor,
+        horizon: timedelta,
+        interval: timedelta,
+    ) -> None:
+        self._legs = legs
+        self._persistence_factory = persistence_factory
+        self._transportapi_client = transportapi_client
+        self._task_executor = task_executor
+        self._horizon = horizon
+        self._interval = interval
+        self._swept_until: Dict[Leg, datetime] = {}
+
+    async def _run_blocking(self, f: Callable[[], T]) -> T:
+        return await asyncio.get_event_loop().run_in_executor(self._task_executor, f)
+
+    async def sweep_leg(self, leg: Leg, now: datetime) -> LegCoverage:
+        point_a, point_b = leg
+        leg_hash = generate_hash([point_a, point_b])
+        horizon_end = now + self._horizon
+        persistence = self._persistence_factory.create()
+
+        cached_legs = await self._run_blocking(
+            lambda: persistence.read_routes(leg_hash, now, horizon_end)
+        )
+
+        sweep_from = max(now, self._swept_until.get(leg, now))
+        route_plans = await self._transportapi_client.get_train_route_plans(
+            point_a.name,
+            point_b.name,
+            sweep_from,
+            horizon_end,
+            priority=Priority.SWEEP,
+            deadline_secs=None,
+        )
+
+        cached_departures = {cached_leg.departure_at.timestamp() for cached_leg in cached_legs}
+        new_routes = [
+            RouteRecord(
+                hashed=leg_hash,
+                departure_at=route_plan.departure_at,
+                arrival_at=route_plan.arrival_at,
+                origin_crs=point_a.name,
+                destination_crs=point_b.name,
+            )
+            for route_plan in route_plans
+            if route_plan.departure_at.timestamp() not in cached_departures
+        ]
+        await self._run_blocking(lambda: persistence.write_routes(new_routes))
+        if route_plans:
+            # Paging stops short of the horizon at its page cap or on an upstream error, so the
+            # next sweep resumes past the last departure returned, as the next page would have
+            last_departure = datetime.fromtimestamp(
+                route_plans[-1].departure_at.timestamp(), tz=now.tzinfo
+            )
+            self._swept_until[leg] = last_departure + timedelta(minutes=1)
+
+        departures = sorted(cached_departures | {r.departure_at.timestamp() for r in new_routes})
+        gaps = [(later - earlier) / 60 for earlier, later in zip(departures, departures[1:])]
+        return LegCoverage(
+            origin_crs=point_a.name,
+            destination_crs=point_b.name,
+            departures=len(departures),
+            new_departures=len(new_routes),
+            swept_until=self._swept_until.get(leg, sweep_from),
+            largest_gap_in_minutes=max(gaps, default=None),
+        )
+
+    async def sweep(self, now: Optional[datetime] = None) -> List[LegCoverage]:
+        now = now or datetime.now()
+        coverage = []
+        for leg in self._legs:
+            try:
+                leg_coverage = await self.sweep_leg(leg, now)
+            except Exception:
+                logger.exception("Failed sweeping leg %s:%s", leg[0].name, leg[1].name)
+                continue
+            logger.info("Swept leg coverage: %s", leg_coverage)
+            coverage.append(leg_coverage)
+        return coverage
+
+    async def run_forever(self) -> None:
+        """Sweeps straight away, then once every interval, until cancelled."""
+        while True:
+            await self.sweep()
+            await asyncio.sleep(self._interval.total_seconds())
@@ -23,7 +23,10 @@ target_metadata = Base.metadata
 # ... etc.
 
 dotenv.load_dotenv()
-ENV = RequiredEnviron.parse_obj(os.environ)
+
+
+def environment() -> RequiredEnviron:
+    return RequiredEnviron.parse_obj(os.environ)
 
 
 def run_migrations_offline() -> None:
@@ -39,13 +42,25 @@ def run_migrations_offline() -> None:
 
     """
 
-    connectable = create_engine(ENV)
+    env = environment()
+    connectable = create_engine(env)
     context.configure(
         url=connectable.url,
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
-        transaction_per_migration=ENV.ALEMBIC_TRANSACTION_PER_MIGRATION,
+        transaction_per_migration=env.ALEMBIC_TRANSACTION_PER_MIGRATION,
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_on(connection, transaction_per_migration: bool) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=transaction_per_migration,
     )
 
     with context.begin_transaction():
@@ -58,18 +73,20 @@ def run_migrations_online() -> None:
     In this scenario we need to create an Engine
     and associate a connection with the context.
 
+    A connection handed in through `config.attributes["connection"]` is migrated instead, for
+    tools such as `contilio.datagen` that build databases other than the service's own.
+
     """
-    connectable = create_engine(ENV)
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        run_migrations_on(connection, transaction_per_migration=True)
+        return
+
+    env = environment()
+    connectable = create_engine(env)
 
     with connectable.connect() as connection:
-        context.configure(
-            connection=connection,
-            target_metadata=target_metadata,
-            transaction_per_migration=ENV.ALEMBIC_TRANSACTION_PER_MIGRATION,
-        )
-
-        with context.begin_transaction():
-            context.run_migrations()
+        run_migrations_on(connection, env.ALEMBIC_TRANSACTION_PER_MIGRATION)
 
 
 if context.is_offline_mode():
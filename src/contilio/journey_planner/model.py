@@ -4,6 +4,7 @@ from sqlalchemy.ext.declarative import declarative_base
 Base = declarative_base()
 
 ROUTE_HASH_LEN = 256
+CRS_CODE_LEN = 3
 
 
 class Route(Base):  # type: ignore
@@ -15,6 +16,8 @@ class Route(Base):  # type: ignore
         hash: hash of entire route from source to destination
         departure_at: date and time leaving source
         arrival_at: date and time arriving at destination
+        origin_crs: crs code of the source station, only set on single legs
+        destination_crs: crs code of the destination station, only set on single legs
     """
 
     __tablename__ = "route"
@@ -23,5 +26,31 @@ class Route(Base):  # type: ignore
     hashed = sqla.Column(sqla.String(ROUTE_HASH_LEN), nullable=False)
     departure_at = sqla.Column(sqla.DateTime, nullable=False)
     arrival_at = sqla.Column(sqla.DateTime, nullable=False)
+    origin_crs = sqla.Column(sqla.String(CRS_CODE_LEN), nullable=True)
+    destination_crs = sqla.Column(sqla.String(CRS_CODE_LEN), nullable=True)
 
-    __table_args__ = (sqla.Index("idx_hashed_departure_at", "hashed", "departure_at"),)
+    __table_args__ = (
+        sqla.Index("idx_hashed_departure_at", "hashed", "departure_at"),
+        sqla.Index("idx_origin_crs_departure_at", "origin_crs", "departure_at"),
+    )
+
+
+class LegStatistics(Base):  # type: ignore
+    """
+    Statistics of a single leg, between two adjacent stations, kept up to date on every write.
+
+    This table stores:
+        origin_crs: crs code of the source station
+        destination_crs: crs code of the destination station
+        count: number of departures recorded
+        statistics: json encoded duration sketch and departures by hour of day
+        updated_at: date and time of the last departure recorded
+    """
+
+    __tablename__ = "leg_statistics"
+
+    origin_crs = sqla.Column(sqla.String(CRS_CODE_LEN), primary_key=True)
+    destination_crs = sqla.Column(sqla.String(CRS_CODE_LEN), primary_key=True)
+    count = sqla.Column(sqla.Integer, nullable=False)
+    statistics = sqla.Column(sqla.Text, nullable=False)
+    updated_at = sqla.Column(sqla.DateTime, nullable=False)
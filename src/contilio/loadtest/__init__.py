@@ -0,0 +1,12 @@
+from contilio.loadtest.report import LoadTestResults, percentile
+from contilio.loadtest.runner import aiohttp_sender, run_load
+from contilio.loadtest.workload import JourneyPlanRequest, Workload
+
+__all__ = (
+    "JourneyPlanRequest",
+    "LoadTestResults",
+    "Workload",
+    "aiohttp_sender",
+    "percentile",
+    "run_load",
+)
@@ -0,0 +1,103 @@
+"""
+Drives the journeyPlan query of a running service with a made up mix of routes, and reports
+throughput, latency percentiles, errors and cache hits as json.
+
+    python -m contilio.loadtest --url http://localhost:5002/graphql --duration 30 --stub-port 5003
+
+With `--stub-port`, a TransportApi stub is served on that port for the duration of the test,
+which the service is to be pointed at with `TRANSPORT_API_BASE_URL`, and the cache hit ratio is
+worked out from the requests it gets.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+from aiohttp import web
+
+from contilio.loadtest.runner import aiohttp_sender, run_load
+from contilio.loadtest.workload import Workload
+from contilio.transport_api_stub import (
+    PROFILES,
+    SyntheticTimetable,
+    TransportApiStub,
+    create_stub_app,
+)
+
+
+def arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://localhost:5002/graphql")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--stations", type=int, default=200)
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument("--min-legs", type=int, default=1)
+    parser.add_argument("--max-legs", type=int, default=3)
+    parser.add_argument("--warm-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stub-port", type=int)
+    parser.add_argument("--stub-profile", choices=sorted(PROFILES), default="realistic")
+    parser.add_argument("--output", help="file to write the report to, stdout otherwise")
+    return parser
+
+
+async def load_test(args: argparse.Namespace) -> Dict[str, Any]:
+    workload = Workload(
+        num_stations=args.stations,
+        zipf_exponent=args.zipf_exponent,
+        min_legs=args.min_legs,
+        max_legs=args.max_legs,
+        warm_ratio=args.warm_ratio,
+        seed=args.seed,
+    )
+
+    stub: Optional[TransportApiStub] = None
+    stub_runner: Optional[web.AppRunner] = None
+    if args.stub_port is not None:
+        stub = TransportApiStub(
+            SyntheticTimetable(seed=args.seed), PROFILES[args.stub_profile], seed=args.seed
+        )
+        stub_runner = web.AppRunner(create_stub_app(stub), access_log=None)
+        await stub_runner.setup()
+        await web.TCPSite(stub_runner, "127.0.0.1", args.stub_port).start()
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            started_at = time.monotonic()
+            results = await run_load(
+                aiohttp_sender(session, args.url),
+                workload,
+                concurrency=args.concurrency,
+                duration_secs=args.duration,
+                max_requests=args.requests,
+            )
+            duration_secs = time.monotonic() - started_at
+    finally:
+        if stub_runner is not None:
+            await stub_runner.cleanup()
+
+    return results.report(
+        duration_secs,
+        upstream_requests=stub.requests if stub else None,
+        config={key: value for key, value in vars(args).items() if key != "output"},
+    )
+
+
+def main() -> None:
+    args = arg_parser().parse_args()
+    report = asyncio.run(load_test(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Sends the graphql operations of a capture file to a running service again, as far apart as they
+were received, or `--speedup` times closer, and reports as the load test does.
+
+    python -m contilio.loadtest.replay --capture capture.jsonl --url http://localhost:5002/graphql
+
+Capture the traffic of a service by running it with `JP_CAPTURE_FILE` set.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiohttp
+
+from contilio.api.capture import CapturedOperation, read_capture
+from contilio.loadtest.report import LoadTestResults
+from contilio.loadtest.runner import SendQuery, aiohttp_sender
+
+
+async def replay(
+    send: SendQuery, operations: Sequence[CapturedOperation], speedup: float = 1.0
+) -> LoadTestResults:
+    """
+    Sends every operation once its time since the first has passed, divided by `speedup`,
+    whether or not those before it are answered, as the clients that sent them did.
+    """
+    results = LoadTestResults()
+    if not operations:
+        return results
+
+    first_at = operations[0].at
+    started_at = time.monotonic()
+    in_flight: List[asyncio.Task] = []
+
+    async def issue(operation: CapturedOperation) -> None:
+        sent_at = time.perf_counter()
+        error = await send(operation.query, operation.variables, operation.operation_name)
+        results.record((time.perf_counter() - sent_at) * 1000, 0, False, error)
+
+    for operation in operations:
+        delay_secs = (operation.at - first_at) / speedup - (time.monotonic() - started_at)
+        if delay_secs > 0:
+            await asyncio.sleep(delay_secs)
+        in_flight.append(asyncio.create_task(issue(operation)))
+    await asyncio.gather(*in_flight)
+    return results
+
+
+def arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--capture", required=True, help="file captured with JP_CAPTURE_FILE")
+    parser.add_argument("--url", default="http://localhost:5002/graphql")
+    parser.add_argument("--speedup", type=float, default=1.0, help="times faster than captured")
+    parser.add_argument("--requests", type=int, help="only replay this many operations")
+    parser.add_argument("--output", help="file to write the report to, stdout otherwise")
+    return parser
+
+
+async def replay_capture(args: argparse.Namespace) -> Dict[str, Any]:
+    operations: List[CapturedOperation] = read_capture(args.capture)[: args.requests]
+    async with aiohttp.ClientSession() as session:
+        started_at = time.monotonic()
+        results = await replay(aiohttp_sender(session, args.url), operations, args.speedup)
+        duration_secs = time.monotonic() - started_at
+
+    captured_secs: Optional[float] = operations[-1].at - operations[0].at if operations else None
+    return results.report(
+        duration_secs,
+        config={
+            **{key: value for key, value in vars(args).items() if key != "output"},
+            "captured_secs": captured_secs,
+        },
+    )
+
+
+def main() -> None:
+    args = arg_parser().parse_args()
+    report = asyncio.run(replay_capture(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Text
+
+PERCENTILES = {"p50": 50, "p95": 95, "p99": 99, "p999": 99.9}
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of values sorted in ascending order."""
+    if not sorted_values:
+        return None
+    # Rounded first, so that float error does not push an exact rank up to the next one
+    rank = max(1, math.ceil(round(pct * len(sorted_values) / 100, 9)))
+    return sorted_values[rank - 1]
+
+
+@dataclass
+class LoadTestResults:
+    """What a load test saw of every request it sent."""
+
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: "Counter[Text]" = field(default_factory=Counter)
+    successes: int = 0
+    warm_requests: int = 0
+    legs_requested: int = 0
+
+    @property
+    def requests(self) -> int:
+        return self.successes + sum(self.errors.values())
+
+    def record(self, latency_ms: float, legs: int, warm: bool, error: Optional[Text]) -> None:
+        self.latencies_ms.append(latency_ms)
+        self.warm_requests += warm
+        if error is None:
+            self.successes += 1
+            self.legs_requested += legs
+        else:
+            self.errors[error] += 1
+
+    def report(
+        self,
+        duration_secs: float,
+        upstream_requests: Optional[int] = None,
+        config: Optional[Dict[Text, Any]] = None,
+    ) -> Dict[Text, Any]:
+        """
+        The machine readable report of the load test. The cache hit ratio is that of the legs of
+        successful requests answered without asking upstream, so it is only known when the
+        number of upstream requests is.
+        """
+        latencies_ms = sorted(self.latencies_ms)
+        requests = self.requests
+        return {
+            "config": config or {},
+            "duration_secs": round(duration_secs, 3),
+            "requests": requests,
+            "successes": self.successes,
+            "errors": requests - self.successes,
+            "error_rate": (requests - self.successes) / requests if requests else None,
+            "errors_by_type": dict(self.errors),
+            "rps": requests / duration_secs if duration_secs else None,
+            "latency_ms": {
+                **{name: percentile(latencies_ms, pct) for name, pct in PERCENTILES.items()},
+                "mean": sum(latencies_ms) / len(latencies_ms) if latencies_ms else None,
+                "max": latencies_ms[-1] if latencies_ms else None,
+            },
+            "cache": {
+                "warm_request_ratio": self.warm_requests / requests if requests else None,
+                "legs_requested": self.legs_requested,
+                "upstream_requests": upstream_requests,
+                "hit_ratio": (
+                    max(0.0, 1 - upstream_requests / self.legs_requested)
+                    if upstream_requests is not None and self.legs_requested
+                    else None
+                ),
+            },
+        }
@@ -0,0 +1,85 @@
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Dict, Optional, Text
+
+import aiohttp
+from typing_extensions import Protocol
+
+from contilio.loadtest.report import LoadTestResults
+from contilio.loadtest.workload import Workload
+
+
+class SendQuery(Protocol):
+    """Posts a graphql query, answering with the error it failed with, if any."""
+
+    def __call__(
+        self,
+        query: Text,
+        variables: Optional[Dict[Text, Any]] = None,
+        operation_name: Optional[Text] = None,
+    ) -> Awaitable[Optional[Text]]:
+        ...
+
+
+_CRS_CODE = re.compile(r"\b[A-Z]{3}\b")
+_NUMBER = re.compile(r"\d+")
+
+
+def graphql_error_type(body: Dict[Text, Any]) -> Optional[Text]:
+    errors = body.get("errors")
+    if not errors:
+        return None
+    # Messages embed station codes and times, which would tell apart errors of the same kind
+    message = errors[0].get("message", "unknown")
+    return _NUMBER.sub("<n>", _CRS_CODE.sub("<crs>", message))
+
+
+def aiohttp_sender(session: aiohttp.ClientSession, url: Text) -> SendQuery:
+    async def send(
+        query: Text,
+        variables: Optional[Dict[Text, Any]] = None,
+        operation_name: Optional[Text] = None,
+    ) -> Optional[Text]:
+        payload = {"query": query, "variables": variables, "operationName": operation_name}
+        try:
+            async with session.post(url, json=payload) as response:
+                body = await response.json(content_type=None)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return type(e).__name__
+        return graphql_error_type(body) or (
+            None if response.status < 400 else f"HTTP {response.status}"
+        )
+
+    return send
+
+
+async def run_load(
+    send: SendQuery,
+    workload: Workload,
+    concurrency: int,
+    duration_secs: Optional[float] = None,
+    max_requests: Optional[int] = None,
+) -> LoadTestResults:
+    """
+    Keeps `concurrency` requests in flight, each sent as soon as the one before it is answered,
+    until either the duration is up or the maximum number of requests is sent.
+    """
+    results = LoadTestResults()
+    deadline = None if duration_secs is None else time.monotonic() + duration_secs
+    sent = 0
+
+    async def worker() -> None:
+        nonlocal sent
+        while (deadline is None or time.monotonic() < deadline) and (
+            max_requests is None or sent < max_requests
+        ):
+            sent += 1
+            request = workload.next_request()
+            started_at = time.perf_counter()
+            error = await send(request.graphql_query())
+            latency_ms = (time.perf_counter() - started_at) * 1000
+            results.record(latency_ms, request.legs, request.warm, error)
+
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return results
@@ -0,0 +1,95 @@
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import accumulate
+from typing import List, Optional, Text, Tuple
+
+from contilio.api.graph_ql.query import DATETIME_FORMAT
+from contilio.domain.enums import UKTrainStationCode
+
+FIRST_HOUR_OF_INTEREST = 6
+LAST_HOUR_OF_INTEREST = 20
+MINUTES_GRANULARITY = 5
+
+
+@dataclass(frozen=True)
+class JourneyPlanRequest:
+    route_crs_ids: Tuple[Text, ...]
+    datetime_of_interest: datetime
+    warm: bool
+
+    @property
+    def legs(self) -> int:
+        return len(self.route_crs_ids) - 1
+
+    def graphql_query(self) -> Text:
+        return (
+            f"{{ journeyPlan(userInput: {{ routeCrsIds: [{', '.join(self.route_crs_ids)}], "
+            f'datetimeOfInterest: "{self.datetime_of_interest.strftime(DATETIME_FORMAT)}" }}) '
+            "{ arrivalTime } }"
+        )
+
+
+class Workload:
+    """
+    Makes up journey plan requests the way users would, most of them about a few busy stations.
+
+    Stations are drawn from `num_stations` of `UKTrainStationCode`, with Zipfian popularity of
+    exponent `zipf_exponent`. Routes have `min_legs` to `max_legs` legs, for a time of interest
+    during the day on the service day. A `warm_ratio` of requests repeat an earlier request,
+    which the cache should answer, while the others are new.
+    """
+
+    def __init__(
+        self,
+        num_stations: int = 200,
+        zipf_exponent: float = 1.1,
+        min_legs: int = 1,
+        max_legs: int = 3,
+        warm_ratio: float = 0.5,
+        service_day: Optional[datetime] = None,
+        seed: int = 0,
+    ) -> None:
+        if not 1 <= min_legs <= max_legs:
+            raise ValueError("Expected 1 <= min_legs <= max_legs")
+        self._random = random.Random(seed)
+        stations = [station.name for station in UKTrainStationCode]
+        self._random.shuffle(stations)
+        num_stations = max(num_stations, 2)
+        self.stations = stations[:num_stations]
+        self._cumulative_weights = list(
+            accumulate(1 / rank**zipf_exponent for rank in range(1, len(self.stations) + 1))
+        )
+        self._min_legs = min_legs
+        self._max_legs = max_legs
+        self._warm_ratio = warm_ratio
+        service_day = service_day or datetime.now() + timedelta(days=1)
+        self._service_day = datetime.combine(service_day.date(), datetime.min.time())
+        self._issued: List[JourneyPlanRequest] = []
+
+    def _station(self) -> Text:
+        return self._random.choices(self.stations, cum_weights=self._cumulative_weights)[0]
+
+    def _new_request(self) -> JourneyPlanRequest:
+        route = [self._station()]
+        for _ in range(self._random.randint(self._min_legs, self._max_legs)):
+            station = self._station()
+            while station == route[-1]:
+                station = self._station()
+            route.append(station)
+
+        slots = (LAST_HOUR_OF_INTEREST - FIRST_HOUR_OF_INTEREST) * 60 // MINUTES_GRANULARITY
+        minutes = FIRST_HOUR_OF_INTEREST * 60 + self._random.randrange(slots) * MINUTES_GRANULARITY
+        return JourneyPlanRequest(
+            route_crs_ids=tuple(route),
+            datetime_of_interest=self._service_day + timedelta(minutes=minutes),
+            warm=False,
+        )
+
+    def next_request(self) -> JourneyPlanRequest:
+        if self._issued and self._random.random() < self._warm_ratio:
+            issued = self._random.choice(self._issued)
+            return JourneyPlanRequest(issued.route_crs_ids, issued.datetime_of_interest, warm=True)
+        request = self._new_request()
+        self._issued.append(request)
+        return request
@@ -0,0 +1,16 @@
+from contilio.metrics.cost import RequestCost, current_request_cost, measure_request_cost
+from contilio.metrics.exposition import CONTENT_TYPE, render
+from contilio.metrics.registry import REGISTRY, Counter, Gauge, Histogram, MetricsRegistry
+
+__all__ = (
+    "CONTENT_TYPE",
+    "REGISTRY",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "RequestCost",
+    "current_request_cost",
+    "measure_request_cost",
+    "render",
+)
@@ -0,0 +1,71 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Text
+
+
+class RequestCost:
+    """
+    What a single request cost: time spent on the db and upstream, summed over every call and
+    hedges included, how many of each it made, the time its blocking calls waited for a thread
+    of the task executor, and how every leg it planned was found.
+
+    Calls running on executor threads add to it alongside the request, hence the lock.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.db_secs = 0.0
+        self.db_calls = 0
+        self.upstream_secs = 0.0
+        self.upstream_calls = 0
+        self.executor_wait_secs = 0.0
+        self.legs: List[Dict[Text, Text]] = []
+
+    def add_db_call(self, secs: float) -> None:
+        with self._lock:
+            self.db_secs += secs
+            self.db_calls += 1
+
+    def add_upstream_call(self, secs: float) -> None:
+        with self._lock:
+            self.upstream_secs += secs
+            self.upstream_calls += 1
+
+    def add_executor_wait(self, secs: float) -> None:
+        with self._lock:
+            self.executor_wait_secs += secs
+
+    def add_leg(self, origin: Text, destination: Text, cache: Text) -> None:
+        with self._lock:
+            self.legs.append({"origin": origin, "destination": destination, "cache": cache})
+
+    def to_dict(self) -> Dict[Text, Any]:
+        with self._lock:
+            return {
+                "dbMs": round(self.db_secs * 1000, 3),
+                "dbCalls": self.db_calls,
+                "upstreamMs": round(self.upstream_secs * 1000, 3),
+                "upstreamCalls": self.upstream_calls,
+                "executorWaitMs": round(self.executor_wait_secs * 1000, 3),
+                "legs": [dict(leg) for leg in self.legs],
+            }
+
+
+_request_cost: ContextVar[Optional[RequestCost]] = ContextVar("request_cost", default=None)
+
+
+def current_request_cost() -> Optional[RequestCost]:
+    """The cost of the request being served, if it is being measured."""
+    return _request_cost.get()
+
+
+@contextmanager
+def measure_request_cost() -> Iterator[RequestCost]:
+    """Measures the cost of whatever runs within the block, tasks and executor calls included."""
+    cost = RequestCost()
+    token = _request_cost.set(cost)
+    try:
+        yield cost
+    finally:
+        _request_cost.reset(token)
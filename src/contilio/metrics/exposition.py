@@ -0,0 +1,44 @@
+import math
+from typing import Dict, List, Text
+
+from contilio.metrics.registry import Histogram, MetricsRegistry
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: Text) -> Text:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[Text, Text]) -> Text:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _number(value: float) -> Text:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render(registry: MetricsRegistry) -> Text:
+    """Every metric of the registry, in the Prometheus text exposition format."""
+    lines: List[Text] = []
+    for metric in sorted(registry.metrics(), key=lambda metric: metric.name):
+        lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+        lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+        if isinstance(metric, Histogram):
+            for labels, sample in sorted(metric.samples(), key=lambda s: sorted(s[0].items())):
+                cumulative = 0
+                bounds = [*metric.buckets, math.inf]
+                for bound, bucket_count in zip(bounds, sample.bucket_counts):
+                    cumulative += bucket_count
+                    bucket_labels = _labels({**labels, "le": _number(bound)})
+                    lines.append(f"{metric.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{metric.name}_sum{_labels(labels)} {_number(sample.sum)}")
+                lines.append(f"{metric.name}_count{_labels(labels)} {sample.count}")
+            continue
+        for labels, value in sorted(metric.samples(), key=lambda s: sorted(s[0].items())):
+            lines.append(f"{metric.name}{_labels(labels)} {_number(value)}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,262 @@
+import operator
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import contextmanager
+from threading import Lock
+from typing import Callable, Dict, Generic, Iterator, List, Sequence, Text, Tuple, TypeVar, Union
+
+LabelValues = Tuple[Text, ...]
+
+# Latencies of anything from a cached read to an upstream call, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+V = TypeVar("V")
+
+
+class _ShardOwner:
+    """Held by a thread in its locals only, so that it goes as soon as the thread ends."""
+
+
+class _ThreadShards(Generic[V]):
+    """
+    Values by labels, kept apart for every thread writing them, so that threads never wait on
+    one another to write. Only the thread owning a shard writes to it, while reads add up the
+    shards of all threads, copied whole under the GIL.
+
+    As a thread ends, its shard is folded with `add` into a shard of all the threads gone, so
+    that threads coming and going, as those of an adaptive pool do, leave no shards behind.
+    """
+
+    def __init__(self, add: Callable[[V, V], V]) -> None:
+        self._add = add
+        self._local = threading.local()
+        self._lock = Lock()
+        self._shards: Dict[int, Dict[LabelValues, V]] = {}
+        self._ended: Dict[LabelValues, V] = {}
+
+    def shard(self) -> Dict[LabelValues, V]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values: Dict[LabelValues, V] = {}
+            self._local.values = values
+            self._local.owner = owner = _ShardOwner()
+            with self._lock:
+                self._shards[id(values)] = values
+            weakref.finalize(owner, self._fold, values)
+            return values
+
+    def _fold(self, values: Dict[LabelValues, V]) -> None:
+        with self._lock:
+            del self._shards[id(values)]
+            # A new shard rather than one added to, so that reads can go on outside the lock
+            ended = dict(self._ended)
+            for key, value in values.items():
+                ended[key] = self._add(ended[key], value) if key in ended else value
+            self._ended = ended
+
+    def shards(self) -> List[Dict[LabelValues, V]]:
+        with self._lock:
+            shards = [self._ended, *self._shards.values()]
+        return [dict(shard) for shard in shards]
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: Text, documentation: Text, label_names: Sequence[Text] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+
+    def _label_values(self, labels: Dict[Text, Text]) -> LabelValues:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def _labels(self, key: LabelValues) -> Dict[Text, Text]:
+        return dict(zip(self.label_names, key))
+
+
+class Counter(_Metric):
+    """A value that only ever goes up, such as the number of requests made."""
+
+    metric_type = "counter"
+
+    def __init__(self, name: Text, documentation: Text, label_names: Sequence[Text] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        self._values: _ThreadShards[float] = _ThreadShards(operator.add)
+
+    def inc(self, amount: float = 1, **labels: Text) -> None:
+        key = self._label_values(labels)
+        shard = self._values.shard()
+        shard[key] = shard.get(key, 0) + amount
+
+    def _totals(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for shard in self._values.shards():
+            for key, value in shard.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def value(self, **labels: Text) -> float:
+        return self._totals().get(self._label_values(labels), 0)
+
+    def samples(self) -> List[Tuple[Dict[Text, Text], float]]:
+        return [(self._labels(key), value) for key, value in self._totals().items()]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down, such as the state of a circuit breaker."""
+
+    metric_type = "gauge"
+
+    def __init__(self, name: Text, documentation: Text, label_names: Sequence[Text] = ()) -> None:
+        super().__init__(name, documentation, label_names)
+        # Setting a value would not add up across threads, so all of them share one
+        self._lock = Lock()
+        self._values: Dict[LabelValues, float] = {}
+
+    def _add(self, amount: float, labels: Dict[Text, Text]) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels: Text) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: Text) -> None:
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1, **labels: Text) -> None:
+        self._add(-amount, labels)
+
+    def value(self, **labels: Text) -> float:
+        return self._values.get(self._label_values(labels), 0)
+
+    def samples(self) -> List[Tuple[Dict[Text, Text], float]]:
+        with self._lock:
+            values = list(self._values.items())
+        return [(self._labels(key), value) for key, value in values]
+
+
+class HistogramSample:
+    """Observations of a histogram with given labels: the count in each bucket, their sum."""
+
+    def __init__(self, buckets: int) -> None:
+        self.bucket_counts = [0] * (buckets + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def merge(self, other: "HistogramSample") -> None:
+        for i, bucket_count in enumerate(list(other.bucket_counts)):
+            self.bucket_counts[i] += bucket_count
+        self.sum += other.sum
+        self.count += other.count
+
+    def merged(self, other: "HistogramSample") -> "HistogramSample":
+        sample = HistogramSample(len(self.bucket_counts) - 1)
+        sample.merge(self)
+        sample.merge(other)
+        return sample
+
+
+class Histogram(_Metric):
+    """
+    Observations, such as latencies, counted in buckets of the upper bounds given. Exposed the
+    Prometheus way, each bucket counting the observations up to its bound, and an infinite
+    bound last counting them all.
+    """
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: Text,
+        documentation: Text,
+        label_names: Sequence[Text] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._values: _ThreadShards[HistogramSample] = _ThreadShards(HistogramSample.merged)
+
+    def observe(self, value: float, **labels: Text) -> None:
+        key = self._label_values(labels)
+        shard = self._values.shard()
+        sample = shard.get(key)
+        if sample is None:
+            sample = shard[key] = HistogramSample(len(self.buckets))
+        sample.bucket_counts[bisect_left(self.buckets, value)] += 1
+        sample.sum += value
+        sample.count += 1
+
+    @contextmanager
+    def time(self, **labels: Text) -> Iterator[None]:
+        """Observes how long the block takes, in seconds, whether or not it raises."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at, **labels)
+
+    def _totals(self) -> Dict[LabelValues, HistogramSample]:
+        totals: Dict[LabelValues, HistogramSample] = {}
+        for shard in self._values.shards():
+            for key, sample in shard.items():
+                totals.setdefault(key, HistogramSample(len(self.buckets))).merge(sample)
+        return totals
+
+    def value(self, **labels: Text) -> HistogramSample:
+        key = self._label_values(labels)
+        return self._totals().get(key, HistogramSample(len(self.buckets)))
+
+    def samples(self) -> List[Tuple[Dict[Text, Text], HistogramSample]]:
+        return [(self._labels(key), sample) for key, sample in self._totals().items()]
+
+
+Metric = Union[Counter, Gauge, Histogram]
+
+
+class MetricsRegistry:
+    """Holds every metric of the service, by name."""
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._metrics: Dict[Text, Metric] = {}
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.setdefault(metric.name, metric)
+        if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+            raise ValueError(f"Metric {metric.name} is already registered differently")
+        return existing
+
+    def counter(
+        self, name: Text, documentation: Text, label_names: Sequence[Text] = ()
+    ) -> Counter:
+        return self._register(Counter(name, documentation, label_names))  # type: ignore
+
+    def gauge(self, name: Text, documentation: Text, label_names: Sequence[Text] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, label_names))  # type: ignore
+
+    def histogram(
+        self,
+        name: Text,
+        documentation: Text,
+        label_names: Sequence[Text] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        histogram = Histogram(name, documentation, label_names, buckets)
+        return self._register(histogram)  # type: ignore
+
+    def metrics(self) -> List[Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+
+REGISTRY = MetricsRegistry()
@@ -2,10 +2,19 @@ from datetime import datetime
 from typing import (
     List,
     Optional,
+    Sequence,
+    Set,
     Text,
 )
 
-from contilio.persistence.protocol import Route, RouteId, Persistence, PersistenceFactory
+from contilio.persistence.protocol import (
+    Route,
+    RouteId,
+    RouteRecord,
+    Persistence,
+    PersistenceFactory,
+)
+from contilio.statistics import LegStatistics, LegStatisticsStore
 
 
 def make_graph_persistence_factory() -> PersistenceFactory:
@@ -16,6 +25,9 @@ class InMemoryPersistenceFactory:
     def __init__(self):
         self.persistence = InMemoryPersistence()
 
+    def load(self) -> None:
+        pass
+
     def create(self) -> Persistence:
         return self.persistence
 
@@ -24,27 +36,78 @@ class InMemoryPersistence(Persistence):
     def __init__(self):
         self.id: int = 0
         self.routes_table: List[Route] = []
+        self.route_hashes: Set[Text] = set()
+        self.leg_statistics = LegStatisticsStore()
 
     def read_route(self, route_hash: Text, datetime_of_interest: datetime) -> Optional[Route]:
-        try:
-            return next(
-                iter(
-                    [
-                        r
-                        for r in self.routes_table
-                        if r.hashed == route_hash and r.departure_at >= datetime_of_interest
-                    ]
-                )
-            )
-        except StopIteration:
-            return None
+        return min(
+            (
+                r
+                for r in self.routes_table
+                if r.hashed == route_hash and r.departure_at >= datetime_of_interest
+            ),
+            key=lambda r: r.departure_at,
+            default=None,
+        )
+
+    def read_routes(
+        self, route_hash: Text, departure_from: datetime, departure_until: datetime
+    ) -> List[Route]:
+        return sorted(
+            (
+                r
+                for r in self.routes_table
+                if r.hashed == route_hash and departure_from <= r.departure_at < departure_until
+            ),
+            key=lambda r: r.departure_at,
+        )
+
+    def read_legs(self, departure_from: datetime, departure_until: datetime) -> List[Route]:
+        return [
+            r
+            for r in self.routes_table
+            if r.origin_crs is not None and departure_from <= r.departure_at < departure_until
+        ]
 
     def write_route(
-        self, route_hash: Text, departure_at: datetime, arrival_at: datetime
+        self,
+        route_hash: Text,
+        departure_at: datetime,
+        arrival_at: datetime,
+        origin_crs: Optional[Text] = None,
+        destination_crs: Optional[Text] = None,
     ) -> RouteId:
         route_id = self.id
         self.routes_table.append(
-            Route(id=route_id, hashed=route_hash, departure_at=departure_at, arrival_at=arrival_at)
+            Route(
+                id=route_id,
+                hashed=route_hash,
+                departure_at=departure_at,
+                arrival_at=arrival_at,
+                origin_crs=origin_crs,
+                destination_crs=destination_crs,
+            )
         )
         self.id += 1
+        self.route_hashes.add(route_hash)
+        if origin_crs and destination_crs:
+            self.leg_statistics.record(origin_crs, destination_crs, departure_at, arrival_at)
         return route_id
+
+    def read_leg_statistics(
+        self, origin_crs: Text, destination_crs: Text
+    ) -> Optional[LegStatistics]:
+        return self.leg_statistics.get(origin_crs, destination_crs)
+
+    def might_contain_route(self, route_hash: Text) -> bool:
+        return route_hash in self.route_hashes
+
+    def write_routes(self, routes: Sequence[RouteRecord]) -> None:
+        for route in routes:
+            self.write_route(
+                route_hash=route.hashed,
+                departure_at=route.departure_at,
+                arrival_at=route.arrival_at,
+                origin_crs=route.origin_crs,
+                destination_crs=route.destination_crs,
+            )
@@ -1,69 +1,306 @@
 import datetime
-from typing import List, Text, Any, cast, Optional
+import json
+import threading
+import time
+from itertools import groupby
+from functools import wraps
+from typing import List, Sequence, Text, Any, Callable, TypeVar, cast, Optional
 
 from sqlalchemy import and_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.engine import Engine, Row
 from sqlalchemy.sql import expression as sql
 
 from logging import getLogger
-from contilio.journey_planner.model import Route
-from contilio.persistence.protocol import Route as DomainRoute, RouteId
+from contilio.journey_planner.model import LegStatistics, Route
+from contilio.persistence.protocol import Route as DomainRoute, RouteId, RouteRecord
+from contilio.statistics import LegStatistics as DomainLegStatistics, LegStatisticsStore
+from contilio.utils.bloom import BloomFilter
 
+from contilio.metrics import REGISTRY, current_request_cost
+from contilio.tracing import TRACER
 from contilio.persistence.protocol import PersistenceFactory, Persistence
 
 logger = getLogger(__name__)
 
+DB_SECONDS = REGISTRY.histogram(
+    "persistence_seconds", "Time taken by reads and writes of the database", ["operation"]
+)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _timed(f: F) -> F:
+    @wraps(f)
+    def timed(*args: Any, **kwargs: Any) -> Any:
+        started_at = time.perf_counter()
+        try:
+            with TRACER.span(f"persistence.{f.__name__}"):
+                return f(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            DB_SECONDS.observe(elapsed, operation=f.__name__)
+            cost = current_request_cost()
+            if cost is not None:
+                cost.add_db_call(elapsed)
+
+    return cast(F, timed)
+
+
+def read_all_leg_statistics(engine: Engine) -> List[DomainLegStatistics]:
+    leg_statistics_table = LegStatistics.__table__
+    with engine.connect() as conn:
+        rows = conn.execute(
+            sql.select(
+                leg_statistics_table.c.origin_crs,
+                leg_statistics_table.c.destination_crs,
+                leg_statistics_table.c.statistics,
+            )
+        )
+        return [
+            DomainLegStatistics.from_dict(origin_crs, destination_crs, json.loads(statistics))
+            for origin_crs, destination_crs, statistics in rows
+        ]
+
+
+def read_all_route_hashes(engine: Engine) -> List[Text]:
+    route_table = Route.__table__
+    with engine.connect() as conn:
+        return [hashed for (hashed,) in conn.execute(sql.select(route_table.c.hashed).distinct())]
+
 
 class JourneyPlannerPersistenceFactory(PersistenceFactory):
-    def __init__(self, engine: Engine):
+    """
+    Its persistences share a store of leg statistics, which `load` fills from the database as
+    the service starts up. With a route filter, `load` adds the hashes of every route already
+    cached to it as well, so that it tells apart the routes that are certainly not cached.
+    """
+
+    def __init__(self, engine: Engine, route_filter: Optional[BloomFilter] = None):
         self._engine = engine
+        self._leg_statistics = LegStatisticsStore()
+        self._load_lock = threading.Lock()
+        self._loaded = False
+        self._route_filter = route_filter
+
+    def load(self) -> None:
+        with self._load_lock:
+            if self._loaded:
+                return
+            for statistics in read_all_leg_statistics(self._engine):
+                self._leg_statistics.put(statistics)
+            if self._route_filter is not None:
+                self._route_filter.update(read_all_route_hashes(self._engine))
+            self._loaded = True
 
     def create(self) -> Persistence:
-        return JourneyPlannerPersistence(self._engine)
+        return JourneyPlannerPersistence(self._engine, self._leg_statistics, self._route_filter)
 
 
 class JourneyPlannerPersistence(Persistence):
-    def __init__(self, engine: Engine) -> None:
+    def __init__(
+        self,
+        engine: Engine,
+        leg_statistics: Optional[LegStatisticsStore] = None,
+        route_filter: Optional[BloomFilter] = None,
+    ) -> None:
         self.engine = engine
         self.route_table = Route.__table__
+        self.leg_statistics_table = LegStatistics.__table__
+        self.leg_statistics = leg_statistics or LegStatisticsStore()
+        self.route_filter = route_filter
 
     @staticmethod
     def _parse_route_row(row: Row) -> DomainRoute:
-        (route_id, hashed, departure_at, arrival_at) = row
+        (route_id, hashed, departure_at, arrival_at, origin_crs, destination_crs) = row
 
         route = DomainRoute(
-            id=route_id, hashed=hashed, departure_at=departure_at, arrival_at=arrival_at
+            id=route_id,
+            hashed=hashed,
+            departure_at=departure_at,
+            arrival_at=arrival_at,
+            origin_crs=origin_crs,
+            destination_crs=destination_crs,
         )
 
         return route
 
+    @_timed
     def read_route(self, route_hash: Text, datetime_of_interest: datetime) -> Optional[Route]:
         rows = self._execute(
-            sql.select(self.route_table).where(
+            sql.select(self.route_table)
+            .where(
                 and_(
                     self.route_table.c.hashed == route_hash,
                     self.route_table.c.departure_at >= datetime_of_interest,
                 )
             )
+            .order_by(self.route_table.c.departure_at)
+            .limit(1)
         )
 
         if rows:
             return self._parse_route_row(rows[0])
         return None
 
+    @_timed
+    def read_routes(
+        self, route_hash: Text, departure_from: datetime, departure_until: datetime
+    ) -> List[DomainRoute]:
+        rows = self._execute(
+            sql.select(self.route_table)
+            .where(
+                and_(
+                    self.route_table.c.hashed == route_hash,
+                    self.route_table.c.departure_at >= departure_from,
+                    self.route_table.c.departure_at < departure_until,
+                )
+            )
+            .order_by(self.route_table.c.departure_at)
+        )
+
+        return [self._parse_route_row(row) for row in rows]
+
+    @_timed
+    def read_legs(self, departure_from: datetime, departure_until: datetime) -> List[DomainRoute]:
+        rows = self._execute(
+            sql.select(self.route_table).where(
+                and_(
+                    self.route_table.c.origin_crs.is_not(None),
+                    self.route_table.c.departure_at >= departure_from,
+                    self.route_table.c.departure_at < departure_until,
+                )
+            )
+        )
+
+        return [self._parse_route_row(row) for row in rows]
+
+    @_timed
     def write_route(
-        self, route_hash: Text, departure_at: datetime, arrival_at: datetime
+        self,
+        route_hash: Text,
+        departure_at: datetime,
+        arrival_at: datetime,
+        origin_crs: Optional[Text] = None,
+        destination_crs: Optional[Text] = None,
     ) -> RouteId:
         result = self._execute(
             sql.insert(self.route_table)
-            .values(hashed=route_hash, departure_at=departure_at, arrival_at=arrival_at)
+            .values(
+                hashed=route_hash,
+                departure_at=departure_at,
+                arrival_at=arrival_at,
+                origin_crs=origin_crs,
+                destination_crs=destination_crs,
+            )
             .returning(self.route_table.c.id)
         )
 
         (route_id,) = next(iter(result))
+        if self.route_filter is not None:
+            self.route_filter.add(route_hash)
+
+        if origin_crs and destination_crs:
+            self._record_leg_statistics(
+                [RouteRecord(route_hash, departure_at, arrival_at, origin_crs, destination_crs)]
+            )
 
         return cast(int, route_id)
 
+    @_timed
+    def write_routes(self, routes: Sequence[RouteRecord]) -> None:
+        """Inserts all routes with a single executemany, within a single transaction."""
+        if not routes:
+            return
+
+        with self.engine.begin() as conn:
+            conn.execute(
+                sql.insert(self.route_table),
+                [
+                    dict(
+                        hashed=route.hashed,
+                        departure_at=route.departure_at,
+                        arrival_at=route.arrival_at,
+                        origin_crs=route.origin_crs,
+                        destination_crs=route.destination_crs,
+                    )
+                    for route in routes
+                ],
+            )
+        if self.route_filter is not None:
+            self.route_filter.update({route.hashed for route in routes})
+
+        self._record_leg_statistics(
+            [route for route in routes if route.origin_crs and route.destination_crs]
+        )
+
+    def read_leg_statistics(
+        self, origin_crs: Text, destination_crs: Text
+    ) -> Optional[DomainLegStatistics]:
+        return self.leg_statistics.get(origin_crs, destination_crs)
+
+    def might_contain_route(self, route_hash: Text) -> bool:
+        return self.route_filter is None or route_hash in self.route_filter
+
+    def _record_leg_statistics(self, legs: Sequence[RouteRecord]) -> None:
+        """Folds the legs into their statistics rows, read and written back in a transaction,
+        so the increments of every worker add up. The in-memory store then takes the result.
+
+        The transaction takes the write lock before reading. Left deferred, the driver would
+        only begin it at the write, after a read another worker may have written over since,
+        and upgrading a read lock to a write lock fails with "database is locked" rather than
+        waiting out the busy timeout.
+        """
+        table = self.leg_statistics_table
+        by_leg = sorted(legs, key=lambda leg: (leg.origin_crs, leg.destination_crs))
+        recorded = []
+        with self.engine.connect() as conn:
+            conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                for (origin_crs, destination_crs), leg_group in groupby(
+                    by_leg, key=lambda leg: (leg.origin_crs, leg.destination_crs)
+                ):
+                    row = conn.execute(
+                        sql.select(table.c.statistics).where(
+                            and_(
+                                table.c.origin_crs == origin_crs,
+                                table.c.destination_crs == destination_crs,
+                            )
+                        )
+                    ).first()
+                    statistics = (
+                        DomainLegStatistics.from_dict(
+                            origin_crs, destination_crs, json.loads(row[0])
+                        )
+                        if row
+                        else DomainLegStatistics(origin_crs, destination_crs)
+                    )
+                    for leg in leg_group:
+                        statistics.record(leg.departure_at, leg.arrival_at)
+
+                    values = dict(
+                        count=statistics.count,
+                        statistics=json.dumps(statistics.to_dict()),
+                        updated_at=datetime.datetime.now(),
+                    )
+                    conn.execute(
+                        sqlite_insert(table)
+                        .values(origin_crs=origin_crs, destination_crs=destination_crs, **values)
+                        .on_conflict_do_update(
+                            index_elements=[table.c.origin_crs, table.c.destination_crs],
+                            set_=values,
+                        )
+                    )
+                    recorded.append(statistics)
+            except BaseException:
+                conn.exec_driver_sql("ROLLBACK")
+                raise
+            conn.exec_driver_sql("COMMIT")
+
+        for statistics in recorded:
+            self.leg_statistics.put(statistics)
+
     def _execute(self, expr: Any) -> List[Row]:
         """Produces a list with results of the query invocation.
 
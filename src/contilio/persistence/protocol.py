@@ -1,8 +1,10 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Text, Optional
+from typing import List, Sequence, Text, Optional
 from typing_extensions import Protocol
 
+from contilio.statistics import LegStatistics
+
 RouteId = int
 
 
@@ -12,18 +14,67 @@ class Route:
     hashed: Text
     departure_at: datetime
     arrival_at: datetime
+    origin_crs: Optional[Text] = None
+    destination_crs: Optional[Text] = None
+
+
+@dataclass(frozen=True)
+class RouteRecord:
+    """A route yet to be written, hence without an id."""
+
+    hashed: Text
+    departure_at: datetime
+    arrival_at: datetime
+    origin_crs: Optional[Text] = None
+    destination_crs: Optional[Text] = None
 
 
 class Persistence(Protocol):
     def read_route(self, route_hash: Text, datetime_of_interest: datetime) -> Optional[Route]:
         ...
 
+    def read_routes(
+        self, route_hash: Text, departure_from: datetime, departure_until: datetime
+    ) -> List[Route]:
+        ...
+
+    def read_legs(self, departure_from: datetime, departure_until: datetime) -> List[Route]:
+        ...
+
     def write_route(
-        self, route_hash: Text, departure_at: datetime, arrival_at: datetime
+        self,
+        route_hash: Text,
+        departure_at: datetime,
+        arrival_at: datetime,
+        origin_crs: Optional[Text] = None,
+        destination_crs: Optional[Text] = None,
     ) -> RouteId:
         ...
 
+    def write_routes(self, routes: Sequence[RouteRecord]) -> None:
+        ...
+
+    def read_leg_statistics(
+        self, origin_crs: Text, destination_crs: Text
+    ) -> Optional[LegStatistics]:
+        """Answered from memory, so there is no need to run it in the task executor."""
+        ...
+
+    def might_contain_route(self, route_hash: Text) -> bool:
+        """
+        False only when no route with the hash is cached, so that reading it can be skipped.
+        Answered from memory, so there is no need to run it in the task executor.
+        """
+        ...
+
 
 class PersistenceFactory(Protocol):
+    def load(self) -> None:
+        """
+        Loads what the persistences it creates share, once, as the service starts up. Reads the
+        database, so run it in the task executor.
+        """
+        ...
+
     def create(self) -> Persistence:
         ...
@@ -0,0 +1,16 @@
+from contilio.routing.csa import earliest_arrival_matrix, reachable_within
+from contilio.routing.profile import JourneyOption, LegProfile, chain_arrivals, pareto_options
+from contilio.routing.raptor import Journey, earliest_arrival
+from contilio.routing.timetable import Timetable
+
+__all__ = (
+    "Journey",
+    "JourneyOption",
+    "LegProfile",
+    "Timetable",
+    "chain_arrivals",
+    "earliest_arrival",
+    "earliest_arrival_matrix",
+    "pareto_options",
+    "reachable_within",
+)
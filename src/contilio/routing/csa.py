@@ -0,0 +1,147 @@
+from bisect import bisect_left, bisect_right
+from concurrent.futures import Executor
+from datetime import datetime, timedelta
+from functools import partial
+from typing import List, Optional, Sequence, Tuple
+
+from contilio.routing.timetable import (
+    NUM_STATIONS,
+    STATION_INDEX,
+    STATIONS,
+    UNREACHED,
+    Timetable,
+    from_timestamp,
+    to_timestamp,
+)
+
+# (departure timestamp, arrival timestamp, origin station id, destination station id)
+Connection = Tuple[float, float, int, int]
+
+
+def sorted_connections(timetable: Timetable) -> List[Connection]:
+    """Flattens the timetable into connections ordered by departure, as CSA scans them."""
+    connections = [
+        (departure, pair.arrivals[i], pair.origin, pair.destination)
+        for station_pairs in timetable.outgoing
+        for pair in station_pairs
+        for i, departure in enumerate(pair.departures)
+    ]
+    connections.sort()
+    return connections
+
+
+def scan_earliest_arrivals(
+    connections: Sequence[Connection],
+    origin: int,
+    start: float,
+    max_wait_secs: float,
+    arrive_by: float = UNREACHED,
+) -> List[float]:
+    """
+    Connection Scan from a single origin, producing the earliest arrival at every station.
+
+    A connection is taken when it leaves within `max_wait_secs` of any arrival at its departure
+    station, not only the earliest one, as a later arrival may still catch a connection the
+    earliest one would have to wait too long for. The scan stops at the first connection
+    leaving after `arrive_by`.
+    """
+    # Every arrival at every station so far, sorted
+    arrivals: List[List[float]] = [[] for _ in range(NUM_STATIONS)]
+    arrivals[origin].append(start)
+    for departure, arrival, from_station, to_station in connections:
+        if departure > arrive_by:
+            break
+        ready = arrivals[from_station]
+        # The latest arrival ready for the connection is the only one that may be within the wait
+        i = bisect_right(ready, departure)
+        if not i or departure > ready[i - 1] + max_wait_secs:
+            continue
+        at_destination = arrivals[to_station]
+        j = bisect_left(at_destination, arrival)
+        if j == len(at_destination) or at_destination[j] != arrival:
+            at_destination.insert(j, arrival)
+    return [
+        station_arrivals[0] if station_arrivals else UNREACHED for station_arrivals in arrivals
+    ]
+
+
+def reachable_within(
+    timetable: Timetable,
+    origin_crs: str,
+    departure_at: datetime,
+    budget: timedelta,
+    max_wait: timedelta,
+) -> List[Tuple[str, datetime]]:
+    """
+    Every station reachable from the origin within the time budget, in order of arrival.
+
+    A single connection scan is enough, cut short at the first connection leaving after the
+    budget runs out.
+    """
+    start = to_timestamp(departure_at)
+    arrive_by = start + budget.total_seconds()
+    arrivals = scan_earliest_arrivals(
+        sorted_connections(timetable),
+        STATION_INDEX[origin_crs],
+        start,
+        max_wait.total_seconds(),
+        arrive_by=arrive_by,
+    )
+
+    reachable = sorted(
+        (arrival, station) for station, arrival in enumerate(arrivals) if arrival <= arrive_by
+    )
+    return [
+        (STATIONS[station].name, from_timestamp(arrival, departure_at))
+        for arrival, station in reachable
+    ]
+
+
+def _matrix_rows(
+    connections: Sequence[Connection],
+    targets: Sequence[int],
+    start: float,
+    max_wait_secs: float,
+    origins: Sequence[int],
+) -> List[List[float]]:
+    rows = []
+    for origin in origins:
+        arrivals = scan_earliest_arrivals(connections, origin, start, max_wait_secs)
+        rows.append([arrivals[target] for target in targets])
+    return rows
+
+
+def earliest_arrival_matrix(
+    timetable: Timetable,
+    station_crs_codes: Sequence[str],
+    departure_at: datetime,
+    max_wait: timedelta,
+    executor: Optional[Executor] = None,
+    origins_per_task: int = 25,
+) -> List[List[Optional[float]]]:
+    """
+    Earliest arrival between every pair of the given stations, as minutes after departure.
+
+    Each origin gets its own connection scan. When an executor is supplied the origins are
+    split into batches of `origins_per_task`, so the connections are not shipped per origin.
+
+    :return: a row per origin and a column per destination, None where there is no journey
+    """
+    stations = [STATION_INDEX[code] for code in station_crs_codes]
+    connections = sorted_connections(timetable)
+    start = to_timestamp(departure_at)
+    scan = partial(_matrix_rows, connections, stations, start, max_wait.total_seconds())
+
+    if executor is None:
+        rows = scan(stations)
+    else:
+        chunks = []
+        for first in range(0, len(stations), origins_per_task):
+            last = first + origins_per_task
+            chunks.append(stations[first:last])
+        rows = [row for chunk_rows in executor.map(scan, chunks) for row in chunk_rows]
+
+    return [
+        [None if arrival == UNREACHED else (arrival - start) / 60 for arrival in row]
+        for row in rows
+    ]
@@ -0,0 +1,76 @@
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Tuple
+
+from contilio.persistence.protocol import Route
+from contilio.routing.timetable import to_timestamp
+
+
+@dataclass(frozen=True)
+class JourneyOption:
+    departure_at: datetime
+    arrival_at: datetime
+
+
+class LegProfile:
+    """The departures of one leg of a fixed route, sorted for lookups by time."""
+
+    def __init__(self, legs: Sequence[Route]) -> None:
+        unique = {
+            (to_timestamp(leg.departure_at), to_timestamp(leg.arrival_at)): leg for leg in legs
+        }
+        self._keys = sorted(unique)
+        self._departures = [departure for departure, _ in self._keys]
+        self.legs = [unique[key] for key in self._keys]
+
+    def earliest_arrival(self, ready_at: float, max_wait_secs: float) -> Optional[Route]:
+        """The leg arriving the earliest out of those leaving within the maximum wait."""
+        best: Optional[Tuple[float, Route]] = None
+        i = bisect_left(self._departures, ready_at)
+        while i < len(self._keys) and self._departures[i] <= ready_at + max_wait_secs:
+            arrival = self._keys[i][1]
+            if best is None or arrival < best[0]:
+                best = (arrival, self.legs[i])
+            i += 1
+        return best[1] if best else None
+
+    def covers(self, window_from: datetime, window_until: datetime, max_wait: timedelta) -> bool:
+        """
+        Whether the departures seem complete over the window, that is there are some and no gap
+        between them, or the window bounds, is longer than the maximum wait.
+        """
+        if not self._departures:
+            return False
+        bounds = [to_timestamp(window_from), *self._departures, to_timestamp(window_until)]
+        bounds = [b for b in bounds if bounds[0] <= b <= bounds[-1]]
+        max_gap = max_wait.total_seconds()
+        return all(later - earlier <= max_gap for earlier, later in zip(bounds, bounds[1:]))
+
+
+def chain_arrivals(
+    departures: Sequence[Route], leg: LegProfile, max_wait: timedelta
+) -> List[Optional[Route]]:
+    """Continues every partial journey, given by its last leg, onto the next leg of the route."""
+    max_wait_secs = max_wait.total_seconds()
+    return [
+        leg.earliest_arrival(to_timestamp(previous.arrival_at), max_wait_secs)
+        for previous in departures
+    ]
+
+
+def pareto_options(options: Sequence[JourneyOption]) -> List[JourneyOption]:
+    """
+    Drops every option beaten by another departing no earlier and arriving no later, leaving
+    the options ordered by departure with strictly increasing arrivals.
+    """
+    front: List[JourneyOption] = []
+    earliest_arrival: Optional[float] = None
+    for option in sorted(
+        options, key=lambda o: (-to_timestamp(o.departure_at), to_timestamp(o.arrival_at))
+    ):
+        arrival = to_timestamp(option.arrival_at)
+        if earliest_arrival is None or arrival < earliest_arrival:
+            front.append(option)
+            earliest_arrival = arrival
+    return list(reversed(front))
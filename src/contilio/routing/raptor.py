@@ -0,0 +1,101 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from contilio.persistence.protocol import Route
+from contilio.routing.timetable import (
+    NUM_STATIONS,
+    STATION_INDEX,
+    UNREACHED,
+    Timetable,
+    to_timestamp,
+)
+
+MAX_ROUNDS = 8
+
+# (station id, arrival timestamp)
+Arrival = Tuple[int, float]
+# (previous station id, arrival timestamp there, leg taken from it to reach the station)
+Label = Tuple[int, float, Route]
+
+
+@dataclass(frozen=True)
+class Journey:
+    legs: List[Route]
+
+    @property
+    def departure_at(self) -> datetime:
+        return self.legs[0].departure_at
+
+    @property
+    def arrival_at(self) -> datetime:
+        return self.legs[-1].arrival_at
+
+    @property
+    def station_crs_codes(self) -> List[str]:
+        return [self.legs[0].origin_crs] + [leg.destination_crs for leg in self.legs]
+
+
+def earliest_arrival(
+    timetable: Timetable,
+    origin_crs: str,
+    destination_crs: str,
+    datetime_of_interest: datetime,
+    max_wait: timedelta,
+    max_rounds: int = MAX_ROUNDS,
+) -> Optional[Journey]:
+    """
+    Round based RAPTOR search for the earliest arrival at the destination.
+
+    Round k finds the arrivals at every station using at most k legs, and only the arrivals
+    new to the previous round are scanned again. A departure is only taken if it leaves within
+    `max_wait` of the arrival at its station, the first one included, so an earlier arrival
+    does not make a later one redundant: the later one may still catch a departure the earlier
+    one would have to wait too long for. Every arrival is kept, short of the ones no earlier
+    than the best known at the destination.
+
+    :return: the journey arriving the earliest, or None when the cached legs do not connect
+    """
+    origin = STATION_INDEX[origin_crs]
+    target = STATION_INDEX[destination_crs]
+    max_wait_secs = max_wait.total_seconds()
+    start = to_timestamp(datetime_of_interest)
+
+    reached: List[Set[float]] = [set() for _ in range(NUM_STATIONS)]
+    reached[origin].add(start)
+    labels: List[Dict[Arrival, Label]] = []
+    marked: List[Arrival] = [(origin, start)]
+    best, best_round = UNREACHED, -1
+
+    for round_number in range(max_rounds):
+        round_labels: Dict[Arrival, Label] = {}
+
+        for station, ready_at in marked:
+            for pair in timetable.outgoing[station]:
+                for i in pair.boardable(ready_at, max_wait_secs):
+                    arrival = pair.arrivals[i]
+                    # Target pruning, and arrivals already reached with as few legs or fewer
+                    if arrival >= best or arrival in reached[pair.destination]:
+                        continue
+                    reached[pair.destination].add(arrival)
+                    round_labels[(pair.destination, arrival)] = (station, ready_at, pair.legs[i])
+                    if pair.destination == target:
+                        best, best_round = arrival, round_number
+
+        labels.append(round_labels)
+        if not round_labels:
+            break
+        marked = [key for key in round_labels if key[0] != target]
+
+    if best == UNREACHED:
+        return None
+    return Journey(legs=_trace_back(labels[: best_round + 1], (target, best)))
+
+
+def _trace_back(labels: List[Dict[Arrival, Label]], arrival: Arrival) -> List[Route]:
+    legs: List[Route] = []
+    for round_labels in reversed(labels):
+        station, ready_at, leg = round_labels[arrival]
+        legs.append(leg)
+        arrival = (station, ready_at)
+    return list(reversed(legs))
@@ -0,0 +1,83 @@
+from bisect import bisect_left
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from contilio.domain.enums import UKTrainStationCode
+from contilio.persistence.protocol import Route
+
+STATIONS: List[UKTrainStationCode] = list(UKTrainStationCode)
+STATION_INDEX: Dict[str, int] = {station.name: i for i, station in enumerate(STATIONS)}
+NUM_STATIONS = len(STATIONS)
+
+UNREACHED = float("inf")
+
+
+def to_timestamp(value: datetime) -> float:
+    """Naive datetimes are treated as local time, the same as `astimezone` does."""
+    return value.timestamp()
+
+
+def from_timestamp(value: float, reference: datetime) -> datetime:
+    """Inverse of `to_timestamp`, keeping the timezone awareness of the reference datetime."""
+    return datetime.fromtimestamp(value, tz=reference.tzinfo)
+
+
+@dataclass
+class LegDepartures:
+    """All cached departures between two adjacent stations, sorted by departure time."""
+
+    origin: int
+    destination: int
+    departures: List[float] = field(default_factory=list)
+    arrivals: List[float] = field(default_factory=list)
+    legs: List[Route] = field(default_factory=list)
+
+    def boardable(self, ready_at: float, max_wait_secs: float) -> Iterable[int]:
+        """Indices of departures that can be caught when ready at the given time."""
+        i = bisect_left(self.departures, ready_at)
+        while i < len(self.departures) and self.departures[i] <= ready_at + max_wait_secs:
+            yield i
+            i += 1
+
+
+class Timetable:
+    """
+    An in-memory view of the cached legs, grouped by station pair and indexed by station id.
+
+    Station ids are the positions of the stations within `UKTrainStationCode`, so the search
+    algorithms can keep their labels in flat lists rather than dictionaries.
+    """
+
+    def __init__(self, legs: Iterable[Route]) -> None:
+        by_pair: Dict[Tuple[int, int], List[Tuple[float, float, Route]]] = defaultdict(list)
+        for leg in legs:
+            origin = STATION_INDEX.get(leg.origin_crs or "")
+            destination = STATION_INDEX.get(leg.destination_crs or "")
+            if origin is None or destination is None or origin == destination:
+                continue
+            by_pair[(origin, destination)].append(
+                (to_timestamp(leg.departure_at), to_timestamp(leg.arrival_at), leg)
+            )
+
+        self.outgoing: List[List[LegDepartures]] = [[] for _ in range(NUM_STATIONS)]
+        self.num_legs = 0
+        for (origin, destination), entries in by_pair.items():
+            entries.sort(key=lambda entry: (entry[0], entry[1]))
+            pair = LegDepartures(origin=origin, destination=destination)
+            for departure, arrival, leg in entries:
+                if pair.departures and (departure, arrival) == (
+                    pair.departures[-1],
+                    pair.arrivals[-1],
+                ):
+                    # The same train may have been cached more than once
+                    continue
+                pair.departures.append(departure)
+                pair.arrivals.append(arrival)
+                pair.legs.append(leg)
+            self.outgoing[origin].append(pair)
+            self.num_legs += len(pair.legs)
+
+    def pair(self, origin: int, destination: int) -> Optional[LegDepartures]:
+        return next((p for p in self.outgoing[origin] if p.destination == destination), None)
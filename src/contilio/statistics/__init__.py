@@ -0,0 +1,8 @@
+from contilio.statistics.sketch import DurationSketch
+from contilio.statistics.store import LegStatistics, LegStatisticsStore
+
+__all__ = (
+    "DurationSketch",
+    "LegStatistics",
+    "LegStatisticsStore",
+)
@@ -0,0 +1,71 @@
+import csv
+import json
+import os
+import sys
+from argparse import ArgumentParser
+from logging import getLogger
+from typing import List, Optional, TextIO
+
+import dotenv
+
+from contilio.config import SERVICE_NAME, RequiredEnviron
+from contilio.persistence.journey_planner import read_all_leg_statistics
+from contilio.statistics.store import HOURS_IN_DAY, LegStatistics
+from contilio.utils.db_connection import create_engine
+
+logger = getLogger(__name__)
+
+QUANTILES = (0.1, 0.5, 0.9)
+
+
+def arg_parser() -> ArgumentParser:
+    parser = ArgumentParser(
+        f"{SERVICE_NAME} leg statistics", description="Exports the statistics of every leg"
+    )
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--output", help="File to export to, defaults to stdout")
+    return parser
+
+
+def _summary(statistics: LegStatistics) -> dict:
+    return {
+        "origin_crs": statistics.origin_crs,
+        "destination_crs": statistics.destination_crs,
+        "count": statistics.count,
+        **{
+            f"p{round(q * 100)}_duration_in_minutes": statistics.duration_quantile(q)
+            for q in QUANTILES
+        },
+        **{
+            f"headway_in_minutes_at_{hour:02d}": statistics.headway_in_minutes(hour)
+            for hour in range(HOURS_IN_DAY)
+        },
+    }
+
+
+def export(leg_statistics: List[LegStatistics], output_format: str, output: TextIO) -> None:
+    summaries = [_summary(statistics) for statistics in leg_statistics]
+    if output_format == "json":
+        for summary in summaries:
+            output.write(json.dumps(summary) + "\n")
+        return
+
+    writer = csv.DictWriter(output, fieldnames=list(_summary(LegStatistics("", ""))))
+    writer.writeheader()
+    writer.writerows(summaries)
+
+
+def main(env: RequiredEnviron, output_format: str, output_path: Optional[str] = None) -> None:
+    leg_statistics = read_all_leg_statistics(create_engine(env))
+    logger.info("Exporting statistics of %s legs", len(leg_statistics))
+    if output_path is None:
+        export(leg_statistics, output_format, sys.stdout)
+        return
+    with open(output_path, "w", newline="") as output:
+        export(leg_statistics, output_format, output)
+
+
+if __name__ == "__main__":
+    dotenv.load_dotenv()
+    args = arg_parser().parse_args()
+    main(RequiredEnviron.parse_obj(os.environ), args.format, args.output)
@@ -0,0 +1,60 @@
+import math
+from typing import Any, Dict, Mapping
+
+RELATIVE_ACCURACY = 0.01
+
+
+class DurationSketch:
+    """
+    A streaming quantile sketch of durations in minutes, with a bounded relative error.
+
+    Durations are counted into logarithmically sized buckets, so any quantile is answered within
+    `RELATIVE_ACCURACY` of the true value whilst only a few dozen counters are kept per leg.
+    """
+
+    def __init__(self, relative_accuracy: float = RELATIVE_ACCURACY) -> None:
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.zero_count = 0
+        self.buckets: Dict[int, int] = {}
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.buckets.values())
+
+    def add(self, minutes: float) -> None:
+        if minutes <= 0:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(minutes) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        """
+        :param q: quantile to estimate, between 0 and 1
+        :return: the estimated duration in minutes, 0 when nothing was added yet
+        """
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                return 2 * self._gamma**index / (self._gamma + 1)
+        return 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "zero_count": self.zero_count,
+            "buckets": {str(index): count for index, count in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: Mapping[str, Any]) -> "DurationSketch":
+        sketch = cls(relative_accuracy=d["relative_accuracy"])
+        sketch.zero_count = d["zero_count"]
+        sketch.buckets = {int(index): count for index, count in d["buckets"].items()}
+        return sketch
@@ -0,0 +1,104 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Mapping, Optional, Text, Tuple
+
+from contilio.statistics.sketch import DurationSketch
+
+HOURS_IN_DAY = 24
+
+
+@dataclass
+class LegStatistics:
+    """
+    How long a leg usually takes and how often it runs.
+
+    Headways are derived from how many departures were seen within each hour of the day, over
+    how many service days. A service day is counted when its first departure within the hour is
+    seen, so writes arriving out of date order may count a day twice.
+    """
+
+    origin_crs: Text
+    destination_crs: Text
+    count: int = 0
+    durations: DurationSketch = field(default_factory=DurationSketch)
+    departures_by_hour: List[int] = field(default_factory=lambda: [0] * HOURS_IN_DAY)
+    service_days_by_hour: List[int] = field(default_factory=lambda: [0] * HOURS_IN_DAY)
+    last_service_day_by_hour: List[int] = field(default_factory=lambda: [0] * HOURS_IN_DAY)
+
+    def record(self, departure_at: datetime, arrival_at: datetime) -> None:
+        self.count += 1
+        self.durations.add((arrival_at - departure_at).total_seconds() / 60)
+
+        hour = departure_at.hour
+        service_day = departure_at.toordinal()
+        self.departures_by_hour[hour] += 1
+        if self.last_service_day_by_hour[hour] != service_day:
+            self.last_service_day_by_hour[hour] = service_day
+            self.service_days_by_hour[hour] += 1
+
+    def duration_quantile(self, q: float) -> Optional[float]:
+        """Estimated duration in minutes at the given quantile, None until a leg is recorded."""
+        return self.durations.quantile(q) if self.count else None
+
+    def headway_in_minutes(self, hour: int) -> Optional[float]:
+        """Average minutes between departures within the hour of day, None if none were seen."""
+        departures = self.departures_by_hour[hour]
+        if not departures:
+            return None
+        return 60 * self.service_days_by_hour[hour] / departures
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "durations": self.durations.to_dict(),
+            "departures_by_hour": self.departures_by_hour,
+            "service_days_by_hour": self.service_days_by_hour,
+            "last_service_day_by_hour": self.last_service_day_by_hour,
+        }
+
+    @classmethod
+    def from_dict(
+        cls, origin_crs: Text, destination_crs: Text, d: Mapping[str, Any]
+    ) -> "LegStatistics":
+        return cls(
+            origin_crs=origin_crs,
+            destination_crs=destination_crs,
+            count=d["count"],
+            durations=DurationSketch.from_dict(d["durations"]),
+            departures_by_hour=list(d["departures_by_hour"]),
+            service_days_by_hour=list(d["service_days_by_hour"]),
+            last_service_day_by_hour=list(d["last_service_day_by_hour"]),
+        )
+
+
+class LegStatisticsStore:
+    """In-memory, thread safe, statistics of every leg written, keyed by its two stations."""
+
+    def __init__(self, statistics: Optional[List[LegStatistics]] = None) -> None:
+        self._lock = Lock()
+        self._statistics: Dict[Tuple[Text, Text], LegStatistics] = {
+            (s.origin_crs, s.destination_crs): s for s in statistics or []
+        }
+
+    def record(
+        self, origin_crs: Text, destination_crs: Text, departure_at: datetime, arrival_at: datetime
+    ) -> LegStatistics:
+        with self._lock:
+            statistics = self._statistics.setdefault(
+                (origin_crs, destination_crs), LegStatistics(origin_crs, destination_crs)
+            )
+            statistics.record(departure_at, arrival_at)
+            return statistics
+
+    def put(self, statistics: LegStatistics) -> None:
+        with self._lock:
+            self._statistics[(statistics.origin_crs, statistics.destination_crs)] = statistics
+
+    def get(self, origin_crs: Text, destination_crs: Text) -> Optional[LegStatistics]:
+        with self._lock:
+            return self._statistics.get((origin_crs, destination_crs))
+
+    def all(self) -> List[LegStatistics]:
+        with self._lock:
+            return list(self._statistics.values())
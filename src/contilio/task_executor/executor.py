@@ -1,23 +1,45 @@
 import asyncio
+import contextvars
 import logging
+import time
 from concurrent.futures._base import Executor
+from concurrent.futures.process import ProcessPoolExecutor
 from concurrent.futures.thread import ThreadPoolExecutor
 from functools import wraps
 from typing import cast, Callable, Awaitable, Any, TypeVar, Optional
 
 from strawberry.types import Info as GraphQLResolveInfo
 
+from contilio.metrics import REGISTRY, current_request_cost
+from contilio.task_executor.pool import InstrumentedThreadPoolExecutor
+from contilio.tracing import TRACER
+
 logger = logging.getLogger(__name__)
 
+QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "task_executor_queue_wait_seconds",
+    "Time blocking functions wait for a thread of the task executor to run on",
+)
+
 
-def get_task_executor(max_workers: int = 4) -> Executor:
-    return ThreadPoolExecutor(
+def get_task_executor(
+    max_workers: int = 4, min_workers: Optional[int] = None, adaptive: bool = False
+) -> Executor:
+    """The thread pool blocking db calls run on, sized adaptively within bounds if asked to."""
+    return InstrumentedThreadPoolExecutor(
         max_workers=max_workers,
-        thread_name_prefix="db",
+        min_workers=min_workers,
+        adaptive=adaptive,
+        name="db",
         initializer=lambda: logger.info("Spawning a Worker in an Executor Pool"),
     )
 
 
+def get_routing_executor(max_workers: int = 2) -> Executor:
+    """A process pool for CPU bound timetable searches, which would hold the GIL in a thread."""
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
 def executor_from_request_context(info: Optional[GraphQLResolveInfo]) -> Optional[Executor]:
     """A helper function that knows how to retrieve an application-level thread pool
     from contextual data assigned to Starlette/FastAPI request.
@@ -29,6 +51,13 @@ def executor_from_request_context(info: Optional[GraphQLResolveInfo]) -> Optiona
     return cast(Executor, info.context["request"].app.extra["task_executor"])
 
 
+def routing_executor_from_request_context(info: GraphQLResolveInfo) -> Optional[Executor]:
+    """Retrieves the optional application-level process pool for timetable searches."""
+    if not info.context:
+        raise ValueError("Context needs to be present")
+    return cast(Optional[Executor], info.context["request"].app.extra.get("routing_executor"))
+
+
 T = TypeVar("T")
 
 
@@ -37,6 +66,9 @@ def make_awaitable(
 ) -> Callable[[Callable[[], T]], Awaitable[T]]:
     """Produce a function that is capable of running blocking functions concurrently. If a
     ResolveInfo is supplied then the executor is taken from the request context.
+
+    Functions run in a copy of the context they were handed over from, so that their spans
+    nest within the span current at the time, after a span of the wait for a thread.
     """
     task_executor = executor_from_request_context(info) or ThreadPoolExecutor(
         thread_name_prefix="concurrently"
@@ -44,11 +76,21 @@ def make_awaitable(
     loop = asyncio.get_event_loop()
 
     def run(f: Callable[..., T]) -> Awaitable[T]:
+        submitted_at = time.perf_counter()
+        submitted_at_ns = time.time_ns()
+        context = contextvars.copy_context()
+
         @wraps(f)
         def wrapped(*args: Any, **kwargs: Any) -> Any:
-            # TODO: Trace this:
-            return f(*args, **kwargs)
+            queue_wait_secs = time.perf_counter() - submitted_at
+            QUEUE_WAIT_SECONDS.observe(queue_wait_secs)
+            cost = current_request_cost()
+            if cost is not None:
+                cost.add_executor_wait(queue_wait_secs)
+            TRACER.record("task_executor.queue", submitted_at_ns, time.time_ns())
+            with TRACER.span("task_executor.run", function=getattr(f, "__qualname__", repr(f))):
+                return f(*args, **kwargs)
 
-        return loop.run_in_executor(task_executor, wrapped)
+        return loop.run_in_executor(task_executor, context.run, wrapped)
 
     return run
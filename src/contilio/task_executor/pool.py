@@ -0,0 +1,332 @@
+import contextvars
+import inspect
+import itertools
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures._base import Executor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Hashable, Optional, Set, Text, Tuple
+
+from contilio.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    "task_executor_queue_depth", "Tasks waiting for a thread of the executor", ["executor"]
+)
+TASK_RUN_SECONDS = REGISTRY.histogram(
+    "task_executor_task_run_seconds", "Time tasks take to run on the executor", ["executor"]
+)
+ACTIVE_WORKERS = REGISTRY.gauge(
+    "task_executor_active_workers", "Threads of the executor running a task", ["executor"]
+)
+WORKERS = REGISTRY.gauge("task_executor_workers", "Threads of the executor", ["executor"])
+TARGET_WORKERS = REGISTRY.gauge(
+    "task_executor_target_workers",
+    "Threads the executor may run, which only changes in adaptive mode",
+    ["executor"],
+)
+RESIZES = REGISTRY.counter(
+    "task_executor_resizes_total",
+    "Times the adaptive executor grew or shrank its target threads",
+    ["executor", "direction"],
+)
+
+
+@dataclass
+class PoolWindow:
+    """
+    The tasks an executor ran over a window of time, and how busy it got, with the tasks and
+    run time of each operation.
+    """
+
+    tasks: int = 0
+    wait_secs: float = 0.0
+    run_secs: float = 0.0
+    peak_active: int = 0
+    operations: Dict[Hashable, Tuple[int, float]] = field(default_factory=dict)
+
+    def record(self, operation: Hashable, wait_secs: float, run_secs: float) -> None:
+        self.tasks += 1
+        self.wait_secs += wait_secs
+        self.run_secs += run_secs
+        tasks, operation_run_secs = self.operations.get(operation, (0, 0.0))
+        self.operations[operation] = (tasks + 1, operation_run_secs + run_secs)
+
+    @property
+    def mean_wait_secs(self) -> float:
+        return self.wait_secs / self.tasks if self.tasks else 0.0
+
+    @property
+    def mean_run_secs(self) -> float:
+        return self.run_secs / self.tasks if self.tasks else 0.0
+
+
+class PoolSizer:
+    """
+    Works out how many threads the executor should run from a window of its tasks at a time.
+
+    Every operation is timed against a baseline of its own, the `baseline_quantile` of its mean
+    run times over the last `window` windows, so that a change in the mix of operations does
+    not pass for a slowdown. Its run time in the window is smoothed by `run_smoothing` first.
+    When tasks take longer to run than `latency_tolerance` times their baselines, give or take
+    `slack_secs`, more threads only contend for the db, so the pool shrinks by a quarter. When
+    tasks wait for a thread longer than `queue_tolerance` times they run, it grows by a quarter,
+    but only once they run within `recovery_tolerance` of their baselines, so that it does not
+    swing between the two. A pool never more than half busy sheds a thread.
+    """
+
+    def __init__(
+        self,
+        min_workers: int,
+        max_workers: int,
+        queue_tolerance: float = 0.5,
+        latency_tolerance: float = 1.5,
+        recovery_tolerance: float = 1.2,
+        slack_secs: float = 0.001,
+        baseline_quantile: float = 0.5,
+        run_smoothing: float = 0.5,
+        window: int = 12,
+    ) -> None:
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.queue_tolerance = queue_tolerance
+        self.latency_tolerance = latency_tolerance
+        self.recovery_tolerance = recovery_tolerance
+        self.slack_secs = slack_secs
+        self.baseline_quantile = baseline_quantile
+        self.run_smoothing = run_smoothing
+        self._windows = window
+        self._run_secs: Dict[Hashable, Deque[float]] = {}
+        self._recent_secs: Dict[Hashable, float] = {}
+
+    def _baseline_secs(self, run_secs: Deque[float]) -> float:
+        ordered = sorted(run_secs)
+        return ordered[min(int(self.baseline_quantile * len(ordered)), len(ordered) - 1)]
+
+    def _recent_and_baseline_secs(self, window: PoolWindow) -> Tuple[float, float]:
+        """Mean run times of the tasks of the window, smoothed and as per their baselines."""
+        recent_secs = baseline_secs = 0.0
+        operations = window.operations or {None: (window.tasks, window.run_secs)}
+        for operation, (tasks, run_secs) in operations.items():
+            mean_run_secs = run_secs / tasks
+            recent = self._recent_secs.get(operation, mean_run_secs)
+            recent += self.run_smoothing * (mean_run_secs - recent)
+            self._recent_secs[operation] = recent
+            history = self._run_secs.setdefault(operation, deque(maxlen=self._windows))
+            baseline = self._baseline_secs(history) if history else recent
+            history.append(mean_run_secs)
+
+            recent_secs += tasks * recent
+            baseline_secs += tasks * baseline
+        return recent_secs / window.tasks, baseline_secs / window.tasks
+
+    def resize(self, workers: int, window: PoolWindow) -> int:
+        if not window.tasks:
+            return workers
+        run_secs, baseline_run_secs = self._recent_and_baseline_secs(window)
+        wait_secs = window.mean_wait_secs
+
+        step = max(1, workers // 4)
+        if run_secs > self.latency_tolerance * baseline_run_secs + self.slack_secs:
+            workers -= step
+        elif wait_secs > self.queue_tolerance * window.mean_run_secs + self.slack_secs:
+            if run_secs <= self.recovery_tolerance * baseline_run_secs + self.slack_secs:
+                workers += step
+        elif window.peak_active * 2 <= workers:
+            workers -= 1
+        return min(self.max_workers, max(self.min_workers, workers))
+
+
+def _operation(fn: Callable[..., Any], args: Tuple[Any, ...]) -> Hashable:
+    """
+    What a task runs, told apart by its code. Functions `make_awaitable` hands over run as
+    `context.run(wrapped)`, so it is the function wrapped that tells them apart.
+    """
+    if isinstance(getattr(fn, "__self__", None), contextvars.Context) and args:
+        fn = args[0]
+    fn = inspect.unwrap(fn)
+    return getattr(fn, "__code__", None) or getattr(fn, "__qualname__", type(fn).__qualname__)
+
+
+@dataclass
+class _WorkItem:
+    future: Future
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    kwargs: Dict[Text, Any]
+    submitted_at: float
+
+
+class InstrumentedThreadPoolExecutor(Executor):
+    """
+    A thread pool exporting its queue depth, the run times of its tasks, and its busy threads,
+    as metrics labelled with its `name`. How long tasks wait for a thread is exported by
+    `make_awaitable`, which the tasks of the service are handed over with.
+
+    Threads are started as tasks come, up to `max_workers`. With `adaptive` on, the pool starts
+    at `min_workers` instead, and every `adjust_interval_secs` the `PoolSizer` resizes it within
+    those bounds, from how long tasks queued against how long they ran. Threads beyond the
+    size are let go once the queue reaches them.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        min_workers: Optional[int] = None,
+        adaptive: bool = False,
+        name: Text = "db",
+        initializer: Optional[Callable[[], None]] = None,
+        adjust_interval_secs: float = 5.0,
+        sizer: Optional[PoolSizer] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.min_workers = min(max_workers, min_workers or max(1, max_workers // 4))
+        self.adaptive = adaptive
+        self.adjust_interval_secs = adjust_interval_secs
+        self._sizer = sizer or PoolSizer(self.min_workers, self.max_workers)
+        self._initializer = initializer
+        self._clock = clock
+
+        self._queue: "queue.SimpleQueue[Optional[_WorkItem]]" = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._threads: Set[threading.Thread] = set()
+        self._thread_ids = itertools.count()
+        self._target = self.min_workers if adaptive else max_workers
+        self._queued = 0
+        self._idle = 0
+        self._active = 0
+        self._retiring = 0
+        self._shutdown = False
+        self._window = PoolWindow()
+        self._window_started_at = clock()
+        TARGET_WORKERS.set(self._target, executor=name)
+
+    @property
+    def target_workers(self) -> int:
+        return self._target
+
+    @property
+    def workers(self) -> int:
+        return len(self._threads)
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            self._queue.put(_WorkItem(future, fn, args, kwargs, self._clock()))
+            self._queued += 1
+            QUEUE_DEPTH.set(self._queued, executor=self.name)
+            self._start_workers()
+        return future
+
+    def _start_workers(self) -> None:
+        while self._queued > self._idle and len(self._threads) - self._retiring < self._target:
+            thread = threading.Thread(
+                target=self._work, name=f"{self.name}_{next(self._thread_ids)}", daemon=True
+            )
+            self._threads.add(thread)
+            # Counted idle until it takes a task, so that it is not started twice over
+            self._idle += 1
+            thread.start()
+        WORKERS.set(len(self._threads), executor=self.name)
+
+    def _work(self) -> None:
+        if self._initializer is not None:
+            try:
+                self._initializer()
+            except Exception:
+                logger.exception("Initializer of executor %s failed", self.name)
+        while True:
+            item = self._queue.get()
+            with self._lock:
+                self._idle -= 1
+                if item is None:
+                    if self._shutdown or self._retiring:
+                        if not self._shutdown:
+                            self._retiring -= 1
+                        self._threads.discard(threading.current_thread())
+                        WORKERS.set(len(self._threads), executor=self.name)
+                        return
+                    self._idle += 1
+                    continue
+                self._queued -= 1
+                self._active += 1
+                self._window.peak_active = max(self._window.peak_active, self._active)
+                QUEUE_DEPTH.set(self._queued, executor=self.name)
+                ACTIVE_WORKERS.set(self._active, executor=self.name)
+            self._run(item)
+            del item
+
+    def _run(self, item: _WorkItem) -> None:
+        if not item.future.set_running_or_notify_cancel():
+            with self._lock:
+                self._active -= 1
+                self._idle += 1
+                ACTIVE_WORKERS.set(self._active, executor=self.name)
+            return
+
+        started_at = self._clock()
+        wait_secs = started_at - item.submitted_at
+        try:
+            result = item.fn(*item.args, **item.kwargs)
+        except BaseException as e:
+            item.future.set_exception(e)
+        else:
+            item.future.set_result(result)
+        finished_at = self._clock()
+        run_secs = finished_at - started_at
+        TASK_RUN_SECONDS.observe(run_secs, executor=self.name)
+
+        with self._lock:
+            self._active -= 1
+            self._idle += 1
+            ACTIVE_WORKERS.set(self._active, executor=self.name)
+            self._window.record(_operation(item.fn, item.args), wait_secs, run_secs)
+            if (
+                self.adaptive
+                and finished_at - self._window_started_at >= self.adjust_interval_secs
+            ):
+                self._resize(self._sizer.resize(self._target, self._window))
+                self._window = PoolWindow(peak_active=self._active)
+                self._window_started_at = finished_at
+
+    def _resize(self, target: int) -> None:
+        if target == self._target or self._shutdown:
+            return
+        RESIZES.inc(executor=self.name, direction="grow" if target > self._target else "shrink")
+        logger.info("Resizing executor %s from %s to %s threads", self.name, self._target, target)
+        self._target = target
+        TARGET_WORKERS.set(target, executor=self.name)
+        excess = len(self._threads) - self._retiring - target
+        for _ in range(max(0, excess)):
+            self._retiring += 1
+            self._queue.put(None)
+        self._start_workers()
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            self._shutdown = True
+            if cancel_futures:
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not None:
+                        item.future.cancel()
+                        self._queued -= 1
+                QUEUE_DEPTH.set(self._queued, executor=self.name)
+            threads = list(self._threads)
+            for _ in threads:
+                self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,22 @@
+from contilio.tracing.exporters import (
+    OTLP_TRACES_PATH,
+    BatchSpanExporter,
+    JsonLinesSpanExporter,
+    OtlpHttpSpanExporter,
+    create_span_exporter,
+    read_spans,
+)
+from contilio.tracing.spans import TRACER, Span, SpanExporter, Tracer
+
+__all__ = (
+    "OTLP_TRACES_PATH",
+    "TRACER",
+    "BatchSpanExporter",
+    "JsonLinesSpanExporter",
+    "OtlpHttpSpanExporter",
+    "Span",
+    "SpanExporter",
+    "Tracer",
+    "create_span_exporter",
+    "read_spans",
+)
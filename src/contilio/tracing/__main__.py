@@ -0,0 +1,50 @@
+"""
+Runs a local stand-in for an OpenTelemetry collector, appending the spans the service exports
+to a json lines file, for the service to be traced without one by pointing
+`JP_TRACE_ENDPOINT` at it.
+
+    python -m contilio.tracing --port 4318 --output spans.jsonl
+"""
+import argparse
+from logging import INFO, basicConfig, getLogger
+
+from aiohttp import web
+
+from contilio.tracing.collector import TraceCollector, create_collector_app
+from contilio.tracing.exporters import JsonLinesSpanExporter
+
+logger = getLogger(__name__)
+
+
+def arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=4318)
+    parser.add_argument("--output", default="spans.jsonl", help="json lines file of spans")
+    return parser
+
+
+def main() -> None:
+    args = arg_parser().parse_args()
+    exporter = JsonLinesSpanExporter(args.output)
+
+    basicConfig(level=INFO)
+    logger.info(
+        "Writing spans to %s, set JP_TRACE_ENDPOINT=http://%s:%s",
+        args.output,
+        args.host,
+        args.port,
+    )
+    try:
+        web.run_app(
+            create_collector_app(TraceCollector(exporter)),
+            host=args.host,
+            port=args.port,
+            print=None,
+        )
+    finally:
+        exporter.shutdown()
+
+
+if __name__ == "__main__":
+    main()
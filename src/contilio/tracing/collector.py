@@ -0,0 +1,32 @@
+from aiohttp import web
+
+from contilio.tracing.exporters import OTLP_TRACES_PATH, spans_of_otlp_request
+from contilio.tracing.spans import SpanExporter
+
+
+class TraceCollector:
+    """
+    A local stand-in for an OpenTelemetry collector, taking OTLP json export requests over http
+    and handing their spans over to `exporter`, such as a json lines file.
+    """
+
+    def __init__(self, exporter: SpanExporter) -> None:
+        self.exporter = exporter
+        self.spans = 0
+
+    async def traces(self, request: web.Request) -> web.Response:
+        if request.content_type != "application/json":
+            raise web.HTTPUnsupportedMediaType(text="Only OTLP json is supported")
+        try:
+            spans = spans_of_otlp_request(await request.json())
+        except (ValueError, KeyError, TypeError) as e:
+            raise web.HTTPBadRequest(text=f"Malformed OTLP request: {e!r}")
+        self.exporter.export(spans)
+        self.spans += len(spans)
+        return web.json_response({"partialSuccess": {}})
+
+
+def create_collector_app(collector: TraceCollector) -> web.Application:
+    app = web.Application()
+    app.router.add_post(OTLP_TRACES_PATH, collector.traces)
+    return app
@@ -0,0 +1,176 @@
+import json
+import os
+import threading
+import urllib.request
+from collections import deque
+from logging import getLogger
+from typing import Any, Deque, Dict, List, Optional, Sequence, Text
+
+from contilio.config import SERVICE_NAME
+from contilio.metrics import REGISTRY
+from contilio.tracing.spans import Span, SpanExporter
+
+logger = getLogger(__name__)
+
+OTLP_TRACES_PATH = "/v1/traces"
+
+DROPPED_SPANS = REGISTRY.counter(
+    "tracing_spans_dropped_total",
+    "Spans dropped, either as the export queue was full or as exporting them failed",
+    ["reason"],
+)
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """
+    Appends spans to a json lines file, a span per line as OTLP json encodes it.
+
+    Every batch goes out in a single append, so the workers of the service can all export to
+    the same file without their lines interleaving.
+    """
+
+    def __init__(self, path: Text) -> None:
+        self.path = path
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def export(self, spans: Sequence[Span]) -> None:
+        lines = "".join(json.dumps(span.to_otlp(), separators=(",", ":")) + "\n" for span in spans)
+        os.write(self._fd, lines.encode())
+
+    def shutdown(self) -> None:
+        os.close(self._fd)
+
+
+def read_spans(path: Text) -> List[Span]:
+    """The spans of a file `JsonLinesSpanExporter` appended to, in the order they started."""
+    with open(path) as f:
+        spans = [Span.from_otlp(json.loads(line)) for line in f if line.strip()]
+    return sorted(spans, key=lambda span: span.start_time_ns)
+
+
+def otlp_request(spans: Sequence[Span], service_name: Text = SERVICE_NAME) -> Dict[Text, Any]:
+    """An OTLP json export request of the spans, all of them from the service."""
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]
+                },
+                "scopeSpans": [
+                    {"scope": {"name": "contilio"}, "spans": [span.to_otlp() for span in spans]}
+                ],
+            }
+        ]
+    }
+
+
+def spans_of_otlp_request(request: Dict[Text, Any]) -> List[Span]:
+    return [
+        Span.from_otlp(span)
+        for resource_spans in request.get("resourceSpans", [])
+        for scope_spans in resource_spans.get("scopeSpans", [])
+        for span in scope_spans.get("spans", [])
+    ]
+
+
+class OtlpHttpSpanExporter(SpanExporter):
+    """
+    Posts spans as OTLP json to a collector, such as `python -m contilio.tracing` or any
+    OpenTelemetry collector with an OTLP http receiver. Posts block, so batch them.
+    """
+
+    def __init__(
+        self, endpoint: Text, service_name: Text = SERVICE_NAME, timeout_secs: float = 5
+    ) -> None:
+        self.url = endpoint.rstrip("/") + OTLP_TRACES_PATH
+        self.service_name = service_name
+        self.timeout_secs = timeout_secs
+
+    def export(self, spans: Sequence[Span]) -> None:
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(otlp_request(spans, self.service_name)).encode(),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout_secs):
+            pass
+
+    def shutdown(self) -> None:
+        pass
+
+
+class BatchSpanExporter(SpanExporter):
+    """
+    Queues spans up to `max_queue_size`, for a thread of its own to hand over to `exporter`
+    in batches of up to `max_batch_size`, at least every `schedule_delay_secs`. Spans never
+    wait on the export: once the queue is full, further spans are dropped until it drains.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 512,
+        schedule_delay_secs: float = 1.0,
+    ) -> None:
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.schedule_delay_secs = schedule_delay_secs
+        self._queue: Deque[Span] = deque()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, spans: Sequence[Span]) -> None:
+        with self._condition:
+            room = self.max_queue_size - len(self._queue)
+            self._queue.extend(spans[:room])
+            if len(self._queue) >= self.max_batch_size:
+                self._condition.notify()
+        if len(spans) > room:
+            DROPPED_SPANS.inc(len(spans) - room, reason="queue_full")
+
+    def _next_batch(self) -> Optional[List[Span]]:
+        with self._condition:
+            if len(self._queue) < self.max_batch_size and not self._shutdown:
+                self._condition.wait(self.schedule_delay_secs)
+            if not self._queue:
+                return None if self._shutdown else []
+            return [
+                self._queue.popleft() for _ in range(min(self.max_batch_size, len(self._queue)))
+            ]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            if not batch:
+                continue
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                logger.warning("Could not export %s spans: %r", len(batch), e)
+                DROPPED_SPANS.inc(len(batch), reason="export_failed")
+
+    def shutdown(self) -> None:
+        """Exports the spans still queued, then shuts down the exporter."""
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify()
+        self._thread.join()
+        self.exporter.shutdown()
+
+
+def create_span_exporter(
+    trace_file: Optional[Text] = None, trace_endpoint: Optional[Text] = None
+) -> Optional[SpanExporter]:
+    """Batches spans to a json lines file, or to an OTLP collector, if either is given."""
+    if trace_endpoint:
+        return BatchSpanExporter(OtlpHttpSpanExporter(trace_endpoint))
+    if trace_file:
+        return BatchSpanExporter(JsonLinesSpanExporter(trace_file))
+    return None
@@ -0,0 +1,186 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, Optional, Protocol, Sequence, Text
+
+
+@dataclass
+class Span:
+    """
+    A timed step of a request, such as a resolver, a db read or an upstream call. Every span of
+    a request shares its trace id, and all but the first have the span they ran within as
+    parent. Times are in nanoseconds since the epoch, as OTLP has them.
+    """
+
+    name: Text
+    trace_id: Text
+    span_id: Text
+    parent_span_id: Optional[Text]
+    start_time_ns: int
+    end_time_ns: int = 0
+    attributes: Dict[Text, Any] = field(default_factory=dict)
+    error: Optional[Text] = None
+    recording: bool = True
+
+    @property
+    def duration_secs(self) -> float:
+        return (self.end_time_ns - self.start_time_ns) / 1e9
+
+    def set_attribute(self, key: Text, value: Any) -> None:
+        if self.recording:
+            self.attributes[key] = value
+
+    def to_otlp(self) -> Dict[Text, Any]:
+        """The span as OTLP json encodes it."""
+        span: Dict[Text, Any] = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "startTimeUnixNano": str(self.start_time_ns),
+            "endTimeUnixNano": str(self.end_time_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)} for key, value in self.attributes.items()
+            ],
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.error is not None:
+            span["status"] = {"code": 2, "message": self.error}
+        return span
+
+    @classmethod
+    def from_otlp(cls, span: Dict[Text, Any]) -> "Span":
+        status = span.get("status") or {}
+        return cls(
+            name=span["name"],
+            trace_id=span["traceId"],
+            span_id=span["spanId"],
+            parent_span_id=span.get("parentSpanId") or None,
+            start_time_ns=int(span["startTimeUnixNano"]),
+            end_time_ns=int(span["endTimeUnixNano"]),
+            attributes={
+                attribute["key"]: _from_otlp_value(attribute["value"])
+                for attribute in span.get("attributes", [])
+            },
+            error=status.get("message", "") if status.get("code") == 2 else None,
+        )
+
+
+def _otlp_value(value: Any) -> Dict[Text, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _from_otlp_value(value: Dict[Text, Any]) -> Any:
+    if "intValue" in value:
+        return int(value["intValue"])
+    ((_, decoded),) = value.items()
+    return decoded
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: Sequence[Span]) -> None:
+        ...
+
+    def shutdown(self) -> None:
+        ...
+
+
+# Spans of traces left out by sampling, which their children are left out along with
+_NOT_SAMPLED = Span("not_sampled", "", "", None, 0, recording=False)
+# What spans yield while no exporter is set, so that callers can set attributes regardless
+_NON_RECORDING = Span("non_recording", "", "", None, 0, recording=False)
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Records spans to an exporter, if any, nesting each within the span current in its context.
+
+    Only `sample_ratio` of traces are recorded, decided on their first span. Contexts follow
+    tasks, but not threads: a function handed to a thread keeps to its span by running in a
+    copy of the context it was handed over from, as `make_awaitable` does.
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        sample_ratio: float = 1.0,
+        sampler: Callable[[], float] = random.random,
+    ) -> None:
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+        self._sampler = sampler
+
+    def configure(self, exporter: Optional[SpanExporter], sample_ratio: float = 1.0) -> None:
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+
+    def shutdown(self) -> None:
+        exporter, self.exporter = self.exporter, None
+        if exporter is not None:
+            exporter.shutdown()
+
+    @property
+    def current_span(self) -> Optional[Span]:
+        span = _current_span.get()
+        return span if span is not None and span.recording else None
+
+    def _start(self, name: Text, start_time_ns: int, attributes: Dict[Text, Any]) -> Span:
+        parent = _current_span.get()
+        if parent is _NOT_SAMPLED:
+            return _NOT_SAMPLED
+        if parent is None and self._sampler() >= self.sample_ratio:
+            return _NOT_SAMPLED
+        return Span(
+            name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_span_id=parent.span_id if parent else None,
+            start_time_ns=start_time_ns,
+            attributes=attributes,
+        )
+
+    @contextmanager
+    def span(self, name: Text, **attributes: Any) -> Iterator[Span]:
+        """Records the block as a span, with the error it raises, if any."""
+        exporter = self.exporter
+        if exporter is None:
+            yield _NON_RECORDING
+            return
+
+        span = self._start(name, time.time_ns(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            if span.recording:
+                span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            if span.recording:
+                span.end_time_ns = time.time_ns()
+                exporter.export([span])
+
+    def record(self, name: Text, start_time_ns: int, end_time_ns: int, **attributes: Any) -> None:
+        """Records a span that already happened, such as the wait before the current span."""
+        exporter = self.exporter
+        if exporter is None:
+            return
+        span = self._start(name, start_time_ns, attributes)
+        if span.recording:
+            span.end_time_ns = end_time_ns
+            exporter.export([span])
+
+
+TRACER = Tracer()
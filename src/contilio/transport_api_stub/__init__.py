@@ -0,0 +1,17 @@
+from contilio.transport_api_stub.profiles import PROFILES, StubProfile
+from contilio.transport_api_stub.server import (
+    PUBLIC_JOURNEY_PATH,
+    TransportApiStub,
+    create_stub_app,
+)
+from contilio.transport_api_stub.timetable import LegTimetable, SyntheticTimetable
+
+__all__ = (
+    "PROFILES",
+    "PUBLIC_JOURNEY_PATH",
+    "LegTimetable",
+    "StubProfile",
+    "SyntheticTimetable",
+    "TransportApiStub",
+    "create_stub_app",
+)
@@ -0,0 +1,66 @@
+"""
+Runs a local stand-in for the TransportApi public journey endpoint, for the service to be run
+against fully offline by pointing `TRANSPORT_API_BASE_URL` at it.
+
+    python -m contilio.transport_api_stub --profile realistic --port 5003
+"""
+import argparse
+import dataclasses
+from logging import INFO, basicConfig, getLogger
+
+from aiohttp import web
+
+from contilio.transport_api_stub.profiles import PROFILES
+from contilio.transport_api_stub.server import (
+    PUBLIC_JOURNEY_PATH,
+    TransportApiStub,
+    create_stub_app,
+)
+from contilio.transport_api_stub.timetable import SyntheticTimetable
+
+logger = getLogger(__name__)
+
+
+def arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5003)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="realistic")
+    parser.add_argument("--seed", type=int, default=0, help="seeds timetables and latencies")
+    parser.add_argument("--unroutable-ratio", type=float, default=0.05)
+    for field in dataclasses.fields(PROFILES["instant"]):
+        parser.add_argument(
+            f"--{field.name.replace('_', '-')}",
+            type=float if field.name != "requests_per_minute" else int,
+            help="overrides the profile",
+        )
+    return parser
+
+
+def main() -> None:
+    args = arg_parser().parse_args()
+    overrides = {
+        field.name: getattr(args, field.name)
+        for field in dataclasses.fields(PROFILES[args.profile])
+        if getattr(args, field.name) is not None
+    }
+    profile = dataclasses.replace(PROFILES[args.profile], **overrides)
+    stub = TransportApiStub(
+        SyntheticTimetable(seed=args.seed, unroutable_ratio=args.unroutable_ratio),
+        profile,
+        seed=args.seed,
+    )
+
+    basicConfig(level=INFO)
+    logger.info(
+        "Serving %s, set TRANSPORT_API_BASE_URL=http://%s:%s%s",
+        profile,
+        args.host,
+        args.port,
+        PUBLIC_JOURNEY_PATH,
+    )
+    web.run_app(create_stub_app(stub), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
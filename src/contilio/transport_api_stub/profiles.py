@@ -0,0 +1,29 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Text
+
+
+@dataclass(frozen=True)
+class StubProfile:
+    """
+    How the stub behaves: latencies are drawn from a log-normal distribution around
+    `median_latency_ms`, plus `latency_per_request_in_flight_ms` for every other request in
+    flight. `error_rate` of requests fail with a 503, and requests beyond `requests_per_minute`
+    are throttled with a 429.
+    """
+
+    median_latency_ms: float = 0
+    latency_sigma: float = 0
+    latency_per_request_in_flight_ms: float = 0
+    error_rate: float = 0
+    requests_per_minute: Optional[int] = None
+
+
+PROFILES: Dict[Text, StubProfile] = {
+    "instant": StubProfile(),
+    "realistic": StubProfile(median_latency_ms=250, latency_sigma=0.6),
+    "flaky": StubProfile(median_latency_ms=250, latency_sigma=0.6, error_rate=0.1),
+    "throttled": StubProfile(median_latency_ms=250, latency_sigma=0.6, requests_per_minute=30),
+    "overloaded": StubProfile(
+        median_latency_ms=100, latency_sigma=0.4, latency_per_request_in_flight_ms=20
+    ),
+}
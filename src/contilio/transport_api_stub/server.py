@@ -0,0 +1,142 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Mapping, Text, Tuple
+
+from aiohttp import web
+
+from contilio.transport_api_stub.profiles import StubProfile
+from contilio.transport_api_stub.timetable import SyntheticTimetable
+
+PUBLIC_JOURNEY_PATH = "/v3/uk/public_journey.json"
+ROUTES_PER_RESPONSE = 3
+CRS_PREFIX = "crs:"
+THROTTLE_WINDOW_SECS = 60
+
+
+def _format_duration(departure_at: datetime, arrival_at: datetime) -> Text:
+    minutes = int((arrival_at - departure_at).total_seconds() // 60)
+    return f"{minutes // 60:02d}:{minutes % 60:02d}:00"
+
+
+def public_journey_route(
+    origin_crs: Text, destination_crs: Text, departure_at: datetime, arrival_at: datetime
+) -> Dict[Text, Any]:
+    times = dict(
+        departure_time=departure_at.strftime("%H:%M"),
+        arrival_time=arrival_at.strftime("%H:%M"),
+        departure_datetime=departure_at.isoformat(),
+        arrival_datetime=arrival_at.isoformat(),
+    )
+    return dict(
+        duration=_format_duration(departure_at, arrival_at),
+        route_parts=[
+            dict(
+                mode="train",
+                from_point_name=origin_crs,
+                to_point_name=destination_crs,
+                destination=destination_crs,
+                line_name="",
+                duration=_format_duration(departure_at, arrival_at),
+                **times,
+            )
+        ],
+        departure_date=departure_at.strftime("%Y-%m-%d"),
+        arrival_date=arrival_at.strftime("%Y-%m-%d"),
+        **times,
+    )
+
+
+class TransportApiStub:
+    """
+    A local stand-in for the TransportApi public journey endpoint, answering from a synthetic
+    timetable, with the latencies, errors and throttling of the given profile.
+    """
+
+    def __init__(
+        self,
+        timetable: SyntheticTimetable,
+        profile: StubProfile,
+        seed: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.timetable = timetable
+        self.profile = profile
+        self.requests = 0
+        self.in_flight = 0
+        self._random = random.Random(seed)
+        self._clock = clock
+        self._recent_requests: Deque[float] = deque()
+
+    def _latency_secs(self) -> float:
+        latency_ms = self.profile.median_latency_ms
+        if latency_ms and self.profile.latency_sigma:
+            latency_ms *= math.exp(self._random.gauss(0, self.profile.latency_sigma))
+        latency_ms += self.profile.latency_per_request_in_flight_ms * (self.in_flight - 1)
+        return latency_ms / 1000
+
+    def _is_throttled(self) -> bool:
+        if self.profile.requests_per_minute is None:
+            return False
+        now = self._clock()
+        while self._recent_requests and self._recent_requests[0] <= now - THROTTLE_WINDOW_SECS:
+            self._recent_requests.popleft()
+        if len(self._recent_requests) >= self.profile.requests_per_minute:
+            return True
+        self._recent_requests.append(now)
+        return False
+
+    def answer(self, query: Mapping[str, str]) -> Tuple[int, Dict[Text, Any]]:
+        """The status and body of the response to a public journey query."""
+        try:
+            origin_crs = query["from"].removeprefix(CRS_PREFIX)
+            destination_crs = query["to"].removeprefix(CRS_PREFIX)
+            datetime_of_interest = datetime.strptime(
+                f"{query['date']} {query['time']}", "%Y-%m-%d %H:%M"
+            )
+        except (KeyError, ValueError):
+            return 400, {"error": "Expected from, to, date and time parameters"}
+
+        leg = self.timetable.leg(origin_crs, destination_crs)
+        if leg is None:
+            return 200, {"error": f"No journey found from {origin_crs} to {destination_crs}"}
+
+        routes: List[Dict[Text, Any]] = [
+            public_journey_route(origin_crs, destination_crs, departure_at, arrival_at)
+            for departure_at, arrival_at in leg.departures_from(
+                datetime_of_interest, ROUTES_PER_RESPONSE
+            )
+        ]
+        return 200, {
+            "request_time": datetime.now().isoformat(),
+            "source": "Contilio TransportApi stub",
+            "acknowledgements": f"Synthetic timetable, seed {self.timetable.seed}",
+            "routes": routes,
+        }
+
+    async def public_journey(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            if self._is_throttled():
+                return web.json_response(
+                    {"error": "Rate limit exceeded"},
+                    status=429,
+                    headers={"Retry-After": str(THROTTLE_WINDOW_SECS)},
+                )
+            await asyncio.sleep(self._latency_secs())
+            if self._random.random() < self.profile.error_rate:
+                return web.json_response({"error": "Service unavailable"}, status=503)
+            status, body = self.answer(request.query)
+            return web.json_response(body, status=status)
+        finally:
+            self.in_flight -= 1
+
+
+def create_stub_app(stub: TransportApiStub) -> web.Application:
+    app = web.Application()
+    app.router.add_get(PUBLIC_JOURNEY_PATH, stub.public_journey)
+    return app
@@ -0,0 +1,73 @@
+import hashlib
+import math
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional, Text, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+
+
+@dataclass(frozen=True)
+class LegTimetable:
+    """A leg with a train every `headway_in_minutes` through the service day, every day."""
+
+    first_departure_in_minutes: int
+    last_departure_in_minutes: int
+    headway_in_minutes: int
+    duration_in_minutes: int
+
+    def departures_from(self, after: datetime, count: int) -> List[Tuple[datetime, datetime]]:
+        """The first `count` departures at or after the given time, with their arrivals."""
+        midnight = datetime.combine(after.date(), datetime.min.time(), tzinfo=after.tzinfo)
+        minutes = (after - midnight) / timedelta(minutes=1)
+        if minutes <= self.first_departure_in_minutes:
+            slot = 0
+        else:
+            slot = math.ceil((minutes - self.first_departure_in_minutes) / self.headway_in_minutes)
+
+        departures = []
+        while len(departures) < count:
+            departure_in_minutes = self.first_departure_in_minutes + slot * self.headway_in_minutes
+            if departure_in_minutes > self.last_departure_in_minutes:
+                # Past the last train, so on to the first one of the next day
+                midnight += timedelta(days=1)
+                slot = 0
+                continue
+            departure_at = midnight + timedelta(minutes=departure_in_minutes)
+            departures.append(
+                (departure_at, departure_at + timedelta(minutes=self.duration_in_minutes))
+            )
+            slot += 1
+        return departures
+
+
+class SyntheticTimetable:
+    """
+    Makes up a timetable for every pair of stations, the same every time for the same seed.
+
+    Each pair gets a service from early morning to late evening, at a headway of 10 to 60
+    minutes and a duration of 5 to 95 minutes, while `unroutable_ratio` of pairs get no service
+    at all.
+    """
+
+    def __init__(self, seed: int = 0, unroutable_ratio: float = 0.05) -> None:
+        self.seed = seed
+        self.unroutable_ratio = unroutable_ratio
+
+    def _draws(self, origin_crs: Text, destination_crs: Text) -> bytes:
+        return hashlib.sha256(f"{self.seed}:{origin_crs}:{destination_crs}".encode()).digest()
+
+    def leg(self, origin_crs: Text, destination_crs: Text) -> Optional[LegTimetable]:
+        if origin_crs == destination_crs:
+            return None
+        draws = self._draws(origin_crs, destination_crs)
+        if draws[0] / 256 < self.unroutable_ratio:
+            return None
+        headway_in_minutes = (10, 15, 20, 30, 60)[draws[1] % 5]
+        first_departure_in_minutes = 5 * 60 + draws[2] % 60
+        return LegTimetable(
+            first_departure_in_minutes=first_departure_in_minutes,
+            last_departure_in_minutes=23 * 60 + draws[3] % 45,
+            headway_in_minutes=headway_in_minutes,
+            duration_in_minutes=5 + draws[4] % 91,
+        )
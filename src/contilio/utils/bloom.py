@@ -0,0 +1,155 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterable, Iterator, Optional, Text, Tuple, Union
+
+BITS_PER_BYTE = 8
+
+SHARED_MAGIC = b"CTLBLOOM"
+SHARED_HEADER = struct.Struct("<8sQI")
+
+
+def bloom_filter_geometry(capacity: int, false_positive_rate: float) -> Tuple[int, int]:
+    """The number of bits and of hashes for `capacity` keys at the false positive rate."""
+    capacity = max(capacity, 1)
+    num_bits = math.ceil(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+class BloomFilter:
+    """
+    A set of keys that answers membership in a few bits per key. It never misses a key that was
+    added, but claims a key that was not with a chance of about the false positive rate it was
+    sized for, which grows past its capacity.
+    """
+
+    def __init__(
+        self, num_bits: int, num_hashes: int, bits: Optional[Union[bytearray, memoryview]] = None
+    ) -> None:
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray(math.ceil(num_bits / BITS_PER_BYTE))
+
+    @classmethod
+    def for_capacity(cls, capacity: int, false_positive_rate: float = 0.001) -> "BloomFilter":
+        return cls(*bloom_filter_geometry(capacity, false_positive_rate))
+
+    @classmethod
+    def from_keys(cls, keys: Iterable[Text], false_positive_rate: float = 0.001) -> "BloomFilter":
+        keys = list(keys)
+        bloom_filter = cls.for_capacity(len(keys), false_positive_rate)
+        for key in keys:
+            bloom_filter.add(key)
+        return bloom_filter
+
+    def _positions(self, key: Text) -> Iterator[int]:
+        # Double hashing, from the two halves of a single digest
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: Text) -> None:
+        for position in self._positions(key):
+            self.bits[position // BITS_PER_BYTE] |= 1 << (position % BITS_PER_BYTE)
+
+    def update(self, keys: Iterable[Text]) -> None:
+        for key in keys:
+            self.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        if not isinstance(key, str):
+            return False
+        return all(
+            self.bits[position // BITS_PER_BYTE] & (1 << (position % BITS_PER_BYTE))
+            for position in self._positions(key)
+        )
+
+
+class SharedBloomFilter(BloomFilter):
+    """
+    A Bloom filter kept in a memory mapped file, so that every worker process reads and adds to
+    the same bits.
+
+    Bits are only ever set, never cleared, so workers may all add the keys they know about at
+    startup. Adds hold a lock on the file, as setting a bit rewrites its whole byte, which would
+    otherwise lose bits set by another worker at the same time.
+
+    A file sized for another capacity or false positive rate is replaced by a fresh one rather
+    than resized in place, as workers still running may have it mapped: they carry on with the
+    file they have, and workers starting from then on share the new one.
+    """
+
+    def __init__(self, path: Text, capacity: int, false_positive_rate: float = 0.01) -> None:
+        num_bits, num_hashes = bloom_filter_geometry(capacity, false_positive_rate)
+        header = SHARED_HEADER.pack(SHARED_MAGIC, num_bits, num_hashes)
+        header_size = SHARED_HEADER.size
+        size = header_size + math.ceil(num_bits / BITS_PER_BYTE)
+
+        self._lock = Lock()
+        self._fd = _open_shared_file(path, header, size)
+        self._mmap = mmap.mmap(self._fd, size)
+        self._view = memoryview(self._mmap)[header_size:]
+        super().__init__(num_bits, num_hashes, self._view)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def add(self, key: Text) -> None:
+        with self._locked():
+            super().add(key)
+
+    def update(self, keys: Iterable[Text]) -> None:
+        with self._locked():
+            for key in keys:
+                super().add(key)
+
+    def close(self) -> None:
+        self._view.release()
+        self._mmap.close()
+        os.close(self._fd)
+
+
+def _open_shared_file(path: Text, header: bytes, size: int) -> int:
+    """Opens the filter file at the path, replacing it with a fresh one unless it has the header."""
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        if os.fstat(fd).st_ino == os.stat(path).st_ino:
+            break
+        # Replaced by another worker while waiting for the lock, so on to the new file
+        os.close(fd)
+
+    try:
+        existing = os.pread(fd, SHARED_HEADER.size, 0)
+        if existing and existing != header:
+            fresh_path = f"{path}.{os.getpid()}"
+            fresh_fd = os.open(fresh_path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+            os.ftruncate(fresh_fd, size)
+            os.pwrite(fresh_fd, header, 0)
+            os.replace(fresh_path, path)
+            # Closing the replaced file releases its lock, for workers waiting on it to move on
+            os.close(fd)
+            return fresh_fd
+        if not existing:
+            # Only just created, so not mapped by anyone yet
+            os.ftruncate(fd, size)
+            os.pwrite(fd, header, 0)
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return fd
+    except BaseException:
+        os.close(fd)
+        raise
@@ -25,13 +25,16 @@ def init_service(
     engine = create_engine(env)
     alembic_directory = env.ALEMBIC_DIRECTORY
     if use_alembic:
-        alembic_cfg_path = f"{root(alembic_directory)}/alembic.ini"
-        command.upgrade(Config(alembic_cfg_path), "heads")
+        command.upgrade(alembic_config(alembic_directory), "heads")
     else:
         Base.metadata.create_all(engine)
     return engine
 
 
+def alembic_config(alembic_directory: Text) -> Config:
+    return Config(f"{root(alembic_directory)}/alembic.ini")
+
+
 def create_engine(
     env: RequiredEnviron,
 ) -> sqla.engine.Engine:
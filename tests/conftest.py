@@ -3,10 +3,10 @@ Fixtures defined here are automatically shared across all tests
 under the tests directory.
 Read more on conftest.py: https://docs.pytest.org/en/2.7.3/plugins.html
 """
-import asyncio
 import os
 from contextlib import contextmanager
 from datetime import datetime, timedelta
+from functools import partial
 from logging import getLogger
 from typing import Callable, Optional, Text
 from unittest.mock import MagicMock, Mock
@@ -58,7 +58,7 @@ def graphql_client_helper(create_fastapi_client):
 @fixture(scope="function")
 def mock_transportapi_client() -> TransportApiClient:
     async def get_train_route_plan(
-        point_a: str, point_b: str, datetime_of_interest: datetime
+        point_a: str, point_b: str, datetime_of_interest: datetime, **kwargs
     ) -> TrainRoutePlan:
         return TrainRoutePlan.from_dict(
             {
@@ -77,6 +77,9 @@ def mock_transportapi_client() -> TransportApiClient:
 
     client = MagicMock()
     client.get_train_route_plan.side_effect = get_train_route_plan
+    client.get_train_route_plans.side_effect = partial(
+        TransportApiClient.get_train_route_plans, client
+    )
     return client
 
 
@@ -105,12 +108,14 @@ def create_fastapi_client(
         task_executor=task_executor_pool,
         persistence_factory=in_memory_persistence_factory,
         transportapi_client=mock_transportapi_client,
+        **app_kwargs,
     ) -> TestClient:
 
         app = get_app(
             task_executor=task_executor,
             persistence_factory=persistence_factory,
             transportapi_client=transportapi_client,
+            **app_kwargs,
         )
 
         return TestClient(app)
@@ -0,0 +1,73 @@
+"""
+A local stand-in for TransportApi, for tests to inject faults and delays into its responses.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+
+class FaultInjectingTransportApi:
+    """
+    A local stand-in for the TransportApi public journey endpoint, which answers with the
+    statuses queued up in `faults`, then to the next `no_routes` requests with no routes at all,
+    before answering successfully, 5 minutes after the time asked.
+    Each request is first delayed by the next of the seconds queued up in `delays`, if any, and
+    by `delay_per_request_in_flight` for every request in flight, to slow down under load.
+    """
+
+    def __init__(self) -> None:
+        self.faults: List[int] = []
+        self.no_routes = 0
+        self.delays: List[float] = []
+        self.delay_per_request_in_flight = 0.0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.url = ""
+
+    async def public_journey(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delays:
+                await asyncio.sleep(self.delays.pop(0))
+            await asyncio.sleep(self.delay_per_request_in_flight * self.in_flight)
+        finally:
+            self.in_flight -= 1
+        if self.faults:
+            return web.json_response({"error": "Injected fault"}, status=self.faults.pop(0))
+        if self.no_routes:
+            self.no_routes -= 1
+            return web.json_response({"routes": []})
+        datetime_of_interest = datetime.strptime(
+            f"{request.query['date']} {request.query['time']}", "%Y-%m-%d %H:%M"
+        )
+        return web.json_response(
+            {
+                "routes": [
+                    {
+                        "departure_datetime": (
+                            datetime_of_interest + timedelta(minutes=5)
+                        ).isoformat(),
+                        "arrival_datetime": (
+                            datetime_of_interest + timedelta(minutes=15)
+                        ).isoformat(),
+                    }
+                ]
+            }
+        )
+
+
+@asynccontextmanager
+async def fault_injecting_transportapi() -> AsyncIterator[FaultInjectingTransportApi]:
+    stub = FaultInjectingTransportApi()
+    app = web.Application()
+    app.router.add_get("/v3/uk/public_journey.json", stub.public_journey)
+    async with TestServer(app) as server:
+        stub.url = str(server.make_url("/v3/uk/public_journey.json"))
+        yield stub
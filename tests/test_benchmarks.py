@@ -0,0 +1,32 @@
+from benchmarks.harness import compare, load_baseline, measure, save_baseline
+
+
+def test_compare_flags_only_benchmarks_slower_than_the_threshold():
+    baseline = {"fast": 1.0, "steady": 1.0, "slow": 1.0, "removed": 1.0}
+    current = {"fast": 0.5, "steady": 1.2, "slow": 1.3, "added": 9.0}
+
+    regressions = compare(baseline, current, threshold=0.25)
+
+    assert [(r.name, r.ratio) for r in regressions] == [("slow", 1.3)]
+
+
+def test_compare_spares_slowdowns_within_the_noise_floor():
+    baseline = {"thread_hop": 50e-6, "db_read": 300e-6}
+    current = {"thread_hop": 65e-6, "db_read": 400e-6}
+
+    regressions = compare(baseline, current, threshold=0.25, noise_floor_secs=20e-6)
+
+    assert [r.name for r in regressions] == ["db_read"]
+
+
+def test_baselines_round_trip(tmp_path):
+    path = str(tmp_path / "baselines.json")
+    assert load_baseline(path) is None
+
+    save_baseline(path, {"hasher": 1e-6})
+
+    assert load_baseline(path) == {"hasher": 1e-6}
+
+
+def test_measure_times_a_single_call():
+    assert 0 < measure(lambda: sum(range(100))) < 0.01
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+
+from contilio.api.capture import CapturedOperation
+from contilio.cachesim import (
+    JourneyRequest,
+    LruCache,
+    PolicyVariant,
+    SimulatedCache,
+    TinyLfuCache,
+    journey_requests_from_capture,
+    simulate,
+    simulate_variants,
+)
+from contilio.domain.enums import UKTrainStationCode
+from contilio.transport_api_stub import SyntheticTimetable
+
+nine_am = datetime(2030, 1, 7, 9)
+timetable = SyntheticTimetable(seed=0, unroutable_ratio=0)
+route = (UKTrainStationCode.LBG, UKTrainStationCode.SAJ, UKTrainStationCode.ABW)
+
+
+def test_lru_evicts_the_least_recently_used_row():
+    cache = LruCache(lambda: 0, capacity=2)
+    for hashed in ("a", "b"):
+        cache.write_route(hashed, nine_am, nine_am + timedelta(minutes=10))
+    cache.read_route("a", nine_am)
+    cache.write_route("c", nine_am, nine_am + timedelta(minutes=10))
+
+    assert [cache.might_contain_route(hashed) for hashed in "abc"] == [True, False, True]
+    assert cache.peak_rows == 2
+
+
+def test_rows_expire_after_their_ttl():
+    now = 0.0
+    cache = SimulatedCache(lambda: now, ttl_secs=60)
+    cache.write_route("a", nine_am, nine_am + timedelta(minutes=10))
+
+    now = 59.0
+    assert cache.read_route("a", nine_am) is not None
+    now = 60.0
+    assert cache.read_route("a", nine_am) is None and cache.rows == 0
+
+
+def test_rows_written_again_after_eviction_expire_after_their_new_ttl():
+    now = 0.0
+    cache = LruCache(lambda: now, capacity=1, ttl_secs=60)
+    cache.write_route("a", nine_am, nine_am + timedelta(minutes=10))
+    now = 30.0
+    cache.write_route("b", nine_am, nine_am + timedelta(minutes=10))
+    now = 40.0
+    cache.write_route("a", nine_am, nine_am + timedelta(minutes=10))
+
+    now = 60.0
+    assert cache.read_route("a", nine_am) is not None
+    now = 100.0
+    assert cache.read_route("a", nine_am) is None and cache.rows == 0
+
+
+def test_tinylfu_keeps_out_rows_read_less_often_than_those_they_would_evict():
+    cache = TinyLfuCache(lambda: 0, capacity=1)
+    cache.write_route("hot", nine_am, nine_am + timedelta(minutes=10))
+    for _ in range(3):
+        cache.read_route("hot", nine_am)
+
+    cache.read_route("cold", nine_am)
+    cache.write_route("cold", nine_am, nine_am + timedelta(minutes=10))
+
+    assert cache.might_contain_route("hot") and not cache.might_contain_route("cold")
+
+
+def test_repeated_journeys_are_answered_from_the_cache():
+    trace = [JourneyRequest(float(at), route, nine_am) for at in range(3)]
+
+    result = simulate(trace, PolicyVariant(), timetable)
+
+    # The first journey asks upstream for both legs, the next ones hit the sub routes
+    assert (result.lookups, result.upstream_calls, result.hits) == (6, 2, 4)
+    assert result.upstream_calls_saved == 4 and result.stale_hits == 0
+    # Both legs and the whole route
+    assert result.peak_rows == 3 and result.peak_memory_bytes > 0
+
+
+def test_interval_prefetch_caches_the_departures_after_the_one_asked_for():
+    first_leg = timetable.leg("LBG", "SAJ")
+    later = first_leg.departures_from(nine_am, 2)[1][0]
+    trace = [JourneyRequest(0.0, route[:2], nine_am), JourneyRequest(1.0, route[:2], later)]
+
+    none, interval = [
+        simulate(trace, PolicyVariant(prefetch=prefetch), timetable)
+        for prefetch in ("none", "interval")
+    ]
+
+    assert (none.upstream_calls, none.hits) == (2, 0)
+    assert (interval.upstream_calls, interval.hits, interval.stale_hits) == (1, 1, 0)
+
+
+def test_cached_departures_past_the_maximum_wait_are_fetched_again():
+    departure_at = timetable.leg("LBG", "SAJ").departures_from(nine_am, 1)[0][0]
+    trace = [
+        JourneyRequest(0.0, route[:2], nine_am),
+        JourneyRequest(1.0, route[:2], departure_at - timedelta(minutes=90)),
+    ]
+
+    result = simulate(trace, PolicyVariant(), timetable)
+
+    assert (result.upstream_calls, result.hits) == (2, 0)
+
+
+def test_variants_simulated_in_a_pool_are_those_simulated_one_by_one():
+    trace = [
+        JourneyRequest(float(at), route[at % 2 :], nine_am + timedelta(minutes=at))
+        for at in range(50)
+    ]
+    variants = [PolicyVariant("lru", capacity=2), PolicyVariant("ttl", ttl_secs=10)]
+
+    assert simulate_variants(trace, variants, timetable, processes=2) == [
+        simulate(trace, variant, timetable) for variant in variants
+    ]
+
+
+def test_journey_plans_are_read_out_of_captured_operations():
+    operations = [
+        CapturedOperation(
+            1.0,
+            "query plan($u: RoutesInput!) { journeyPlan(userInput: $u) { arrivalTime } }",
+            {"u": {"routeCrsIds": ["LBG", "SAJ"], "datetimeOfInterest": "2030-01-07 09:00"}},
+        ),
+        CapturedOperation(2.0, "{ health }"),
+        CapturedOperation(3.0, "{ journeyPlan(userInput: {routeCrsIds: [LBG, XXX]}) }"),
+    ]
+
+    assert list(journey_requests_from_capture(operations)) == [
+        JourneyRequest(1.0, route[:2], nine_am)
+    ]
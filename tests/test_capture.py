@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from contilio.api.capture import TrafficRecorder, read_capture
+from contilio.loadtest.replay import replay
+
+JOURNEY_PLAN = """
+query plan($userInput: RoutesInput!) {
+  journeyPlan(userInput: $userInput) {
+    arrivalTime
+  }
+}
+"""
+
+
+@pytest.mark.asyncio
+async def test_graphql_operations_are_captured_when_opted_in(create_fastapi_client, tmp_path):
+    capture_file = str(tmp_path / "capture.jsonl")
+    variables = [
+        {"userInput": {"routeCrsIds": ["LBG", "SAJ"], "datetimeOfInterest": "2030-01-07 09:00"}},
+        {"userInput": {"routeCrsIds": ["SAJ", "ABW"], "datetimeOfInterest": "2030-01-07 09:30"}},
+    ]
+
+    async with create_fastapi_client(capture_file=capture_file) as api_client:
+        for v in variables:
+            response = await api_client.post(
+                "/graphql",
+                json={"query": JOURNEY_PLAN, "variables": v, "operationName": "plan"},
+            )
+            assert response.json()["data"]["journeyPlan"]
+        await api_client.get("/health")
+
+    captured = read_capture(capture_file)
+    assert [(o.query, o.variables, o.operation_name) for o in captured] == [
+        (JOURNEY_PLAN, v, "plan") for v in variables
+    ]
+    assert captured[0].at <= captured[1].at
+    # The query text is only written the first time
+    with open(capture_file) as f:
+        assert f.read().count("journeyPlan") == 1
+
+
+def test_captures_of_several_recorders_are_read_in_time_order(tmp_path):
+    capture_file = str(tmp_path / "capture.jsonl")
+    first, second = TrafficRecorder(capture_file), TrafficRecorder(capture_file)
+
+    second.record("{ b }", at=2.0)
+    first.record("{ a }", {"x": 1}, at=1.0)
+    second.record("{ a }", at=3.0)
+
+    assert [(o.at, o.query, o.variables) for o in read_capture(capture_file)] == [
+        (1.0, "{ a }", {"x": 1}),
+        (2.0, "{ b }", None),
+        (3.0, "{ a }", None),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_replay_keeps_the_captured_spacing_sped_up(tmp_path):
+    capture_file = str(tmp_path / "capture.jsonl")
+    recorder = TrafficRecorder(capture_file)
+    for at in (100.0, 100.0, 101.0, 104.0):
+        recorder.record("{ a }", at=at)
+
+    loop = asyncio.get_running_loop()
+    sent_at = []
+
+    async def send(query, variables=None, operation_name=None):
+        sent_at.append(loop.time())
+        return None if len(sent_at) < 4 else "Failed"
+
+    results = await replay(send, read_capture(capture_file), speedup=20)
+
+    offsets = [round(at - sent_at[0], 2) for at in sent_at]
+    assert offsets == pytest.approx([0, 0, 0.05, 0.2], abs=0.02)
+    assert results.successes == 3 and dict(results.errors) == {"Failed": 1}
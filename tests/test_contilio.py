@@ -1,5 +1,5 @@
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from contilio.api.graph_ql.query import DATETIME_FORMAT
 
@@ -45,3 +45,28 @@ async def test_query_response_from_persistence(graphql_client_helper, mock_trans
 
     response = identical_query_rerun["journeyPlan"]["arrivalTime"]
     assert parse_date(response) > parse_date(datetime_of_interest)
+
+
+@pytest.mark.asyncio
+async def test_query_response_from_cached_legs(graphql_client_helper, mock_transportapi_client):
+    start = (datetime.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+
+    def journey_plan_query(route_crs_ids, departure_at):
+        return f"""{{
+          journeyPlan(userInput:{{
+            routeCrsIds:[{route_crs_ids}], datetimeOfInterest:"{departure_at.strftime(DATETIME_FORMAT)}"
+          }}){{
+            arrivalTime
+          }}
+        }}"""
+
+    # Both legs cached on their own, but not the route through them
+    await graphql_client_helper(journey_plan_query("LBG, SAJ", start), {})
+    await graphql_client_helper(journey_plan_query("SAJ, ABW", start + timedelta(minutes=15)), {})
+    mock_transportapi_client.get_train_route_plan.reset_mock()
+
+    for _ in range(2):
+        result = await graphql_client_helper(journey_plan_query("LBG, SAJ, ABW", start), {})
+
+        assert not mock_transportapi_client.get_train_route_plan.called
+        assert parse_date(result["journeyPlan"]["arrivalTime"]) == start + timedelta(minutes=30)
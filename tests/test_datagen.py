@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta
+from itertools import islice
+
+import sqlalchemy as sqla
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+
+from contilio.datagen import SyntheticRouteCache, populate
+from contilio.datagen.__main__ import arg_parser, main, upgrade
+from contilio.persistence.in_memory import InMemoryPersistence
+from contilio.utils.db_connection import alembic_config
+from contilio.utils.hasher import generate_hash
+
+first_day = datetime(2030, 1, 7)
+
+
+def test_legs_are_cached_with_their_stations_and_prefixes_without():
+    route_cache = SyntheticRouteCache(num_stations=20, num_routes=10, max_legs=3, seed=1)
+    records = list(route_cache.day(first_day))
+
+    leg_hashes = {generate_hash(list(leg)) for leg in route_cache.legs}
+    prefix_hashes = {
+        generate_hash(route[: i + 1]) for route in route_cache.routes for i in range(2, len(route))
+    }
+    assert {r.hashed for r in records if r.origin_crs} == leg_hashes
+    assert {r.hashed for r in records if not r.origin_crs} <= prefix_hashes
+    assert all(
+        first_day <= r.departure_at < first_day + timedelta(days=1)
+        and r.departure_at < r.arrival_at
+        for r in records
+    )
+
+
+def test_prefixes_arrive_after_connecting_at_every_station():
+    route_cache = SyntheticRouteCache(num_stations=20, num_routes=10, max_legs=3, seed=3)
+    route = next(route for route in route_cache.routes if len(route) > 2)[:3]
+
+    first_leg = route_cache.legs[route[0], route[1]]
+    second_leg = route_cache.legs[route[1], route[2]]
+    [(departure_at, arrival_at)] = first_leg.departures_from(first_day, 1)
+    [(connecting_at, expected_arrival_at)] = second_leg.departures_from(arrival_at, 1)
+
+    prefix = next(r for r in route_cache.day(first_day) if r.hashed == generate_hash(route))
+
+    assert (prefix.departure_at, prefix.arrival_at) == (departure_at, expected_arrival_at)
+    assert connecting_at - arrival_at <= route_cache.max_wait
+
+
+def test_populate_writes_the_rows_asked_for_in_batches():
+    persistence = InMemoryPersistence()
+    route_cache = SyntheticRouteCache(num_stations=20, num_routes=10, first_day=first_day)
+
+    written = populate(persistence, route_cache.records(), rows=2500, batch_size=1000)
+
+    assert written == 2500
+    [first] = islice(route_cache.records(), 1)
+    cached = persistence.read_route(first.hashed, first.departure_at - timedelta(minutes=1))
+    assert cached is not None and cached.departure_at == first.departure_at
+
+
+def test_generated_database_is_at_the_latest_migration(tmp_path):
+    database = tmp_path / "scale.db"
+    main(arg_parser().parse_args(["--rows", "500", "--database", str(database), "--seed", "2"]))
+
+    engine = sqla.create_engine(f"sqlite:///{database}")
+    # The service runs the migrations as it starts, which must find nothing left to do
+    upgrade(engine)
+    with engine.connect() as connection:
+        revision = MigrationContext.configure(connection).get_current_revision()
+        rows = connection.execute(sqla.text("SELECT COUNT(*) FROM route")).scalar()
+    assert (
+        revision
+        == ScriptDirectory.from_config(alembic_config("journey_planner")).get_current_head()
+    )
+    assert rows == 500
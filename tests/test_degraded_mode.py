@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+
+from contilio.api.graph_ql.degraded import DegradedMode
+from contilio.api.graph_ql.query import DATETIME_FORMAT
+from contilio.domain.enums import UKTrainStationCode
+from contilio.persistence.in_memory import InMemoryPersistenceFactory
+from contilio.utils.hasher import generate_hash
+
+start = (datetime.now() + timedelta(days=1)).replace(hour=12, minute=0, second=0, microsecond=0)
+leg_hash = generate_hash([UKTrainStationCode.LBG, UKTrainStationCode.SAJ])
+
+journey_plan_query = f"""{{
+  journeyPlan(userInput:{{
+    routeCrsIds:[LBG, SAJ], datetimeOfInterest:"{start.strftime(DATETIME_FORMAT)}"
+  }}){{
+    arrivalTime
+    estimated
+  }}
+}}"""
+
+
+@pytest.mark.asyncio
+async def test_slow_upstream_answers_from_yesterday_then_caches(
+    graphql_client_helper, mock_transportapi_client
+):
+    persistence_factory = InMemoryPersistenceFactory()
+    persistence = persistence_factory.create()
+    yesterday = start - timedelta(days=1)
+    persistence.write_route(
+        leg_hash,
+        yesterday + timedelta(minutes=10),
+        yesterday + timedelta(minutes=30),
+        origin_crs="LBG",
+        destination_crs="SAJ",
+    )
+
+    upstream_recovered = asyncio.Event()
+    get_train_route_plan = mock_transportapi_client.get_train_route_plan.side_effect
+
+    async def slow_get_train_route_plan(*args, **kwargs):
+        await upstream_recovered.wait()
+        return await get_train_route_plan(*args, **kwargs)
+
+    mock_transportapi_client.get_train_route_plan.side_effect = slow_get_train_route_plan
+
+    result = await graphql_client_helper(
+        journey_plan_query,
+        {},
+        {"persistence_factory": persistence_factory, "leg_deadline_secs": 0.05},
+    )
+
+    assert result["journeyPlan"] == {
+        "arrivalTime": (start + timedelta(minutes=30)).strftime(DATETIME_FORMAT),
+        "estimated": True,
+    }
+    assert persistence.read_route(leg_hash, start) is None
+
+    upstream_recovered.set()
+    for _ in range(100):
+        if persistence.read_route(leg_hash, start):
+            break
+        await asyncio.sleep(0.01)
+    assert persistence.read_route(leg_hash, start).departure_at == start + timedelta(minutes=5)
+
+
+def test_estimate_from_departure_at_the_same_time_of_day():
+    persistence = InMemoryPersistenceFactory().create()
+    for days_back, minutes in ((1, 0), (1, 40), (3, 20)):
+        departure_at = start - timedelta(days=days_back) + timedelta(minutes=minutes)
+        persistence.write_route(
+            leg_hash,
+            departure_at,
+            departure_at + timedelta(minutes=20),
+            origin_crs="LBG",
+            destination_crs="SAJ",
+        )
+    degraded_mode = DegradedMode(None, persistence, 0.05, timedelta(minutes=60))
+
+    estimate = degraded_mode._estimate(UKTrainStationCode.LBG, UKTrainStationCode.SAJ, start)
+
+    # Yesterday's departure at exactly the time of interest is the nearest
+    assert estimate.departure_at == start
+    assert estimate.arrival_at == start + timedelta(minutes=20)
@@ -0,0 +1,109 @@
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+import sqlalchemy as sqla
+
+from contilio.journey_planner.model import Base
+from contilio.persistence.journey_planner import JourneyPlannerPersistenceFactory
+from contilio.persistence.protocol import RouteRecord
+from contilio.statistics import DurationSketch
+from contilio.statistics.__main__ import export
+
+start = datetime(2030, 1, 7, 8, 0)
+
+
+def test_duration_sketch_quantiles_within_relative_accuracy():
+    sketch = DurationSketch()
+    for minutes in range(1, 101):
+        sketch.add(minutes)
+
+    for q, expected in ((0.0, 1), (0.5, 50), (0.9, 90), (1.0, 100)):
+        assert abs(sketch.quantile(q) - expected) <= expected * sketch.relative_accuracy + 1
+
+    assert DurationSketch.from_dict(sketch.to_dict()).quantile(0.5) == sketch.quantile(0.5)
+
+
+def test_leg_statistics_kept_up_to_date_on_writes(tmp_path):
+    engine = sqla.create_engine(f"sqlite:///{tmp_path}/journey_planner.db")
+    Base.metadata.create_all(engine)
+    persistence = JourneyPlannerPersistenceFactory(engine).create()
+
+    for day in range(2):
+        persistence.write_routes(
+            [
+                RouteRecord(
+                    hashed="LBG,SAJ",
+                    departure_at=start + timedelta(days=day, minutes=minutes),
+                    arrival_at=start + timedelta(days=day, minutes=minutes + 12),
+                    origin_crs="LBG",
+                    destination_crs="SAJ",
+                )
+                for minutes in (0, 15, 30, 45)
+            ]
+        )
+    persistence.write_route(
+        "LBG,SAJ,ABW", start, start + timedelta(minutes=30), origin_crs=None, destination_crs=None
+    )
+
+    statistics = persistence.read_leg_statistics("LBG", "SAJ")
+    assert statistics.count == 8
+    assert round(statistics.duration_quantile(0.5)) == 12
+    assert statistics.headway_in_minutes(8) == 15
+    assert statistics.headway_in_minutes(9) is None
+
+    # A fresh factory, as in another worker, loads what was written
+    factory = JourneyPlannerPersistenceFactory(engine)
+    factory.load()
+    reloaded = factory.create()
+    assert reloaded.read_leg_statistics("LBG", "SAJ").count == 8
+    assert reloaded.read_leg_statistics("LBG", "ABW") is None
+
+    output = io.StringIO()
+    export([statistics], "json", output)
+    exported = json.loads(output.getvalue())
+    assert exported["count"] == 8
+    assert exported["headway_in_minutes_at_08"] == 15
+
+
+def test_leg_statistics_add_up_across_workers_writing_at_once(tmp_path):
+    database = f"sqlite:///{tmp_path}/journey_planner.db"
+    Base.metadata.create_all(sqla.create_engine(database))
+    # An engine each, as in separate workers
+    workers = [
+        JourneyPlannerPersistenceFactory(sqla.create_engine(database)).create() for _ in range(4)
+    ]
+
+    def write_legs(persistence):
+        for minutes in range(25):
+            persistence.write_route(
+                "LBG,SAJ",
+                start + timedelta(minutes=minutes),
+                start + timedelta(minutes=minutes + 12),
+                origin_crs="LBG",
+                destination_crs="SAJ",
+            )
+
+    with ThreadPoolExecutor(max_workers=len(workers)) as executor:
+        list(executor.map(write_legs, workers))
+
+    factory = JourneyPlannerPersistenceFactory(sqla.create_engine(database))
+    factory.load()
+    reloaded = factory.create()
+    assert reloaded.read_leg_statistics("LBG", "SAJ").count == 100
+
+
+@pytest.mark.asyncio
+async def test_leg_statistics_loaded_as_the_service_starts_up(tmp_path, create_fastapi_client):
+    engine = sqla.create_engine(f"sqlite:///{tmp_path}/journey_planner.db")
+    Base.metadata.create_all(engine)
+    JourneyPlannerPersistenceFactory(engine).create().write_route(
+        "LBG,SAJ", start, start + timedelta(minutes=12), origin_crs="LBG", destination_crs="SAJ"
+    )
+
+    factory = JourneyPlannerPersistenceFactory(engine)
+    assert factory.create().read_leg_statistics("LBG", "SAJ") is None
+    async with create_fastapi_client(persistence_factory=factory):
+        assert factory.create().read_leg_statistics("LBG", "SAJ").count == 1
@@ -0,0 +1,68 @@
+from collections import Counter
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from contilio.clients.transport_api import AppCreds, TransportApiClient
+from contilio.clients.transport_api.client import AioHttpClient
+from contilio.loadtest import Workload, percentile, run_load
+from contilio.loadtest.runner import graphql_error_type
+from contilio.persistence.in_memory import InMemoryPersistenceFactory
+from contilio.transport_api_stub import (
+    PUBLIC_JOURNEY_PATH,
+    StubProfile,
+    SyntheticTimetable,
+    TransportApiStub,
+    create_stub_app,
+)
+
+
+def test_workload_favours_popular_stations_and_repeats_requests():
+    workload = Workload(num_stations=50, min_legs=1, max_legs=3, warm_ratio=0.5, seed=3)
+    requests = [workload.next_request() for _ in range(2000)]
+
+    same_seed = Workload(num_stations=50, min_legs=1, max_legs=3, warm_ratio=0.5, seed=3)
+    assert [same_seed.next_request() for _ in range(2000)] == requests
+    assert all(1 <= r.legs <= 3 for r in requests)
+    assert 0.45 < sum(r.warm for r in requests) / len(requests) < 0.55
+
+    popularity = Counter(station for r in requests for station in r.route_crs_ids)
+    (most_popular, _), *_ = popularity.most_common()
+    assert most_popular == workload.stations[0]
+
+
+def test_percentiles_are_nearest_rank():
+    values = list(range(1, 1001))
+    assert [percentile(values, pct) for pct in (50, 99, 99.9, 100)] == [500, 990, 999, 1000]
+    assert percentile([], 50) is None
+
+
+@pytest.mark.asyncio
+async def test_load_test_reports_on_the_running_service(create_fastapi_client):
+    stub = TransportApiStub(SyntheticTimetable(seed=0, unroutable_ratio=0), StubProfile())
+
+    async with TestServer(create_stub_app(stub)) as stub_server:
+        transportapi_client = TransportApiClient(
+            app_creds=AppCreds(app_id="id", app_key="key"),
+            http_client=AioHttpClient(default_timeout=5),
+            base_url=str(stub_server.make_url(PUBLIC_JOURNEY_PATH)),
+        )
+        async with create_fastapi_client(
+            persistence_factory=InMemoryPersistenceFactory(),
+            transportapi_client=transportapi_client,
+        ) as api_client:
+
+            async def send(query):
+                response = await api_client.post("/graphql", json={"query": query})
+                return graphql_error_type(response.json())
+
+            workload = Workload(num_stations=5, max_legs=2, warm_ratio=0.5, seed=1)
+            results = await run_load(send, workload, concurrency=4, max_requests=40)
+
+    report = results.report(duration_secs=1, upstream_requests=stub.requests)
+    assert report["requests"] == 40
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p999"]
+    assert report["successes"] == 40
+    assert report["errors"] == 0
+    # Repeated requests and legs shared by routes are answered from the cache
+    assert 0 < report["cache"]["hit_ratio"] < 1
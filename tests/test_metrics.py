@@ -0,0 +1,94 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+
+from contilio.metrics import MetricsRegistry, render
+
+
+def test_counters_and_histograms_add_up_across_threads():
+    registry = MetricsRegistry()
+    counter = registry.counter("increments_total", "Increments", ["thread"])
+    histogram = registry.histogram("observations", "Observations", buckets=(1, 2))
+
+    def work(_):
+        for _ in range(10_000):
+            counter.inc(thread="any")
+            histogram.observe(1.5)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(work, range(8)))
+
+    assert counter.value(thread="any") == 80_000
+    sample = histogram.value()
+    assert (sample.count, sample.sum, sample.bucket_counts) == (80_000, 120_000, [0, 80_000, 0])
+
+
+def test_shards_of_ended_threads_are_folded_together():
+    registry = MetricsRegistry()
+    counter = registry.counter("increments_total", "Increments")
+    histogram = registry.histogram("observations", "Observations", buckets=(1, 2))
+
+    def work():
+        counter.inc()
+        histogram.observe(1.5)
+
+    for _ in range(50):
+        thread = threading.Thread(target=work)
+        thread.start()
+        thread.join()
+
+    assert counter.value() == 50
+    assert histogram.value().bucket_counts == [0, 50, 0]
+    # The shard of every thread gone, and none of the main thread yet
+    assert len(counter._values.shards()) == len(histogram._values.shards()) == 1
+
+
+def test_metrics_are_rendered_in_the_prometheus_text_format():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests made", ["path"]).inc(3, path='/"a"')
+    registry.gauge("limit", "Current limit").set(2.5)
+    latency = registry.histogram("latency_seconds", "Latency", ["stage"], buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        latency.observe(value, stage="db")
+
+    assert render(registry).splitlines() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="db",le="0.1"} 1',
+        'latency_seconds_bucket{stage="db",le="1"} 2',
+        'latency_seconds_bucket{stage="db",le="+Inf"} 3',
+        'latency_seconds_sum{stage="db"} 5.55',
+        'latency_seconds_count{stage="db"} 3',
+        "# HELP limit Current limit",
+        "# TYPE limit gauge",
+        "limit 2.5",
+        "# HELP requests_total Requests made",
+        "# TYPE requests_total counter",
+        'requests_total{path="/\\"a\\""} 3',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_journey_plan_stages(create_fastapi_client):
+    datetime_of_interest = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d 09:00")
+    query = (
+        "{ journeyPlan(userInput: { routeCrsIds: [LBG, SAJ, ABW], "
+        f'datetimeOfInterest: "{datetime_of_interest}" }}) {{ arrivalTime }} }}'
+    )
+
+    async with create_fastapi_client() as api_client:
+        for _ in range(2):
+            assert (
+                "errors" not in (await api_client.post("/graphql", json={"query": query})).json()
+            )
+        response = await api_client.get("/metrics")
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    exposed = response.text
+    assert 'graphql_resolver_seconds_count{field="journeyPlan",outcome="ok"}' in exposed
+    assert 'route_cache_lookups_total{kind="prefix",result="hit"}' in exposed
+    assert 'route_cache_lookups_total{kind="leg",result="miss"}' in exposed
+    assert 'journey_plan_legs_bucket{le="2"}' in exposed
+    assert "task_executor_queue_wait_seconds_count" in exposed
@@ -0,0 +1,80 @@
+import pytest
+from datetime import datetime, timedelta
+
+from contilio.clients.transport_api import (
+    AppCreds,
+    NegativeCache,
+    TransportApiClient,
+    load_unroutable_pairs,
+)
+from contilio.clients.transport_api.client import AioHttpClient, TransportApiClientException
+from contilio.utils.bloom import BloomFilter
+from tests.fault_injection import fault_injecting_transportapi
+
+datetime_of_interest = datetime(2030, 1, 7, 21, 0)
+
+
+def transportapi_client(url, negative_cache) -> TransportApiClient:
+    return TransportApiClient(
+        app_creds=AppCreds(app_id="id", app_key="key"),
+        http_client=AioHttpClient(default_timeout=1),
+        base_url=url,
+        negative_cache=negative_cache,
+    )
+
+
+@pytest.mark.asyncio
+async def test_unroutable_pair_is_not_asked_for_again_later_that_day():
+    async with fault_injecting_transportapi() as stub:
+        client = transportapi_client(stub.url, NegativeCache(ttl_secs=60))
+        stub.no_routes = 1
+        with pytest.raises(TransportApiClientException):
+            await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        with pytest.raises(TransportApiClientException):
+            await client.get_train_route_plan(
+                "LBG", "SAJ", datetime_of_interest + timedelta(hours=1)
+            )
+        assert stub.requests == 1
+
+        # Earlier that day, the next day, or the other way round may all have trains
+        await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest - timedelta(hours=1))
+        await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest + timedelta(days=1))
+        await client.get_train_route_plan("SAJ", "LBG", datetime_of_interest)
+        assert stub.requests == 4
+
+
+@pytest.mark.asyncio
+async def test_error_responses_are_not_taken_for_unroutable():
+    async with fault_injecting_transportapi() as stub:
+        client = transportapi_client(stub.url, NegativeCache(ttl_secs=60))
+        # Such as failed authorisation, or an unknown station
+        stub.faults = [403, 404]
+        for _ in range(2):
+            with pytest.raises(TransportApiClientException):
+                await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+
+        await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        assert stub.requests == 3
+
+
+@pytest.mark.asyncio
+async def test_known_unroutable_pairs_are_never_asked_for(tmp_path):
+    pairs_file = tmp_path / "unroutable.txt"
+    pairs_file.write_text("# No trains in between\nLBG:ABW\n\nABW:LBG\n")
+    negative_cache = NegativeCache(ttl_secs=60, known_unroutable=load_unroutable_pairs(pairs_file))
+
+    async with fault_injecting_transportapi() as stub:
+        client = transportapi_client(stub.url, negative_cache)
+        with pytest.raises(TransportApiClientException):
+            await client.get_train_route_plan("LBG", "ABW", datetime_of_interest)
+        await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+
+    assert stub.requests == 1
+
+
+def test_bloom_filter_holds_every_key_added_and_few_others():
+    bloom_filter = BloomFilter.from_keys((f"key-{i}" for i in range(1000)), 0.01)
+
+    assert all(f"key-{i}" in bloom_filter for i in range(1000))
+    false_positives = sum(f"other-{i}" in bloom_filter for i in range(10_000))
+    assert false_positives < 300
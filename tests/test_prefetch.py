@@ -0,0 +1,43 @@
+import pytest
+from datetime import datetime, timedelta
+
+from contilio.api.graph_ql.query import DATETIME_FORMAT
+
+start = (datetime.now() + timedelta(days=1)).replace(hour=10, minute=0, second=0, microsecond=0)
+
+
+def journey_plan_query(datetime_of_interest: datetime) -> str:
+    return f"""{{
+      journeyPlan(userInput:{{
+        routeCrsIds:[LBG, SAJ, ABW, DDK],
+        datetimeOfInterest:"{datetime_of_interest.strftime(DATETIME_FORMAT)}"
+      }}){{
+        arrivalTime
+      }}
+    }}"""
+
+
+@pytest.mark.asyncio
+async def test_speculative_prefetch_fires_all_legs_at_once(
+    graphql_client_helper, mock_transportapi_client
+):
+    app_args = {"speculative_prefetch": True}
+    # Nothing cached yet to predict durations from, so legs get fetched one by one
+    await graphql_client_helper(journey_plan_query(start), {}, app_args)
+    assert mock_transportapi_client.get_train_route_plan.call_count == 3
+    mock_transportapi_client.get_train_route_plan.reset_mock()
+
+    next_day = start + timedelta(days=1)
+    result = await graphql_client_helper(journey_plan_query(next_day), {}, app_args)
+
+    # All legs are fired at once, at times of interest predicted from the recorded 10 minute legs,
+    # and the mock upstream departures 5 minutes later all turn out valid
+    assert [
+        call.kwargs["datetime_of_interest"]
+        for call in mock_transportapi_client.get_train_route_plan.call_args_list
+    ] == [next_day, next_day + timedelta(minutes=10), next_day + timedelta(minutes=20)]
+    # The mock upstream is no real timetable, asked at 10:10 it departs 10:15 yet asked at 10:15
+    # it departs 10:20, hence the earlier arrival than the warm up
+    assert result["journeyPlan"]["arrivalTime"] == (next_day + timedelta(minutes=35)).strftime(
+        DATETIME_FORMAT
+    )
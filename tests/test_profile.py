@@ -0,0 +1,50 @@
+import pytest
+from datetime import datetime, timedelta
+
+from contilio.api.graph_ql.query import DATETIME_FORMAT
+from contilio.routing import JourneyOption, pareto_options
+
+start = (datetime.now() + timedelta(days=1)).replace(hour=7, minute=0, second=0, microsecond=0)
+
+
+def format_date(value: datetime) -> str:
+    return value.strftime(DATETIME_FORMAT)
+
+
+def test_pareto_options_drop_dominated_journeys():
+    options = [
+        JourneyOption(start, start + timedelta(minutes=50)),
+        JourneyOption(start + timedelta(minutes=10), start + timedelta(minutes=40)),
+        JourneyOption(start + timedelta(minutes=20), start + timedelta(minutes=40)),
+        JourneyOption(start + timedelta(minutes=30), start + timedelta(minutes=70)),
+    ]
+
+    assert pareto_options(options) == options[2:]
+
+
+@pytest.mark.asyncio
+async def test_journey_profile_pages_upstream_once(
+    graphql_client_helper, mock_transportapi_client
+):
+    query = f"""{{
+      journeyProfile(userInput:{{
+        routeCrsIds:[LBG, SAJ, ABW],
+        departureFrom:"{format_date(start)}",
+        departureUntil:"{format_date(start + timedelta(minutes=30))}"
+      }}){{
+        departureTime
+        arrivalTime
+      }}
+    }}"""
+
+    result = await graphql_client_helper(query, {})
+
+    options = result["journeyProfile"]
+    assert [option["departureTime"] for option in options] == [
+        format_date(start + timedelta(minutes=minutes)) for minutes in (5, 11, 17, 23, 29)
+    ]
+    assert all(option["arrivalTime"] > option["departureTime"] for option in options)
+
+    mock_transportapi_client.get_train_route_plan.reset_mock()
+    assert await graphql_client_helper(query, {}) == result
+    assert not mock_transportapi_client.get_train_route_plan.called
@@ -0,0 +1,91 @@
+import json
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from contilio.clients.transport_api import TrainRoutePlan
+from contilio.clients.transport_api.client import AioHttpClient
+from contilio.clients.transport_api.parsing import RoutesExtractor
+
+FIXTURES_DIRECTORY = Path(__file__).parent / "fixtures" / "transportapi"
+
+
+def feed_in_chunks(parser, body, chunk_size):
+    chunks = [body[i : i + chunk_size] for i in range(0, len(body), chunk_size)]
+    for fed, chunk in enumerate(chunks, start=1):
+        if not parser.feed(chunk):
+            break
+    return fed, len(chunks)
+
+
+@pytest.mark.parametrize("fixture", ["small", "typical", "large"])
+@pytest.mark.parametrize("chunk_size", [7, 16 * 1024])
+def test_first_route_streamed_out_as_decoded_whole(fixture, chunk_size):
+    body = (FIXTURES_DIRECTORY / f"public_journey_{fixture}.json").read_bytes()
+    parser = RoutesExtractor(decoder=json.loads)
+
+    feed_in_chunks(parser, body, chunk_size)
+
+    assert parser.result() == {"routes": json.loads(body)["routes"][:1]}
+    assert TrainRoutePlan.from_dict(parser.result()) == TrainRoutePlan.from_dict(json.loads(body))
+
+
+def test_rest_of_body_not_parsed_once_route_is_out():
+    body = (FIXTURES_DIRECTORY / "public_journey_large.json").read_bytes()
+
+    fed, chunks = feed_in_chunks(RoutesExtractor(), body, 16 * 1024)
+
+    assert fed < chunks / 2
+
+
+@pytest.mark.asyncio
+async def test_rest_of_body_read_through_once_route_is_out():
+    body = json.dumps({"routes": [{"route_parts": [{"mode": "train"}] * 100_000}] * 4}).encode()
+    written = []
+
+    async def public_journey(request: web.Request) -> web.StreamResponse:
+        # Chunked, of unknown size, and far more than socket buffers hold
+        response = web.StreamResponse(headers={"Content-Type": "application/json"})
+        await response.prepare(request)
+        for start in range(0, len(body), 64 * 1024):
+            await response.write(body[start:][: 64 * 1024])
+            written.append(start)
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_get("/", public_journey)
+    async with TestServer(app) as server:
+        result = await AioHttpClient(response_parser_factory=RoutesExtractor).get(
+            str(server.make_url("/"))
+        )
+
+    assert result == {"routes": json.loads(body)["routes"][:1]}
+    # The connection was not cut short, which would have failed the writes half way
+    assert written[-1] + 64 * 1024 >= len(body)
+
+
+def test_body_without_routes_decoded_whole():
+    body = (FIXTURES_DIRECTORY / "public_journey_error.json").read_bytes()
+    parser = RoutesExtractor()
+
+    feed_in_chunks(parser, body, 7)
+
+    assert parser.result() == {"error": "Unknown station code: crs:XYZ"}
+    assert RoutesExtractor().result() is None
+
+
+def test_brackets_and_quotes_within_strings_ignored():
+    body = json.dumps(
+        {
+            "source": 'a ["routes"] {',
+            "routes": [{"line_name": 'Platform "2" } ]', "route_parts": [{"a": [[1, 2]]}]}, {}],
+        }
+    ).encode()
+    parser = RoutesExtractor(decoder=json.loads)
+
+    feed_in_chunks(parser, body, 3)
+
+    assert parser.result() == {"routes": json.loads(body)["routes"][:1]}
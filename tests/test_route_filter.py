@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+
+import sqlalchemy as sqla
+
+from contilio.journey_planner.model import Base
+from contilio.persistence.journey_planner import JourneyPlannerPersistenceFactory
+from contilio.utils.bloom import SharedBloomFilter
+
+start = datetime(2030, 1, 7, 8, 0)
+
+
+def test_route_filter_shared_by_workers_through_its_file(tmp_path):
+    engine = sqla.create_engine(f"sqlite:///{tmp_path}/journey_planner.db")
+    Base.metadata.create_all(engine)
+    filter_file_name = f"{tmp_path}/routes.bloom"
+
+    # Cached before any worker started
+    JourneyPlannerPersistenceFactory(engine).create().write_route(
+        "LBG,SAJ", start, start + timedelta(minutes=12)
+    )
+
+    first_factory, second_factory = [
+        JourneyPlannerPersistenceFactory(
+            engine, route_filter=SharedBloomFilter(filter_file_name, capacity=1000)
+        )
+        for _ in range(2)
+    ]
+    # Only the first worker has loaded the cached routes so far, yet the filter file is shared
+    first_factory.load()
+    first_worker, second_worker = first_factory.create(), second_factory.create()
+    assert first_worker.might_contain_route("LBG,SAJ")
+    assert second_worker.might_contain_route("LBG,SAJ")
+    assert not second_worker.might_contain_route("SAJ,ABW")
+
+    first_worker.write_route("SAJ,ABW", start, start + timedelta(minutes=20))
+    assert second_worker.might_contain_route("SAJ,ABW")
+
+    # Sized differently, the file is started afresh rather than misread, while the workers
+    # that have the old one mapped carry on with it
+    resized = SharedBloomFilter(filter_file_name, capacity=10)
+    assert "SAJ,ABW" not in resized
+    assert second_worker.might_contain_route("SAJ,ABW")
+
+    resized.add("ABW,DDK")
+    reopened = SharedBloomFilter(filter_file_name, capacity=10)
+    assert "ABW,DDK" in reopened
+
+    for route_filter in (resized, reopened, first_worker.route_filter, second_worker.route_filter):
+        route_filter.close()
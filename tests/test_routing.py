@@ -0,0 +1,185 @@
+import pytest
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from contilio.api.graph_ql.query import DATETIME_FORMAT
+from contilio.domain.enums import UKTrainStationCode
+from contilio.persistence.in_memory import InMemoryPersistence
+from contilio.routing import (
+    Timetable,
+    earliest_arrival,
+    earliest_arrival_matrix,
+    reachable_within,
+)
+from contilio.utils.hasher import generate_hash
+
+start = (datetime.now() + timedelta(days=1)).replace(hour=9, minute=0, second=0, microsecond=0)
+max_wait = timedelta(minutes=60)
+
+
+def write_leg(persistence, origin, destination, departs_in, arrives_in):
+    persistence.write_route(
+        route_hash=generate_hash([UKTrainStationCode[origin], UKTrainStationCode[destination]]),
+        departure_at=start + timedelta(minutes=departs_in),
+        arrival_at=start + timedelta(minutes=arrives_in),
+        origin_crs=origin,
+        destination_crs=destination,
+    )
+
+
+def test_earliest_arrival_changes_trains_when_faster():
+    persistence = InMemoryPersistence()
+    write_leg(persistence, "LBG", "ABW", 10, 120)
+    write_leg(persistence, "LBG", "SAJ", 5, 20)
+    write_leg(persistence, "SAJ", "ABW", 30, 50)
+    # Too long a wait at SAJ to be caught
+    write_leg(persistence, "SAJ", "DDK", 90, 100)
+
+    timetable = Timetable(persistence.read_legs(start, start + timedelta(hours=12)))
+
+    journey = earliest_arrival(timetable, "LBG", "ABW", start, max_wait)
+    assert journey.station_crs_codes == ["LBG", "SAJ", "ABW"]
+    assert journey.arrival_at == start + timedelta(minutes=50)
+
+    assert earliest_arrival(timetable, "LBG", "DDK", start, max_wait) is None
+
+
+def test_earliest_arrival_takes_later_train_to_make_connection():
+    persistence = InMemoryPersistence()
+    write_leg(persistence, "LBG", "SAJ", 5, 20)
+    # Only the later train gets to SAJ within the wait of the train on to ABW
+    write_leg(persistence, "LBG", "SAJ", 50, 80)
+    write_leg(persistence, "SAJ", "ABW", 130, 150)
+
+    timetable = Timetable(persistence.read_legs(start, start + timedelta(hours=12)))
+
+    journey = earliest_arrival(timetable, "LBG", "ABW", start, max_wait)
+    assert journey.station_crs_codes == ["LBG", "SAJ", "ABW"]
+    assert journey.departure_at == start + timedelta(minutes=50)
+    assert journey.arrival_at == start + timedelta(minutes=150)
+
+
+def test_earliest_arrival_respects_round_cap():
+    persistence = InMemoryPersistence()
+    write_leg(persistence, "LBG", "SAJ", 5, 10)
+    write_leg(persistence, "SAJ", "ABW", 15, 20)
+    write_leg(persistence, "ABW", "DDK", 25, 30)
+
+    timetable = Timetable(persistence.read_legs(start, start + timedelta(hours=12)))
+
+    assert earliest_arrival(timetable, "LBG", "DDK", start, max_wait, max_rounds=2) is None
+    assert earliest_arrival(timetable, "LBG", "DDK", start, max_wait, max_rounds=3)
+
+
+def test_earliest_arrival_matrix_in_process_pool():
+    persistence = InMemoryPersistence()
+    write_leg(persistence, "LBG", "SAJ", 5, 20)
+    write_leg(persistence, "SAJ", "ABW", 30, 50)
+    write_leg(persistence, "ABW", "LBG", 55, 70)
+
+    timetable = Timetable(persistence.read_legs(start, start + timedelta(hours=12)))
+    stations = ["LBG", "SAJ", "ABW", "DDK"]
+
+    matrix = earliest_arrival_matrix(timetable, stations, start, max_wait)
+    assert matrix[0] == [0, 20, 50, None]
+    assert matrix[1] == [70, 0, 50, None]
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        assert (
+            earliest_arrival_matrix(
+                timetable, stations, start, max_wait, executor=executor, origins_per_task=1
+            )
+            == matrix
+        )
+
+
+def test_earliest_arrival_matrix_takes_later_train_to_make_connection():
+    persistence = InMemoryPersistence()
+    write_leg(persistence, "LBG", "SAJ", 5, 20)
+    write_leg(persistence, "LBG", "SAJ", 50, 80)
+    write_leg(persistence, "SAJ", "ABW", 130, 150)
+
+    timetable = Timetable(persistence.read_legs(start, start + timedelta(hours=12)))
+
+    matrix = earliest_arrival_matrix(timetable, ["LBG", "SAJ", "ABW"], start, max_wait)
+    assert matrix[0] == [0, 20, 150]
+
+
+def test_reachable_within_budget():
+    persistence = InMemoryPersistence()
+    write_leg(persistence, "LBG", "SAJ", 5, 20)
+    write_leg(persistence, "SAJ", "ABW", 30, 50)
+    write_leg(persistence, "ABW", "DDK", 55, 95)
+
+    timetable = Timetable(persistence.read_legs(start, start + timedelta(hours=12)))
+
+    reachable = reachable_within(timetable, "LBG", start, timedelta(minutes=60), max_wait)
+    assert reachable == [
+        ("LBG", start),
+        ("SAJ", start + timedelta(minutes=20)),
+        ("ABW", start + timedelta(minutes=50)),
+    ]
+
+
+def test_reachable_within_through_later_arrival_at_transfer():
+    persistence = InMemoryPersistence()
+    # The first arrival at SAJ misses the wait for ABW, the second one makes it
+    write_leg(persistence, "LBG", "SAJ", 5, 20)
+    write_leg(persistence, "LBG", "SAJ", 50, 80)
+    write_leg(persistence, "SAJ", "ABW", 130, 150)
+
+    timetable = Timetable(persistence.read_legs(start, start + timedelta(hours=12)))
+
+    reachable = reachable_within(timetable, "LBG", start, timedelta(hours=3), max_wait)
+    assert reachable == [
+        ("LBG", start),
+        ("SAJ", start + timedelta(minutes=20)),
+        ("ABW", start + timedelta(minutes=150)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_free_journey_plan_uses_cached_legs(graphql_client_helper, mock_transportapi_client):
+    datetime_of_interest = start.strftime(DATETIME_FORMAT)
+    planned = await graphql_client_helper(
+        f"""{{
+          journeyPlan(userInput:{{
+            routeCrsIds:[LBG, SAJ, ABW], datetimeOfInterest:"{datetime_of_interest}"
+          }}){{
+            arrivalTime
+          }}
+        }}""",
+        {},
+    )
+    mock_transportapi_client.get_train_route_plan.reset_mock()
+
+    result = await graphql_client_helper(
+        f"""{{
+          freeJourneyPlan(userInput:{{
+            originCrsId:LBG, destinationCrsId:ABW, datetimeOfInterest:"{datetime_of_interest}"
+          }}){{
+            arrivalTime
+            routeCrsIds
+          }}
+        }}""",
+        {},
+    )
+
+    assert not mock_transportapi_client.get_train_route_plan.called
+    assert result["freeJourneyPlan"]["arrivalTime"] == planned["journeyPlan"]["arrivalTime"]
+    assert result["freeJourneyPlan"]["routeCrsIds"] == ["LBG", "SAJ", "ABW"]
+
+    matrix = await graphql_client_helper(
+        f"""{{
+          arrivalMatrix(userInput:{{
+            crsIds:[LBG, SAJ, ABW], datetimeOfInterest:"{datetime_of_interest}"
+          }}){{
+            crsIds
+            arrivalMinutes
+          }}
+        }}""",
+        {},
+    )
+
+    assert matrix["arrivalMatrix"]["crsIds"] == ["LBG", "SAJ", "ABW"]
+    assert matrix["arrivalMatrix"]["arrivalMinutes"][:3] == [0, 15, 30]
@@ -0,0 +1,66 @@
+import pytest
+import sqlalchemy as sqla
+
+from contilio.clients.transport_api import AppCreds, RetryPolicy, TransportApiClient
+from contilio.clients.transport_api.client import AioHttpClient
+from contilio.journey_planner.model import Base
+from contilio.persistence.journey_planner import JourneyPlannerPersistenceFactory
+from tests.fault_injection import fault_injecting_transportapi
+
+JOURNEY_PLAN = (
+    "{ journeyPlan(userInput: { routeCrsIds: [LBG, SAJ, ABW], "
+    'datetimeOfInterest: "2030-01-07 09:00" }) { arrivalTime } }'
+)
+
+
+def server_timing(response):
+    return dict(metric.split(";", 1) for metric in response.headers["server-timing"].split(", "))
+
+
+@pytest.mark.asyncio
+async def test_responses_report_what_they_cost(create_fastapi_client, tmp_path):
+    engine = sqla.create_engine(f"sqlite:///{tmp_path}/journey_planner.db")
+    Base.metadata.create_all(engine)
+
+    async with fault_injecting_transportapi() as stub:
+        transportapi_client = TransportApiClient(
+            app_creds=AppCreds(app_id="id", app_key="key"),
+            http_client=AioHttpClient(default_timeout=1),
+            base_url=stub.url,
+            retry_policy=RetryPolicy(max_attempts=1),
+        )
+        async with create_fastapi_client(
+            persistence_factory=JourneyPlannerPersistenceFactory(engine),
+            transportapi_client=transportapi_client,
+            server_timing=True,
+        ) as api_client:
+            first, second = [
+                await api_client.post("/graphql", json={"query": JOURNEY_PLAN}) for _ in range(2)
+            ]
+
+    first_cost = first.json()["extensions"]["cost"]
+    assert (first_cost["upstreamCalls"], first_cost["dbCalls"]) == (2, 7)
+    assert first_cost["upstreamMs"] > 0 and first_cost["dbMs"] > 0
+    assert first_cost["legs"] == [
+        {"origin": "LBG", "destination": "SAJ", "cache": "miss"},
+        {"origin": "SAJ", "destination": "ABW", "cache": "miss"},
+    ]
+    timing = server_timing(first)
+    assert timing["upstream"].endswith('desc="2 calls"')
+    assert timing["db"].endswith('desc="7 calls"')
+    assert timing["leg-1"] == 'desc="SAJ-ABW miss"'
+    assert set(timing) >= {"executor-wait", "total"}
+
+    second_cost = second.json()["extensions"]["cost"]
+    assert (second_cost["upstreamCalls"], second_cost["dbCalls"]) == (0, 2)
+    assert [leg["cache"] for leg in second_cost["legs"]] == ["leg_hit", "prefix_hit"]
+    assert server_timing(second)["leg-0"] == 'desc="LBG-SAJ leg_hit"'
+
+
+@pytest.mark.asyncio
+async def test_cost_is_only_reported_when_opted_in(create_fastapi_client):
+    async with create_fastapi_client() as api_client:
+        response = await api_client.post("/graphql", json={"query": JOURNEY_PLAN})
+
+    assert "server-timing" not in response.headers
+    assert "cost" not in response.json().get("extensions", {})
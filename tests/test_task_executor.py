@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from contilio.task_executor.pool import (
+    ACTIVE_WORKERS,
+    QUEUE_DEPTH,
+    TASK_RUN_SECONDS,
+    WORKERS,
+    InstrumentedThreadPoolExecutor,
+    PoolSizer,
+    PoolWindow,
+)
+
+
+def eventually(condition, timeout_secs=2.0):
+    deadline = time.monotonic() + timeout_secs
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_executor_exports_its_queue_and_threads():
+    executor = InstrumentedThreadPoolExecutor(max_workers=2, name="fixed")
+    release = threading.Event()
+
+    blocked = [executor.submit(release.wait) for _ in range(2)]
+    queued = executor.submit(lambda x: x * 2, 21)
+    eventually(lambda: ACTIVE_WORKERS.value(executor="fixed") == 2)
+    assert QUEUE_DEPTH.value(executor="fixed") == 1
+    assert WORKERS.value(executor="fixed") == 2
+
+    release.set()
+    assert [future.result() for future in blocked] == [True, True]
+    assert queued.result() == 42
+    with pytest.raises(ZeroDivisionError):
+        executor.submit(lambda: 1 / 0).result()
+
+    executor.shutdown()
+    assert QUEUE_DEPTH.value(executor="fixed") == 0
+    assert WORKERS.value(executor="fixed") == 0
+    assert TASK_RUN_SECONDS.value(executor="fixed").count == 4
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+
+
+def test_pool_sizer_weighs_queueing_against_run_times():
+    sizer = PoolSizer(min_workers=2, max_workers=16)
+
+    # Tasks queue for longer than they run, so the pool grows
+    assert sizer.resize(8, PoolWindow(tasks=10, wait_secs=0.5, run_secs=0.1, peak_active=8)) == 10
+    # Runs slowed down as threads were added, so it shrinks back
+    assert sizer.resize(10, PoolWindow(tasks=10, wait_secs=0.5, run_secs=0.3, peak_active=10)) == 8
+    # Neither queueing nor slower, but mostly idle
+    assert sizer.resize(8, PoolWindow(tasks=10, wait_secs=0, run_secs=0.1, peak_active=3)) == 7
+    assert sizer.resize(7, PoolWindow(tasks=10, wait_secs=0, run_secs=0.1, peak_active=7)) == 7
+    assert sizer.resize(2, PoolWindow(tasks=10, wait_secs=0, run_secs=0.1, peak_active=1)) == 2
+    assert sizer.resize(16, PoolWindow(tasks=10, wait_secs=9, run_secs=0.1, peak_active=16)) == 16
+    assert sizer.resize(7, PoolWindow()) == 7
+
+
+def test_pool_sizer_times_each_operation_against_its_own_baseline():
+    sizer = PoolSizer(min_workers=2, max_workers=16)
+    fast = PoolWindow(peak_active=8)
+    for _ in range(10):
+        fast.record("read_route", wait_secs=0, run_secs=0.001)
+    for _ in range(3):
+        assert sizer.resize(8, fast) == 8
+
+    # Slow writes come in, yet reads run as fast as ever
+    mixed = PoolWindow(peak_active=8)
+    for _ in range(10):
+        mixed.record("read_route", wait_secs=0, run_secs=0.001)
+        mixed.record("write_route", wait_secs=0, run_secs=0.02)
+    assert sizer.resize(8, mixed) == 8
+
+    # Both slow down threefold as threads contend
+    slow = PoolWindow(peak_active=8)
+    for _ in range(10):
+        slow.record("read_route", wait_secs=0, run_secs=0.003)
+        slow.record("write_route", wait_secs=0, run_secs=0.06)
+    assert sizer.resize(8, slow) == 6
+
+
+def test_pool_sizer_holds_while_runs_recover():
+    sizer = PoolSizer(min_workers=2, max_workers=16, run_smoothing=1)
+    for _ in range(3):
+        sizer.resize(8, PoolWindow(tasks=10, wait_secs=0, run_secs=1, peak_active=8))
+
+    # Queueing, but runs are still a third slower than usual, so neither grows nor shrinks
+    assert sizer.resize(8, PoolWindow(tasks=10, wait_secs=5, run_secs=1.3, peak_active=8)) == 8
+    assert sizer.resize(8, PoolWindow(tasks=10, wait_secs=5, run_secs=1, peak_active=8)) == 10
+
+
+def test_adaptive_executor_grows_when_queueing_and_shrinks_when_idle():
+    executor = InstrumentedThreadPoolExecutor(
+        max_workers=4, min_workers=1, adaptive=True, name="adaptive", adjust_interval_secs=0.02
+    )
+    assert executor.target_workers == 1
+
+    for future in [executor.submit(time.sleep, 0.005) for _ in range(40)]:
+        future.result()
+    assert executor.target_workers > 1
+
+    def trickle():
+        executor.submit(time.sleep, 0.005).result()
+        return executor.target_workers == 1
+
+    eventually(trickle)
+    eventually(lambda: executor.workers == 1)
+    executor.shutdown()
@@ -0,0 +1,75 @@
+import pytest
+from datetime import datetime, timedelta
+
+from contilio.domain.enums import UKTrainStationCode
+from contilio.jobs import TimetableSweeper, parse_legs
+from contilio.persistence.in_memory import InMemoryPersistenceFactory
+from contilio.utils.hasher import generate_hash
+
+now = (datetime.now() + timedelta(days=1)).replace(hour=6, minute=0, second=0, microsecond=0)
+
+
+def test_parse_legs():
+    assert parse_legs("LBG:SAJ, SAJ:ABW,") == [
+        (UKTrainStationCode.LBG, UKTrainStationCode.SAJ),
+        (UKTrainStationCode.SAJ, UKTrainStationCode.ABW),
+    ]
+    with pytest.raises(ValueError):
+        parse_legs("LBG-SAJ")
+
+
+@pytest.mark.asyncio
+async def test_sweep_pre_populates_departure_board(task_executor_pool, mock_transportapi_client):
+    persistence_factory = InMemoryPersistenceFactory()
+    sweeper = TimetableSweeper(
+        legs=parse_legs("LBG:SAJ"),
+        persistence_factory=persistence_factory,
+        transportapi_client=mock_transportapi_client,
+        task_executor=task_executor_pool,
+        horizon=timedelta(hours=1),
+        interval=timedelta(hours=1),
+    )
+
+    (coverage,) = await sweeper.sweep(now)
+
+    # The mock upstream has a departure 5 minutes after each time asked for
+    assert coverage.departures == coverage.new_departures == 10
+    assert coverage.largest_gap_in_minutes == 6
+    cached = persistence_factory.create().read_routes(
+        generate_hash([UKTrainStationCode.LBG, UKTrainStationCode.SAJ]),
+        now,
+        now + timedelta(hours=1),
+    )
+    assert [leg.origin_crs for leg in cached] == ["LBG"] * 10
+
+    mock_transportapi_client.get_train_route_plan.reset_mock()
+    (coverage,) = await sweeper.sweep(now + timedelta(minutes=30))
+
+    assert coverage.new_departures == 5
+    assert mock_transportapi_client.get_train_route_plan.call_count == 6
+
+
+@pytest.mark.asyncio
+async def test_sweep_resumes_after_page_cap(
+    task_executor_pool, mock_transportapi_client, monkeypatch
+):
+    monkeypatch.setattr("contilio.clients.transport_api.client.MAX_PAGES", 4)
+    sweeper = TimetableSweeper(
+        legs=parse_legs("LBG:SAJ"),
+        persistence_factory=InMemoryPersistenceFactory(),
+        transportapi_client=mock_transportapi_client,
+        task_executor=task_executor_pool,
+        horizon=timedelta(hours=1),
+        interval=timedelta(hours=1),
+    )
+
+    (coverage,) = await sweeper.sweep(now)
+
+    # Departures at 5, 11, 17 and 23 minutes, so the rest of the hour is still to sweep
+    assert coverage.departures == 4
+    assert coverage.swept_until == now + timedelta(minutes=24)
+
+    (coverage,) = await sweeper.sweep(now)
+
+    assert coverage.departures == 8
+    assert coverage.new_departures == 4
@@ -0,0 +1,145 @@
+import asyncio
+from typing import List, Sequence
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from contilio.task_executor.executor import make_awaitable
+from contilio.tracing import (
+    TRACER,
+    BatchSpanExporter,
+    JsonLinesSpanExporter,
+    OtlpHttpSpanExporter,
+    Span,
+    Tracer,
+    read_spans,
+)
+from contilio.tracing.collector import TraceCollector, create_collector_app
+
+
+class ListSpanExporter:
+    def __init__(self) -> None:
+        self.spans: List[Span] = []
+        self.shut_down = False
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self.spans.extend(spans)
+
+    def shutdown(self) -> None:
+        self.shut_down = True
+
+
+@pytest.fixture()
+def exporter():
+    exporter = ListSpanExporter()
+    TRACER.configure(exporter)
+    yield exporter
+    TRACER.configure(None)
+
+
+@pytest.mark.asyncio
+async def test_spans_nest_across_the_task_executor(exporter):
+    def read():
+        with TRACER.span("persistence.read_route"):
+            return 42
+
+    with TRACER.span("graphql.journeyPlan") as resolver_span:
+        assert await make_awaitable()(read) == 42
+        with pytest.raises(ValueError):
+            with TRACER.span("journey_plan.leg"):
+                raise ValueError("No route")
+
+    spans = {span.name: span for span in exporter.spans}
+    assert set(spans) == {
+        "graphql.journeyPlan",
+        "task_executor.queue",
+        "task_executor.run",
+        "persistence.read_route",
+        "journey_plan.leg",
+    }
+    assert {span.trace_id for span in exporter.spans} == {resolver_span.trace_id}
+    assert spans["task_executor.queue"].parent_span_id == resolver_span.span_id
+    assert spans["task_executor.run"].parent_span_id == resolver_span.span_id
+    assert spans["persistence.read_route"].parent_span_id == spans["task_executor.run"].span_id
+    assert spans["task_executor.queue"].end_time_ns <= spans["task_executor.run"].start_time_ns
+    assert spans["journey_plan.leg"].error == "ValueError: No route"
+
+
+def test_traces_left_out_by_sampling_leave_out_their_children():
+    exporter = ListSpanExporter()
+    tracer = Tracer(exporter, sample_ratio=0.5, sampler=iter([0.7, 0.2]).__next__)
+
+    for name in ("left_out", "kept"):
+        with tracer.span(name) as span:
+            span.set_attribute("sampled", name == "kept")
+            with tracer.span(f"{name}.child"):
+                pass
+
+    assert [(span.name, span.attributes) for span in exporter.spans] == [
+        ("kept.child", {}),
+        ("kept", {"sampled": True}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_journey_plan_is_traced_leg_by_leg(create_fastapi_client):
+    exporter = ListSpanExporter()
+    query = (
+        "{ journeyPlan(userInput: { routeCrsIds: [LBG, SAJ, ABW], "
+        'datetimeOfInterest: "2030-01-07 09:00" }) { arrivalTime } }'
+    )
+
+    async with create_fastapi_client(span_exporter=exporter) as api_client:
+        assert "errors" not in (await api_client.post("/graphql", json={"query": query})).json()
+
+    assert exporter.shut_down
+    (resolver_span,) = [span for span in exporter.spans if span.name == "graphql.journeyPlan"]
+    leg_spans = [span for span in exporter.spans if span.name == "journey_plan.leg"]
+    assert [
+        (span.attributes["origin"], span.attributes["destination"], span.attributes["cache"])
+        for span in leg_spans
+    ] == [("LBG", "SAJ", "miss"), ("SAJ", "ABW", "miss")]
+    assert {span.parent_span_id for span in leg_spans} == {resolver_span.span_id}
+    assert {span.trace_id for span in exporter.spans} == {resolver_span.trace_id}
+    assert {span.parent_span_id for span in exporter.spans if "task_executor" in span.name} <= {
+        span.span_id for span in leg_spans
+    }
+
+
+def test_spans_are_batched_to_a_json_lines_file(tmp_path):
+    path = str(tmp_path / "spans.jsonl")
+    tracer = Tracer(BatchSpanExporter(JsonLinesSpanExporter(path), schedule_delay_secs=0.01))
+
+    with tracer.span("graphql.journeyPlan", legs=2):
+        with tracer.span("transportapi.request", route="crs:LBG-crs:SAJ") as span:
+            span.set_attribute("outcome", "ok")
+    tracer.shutdown()
+
+    resolver_span, request_span = read_spans(path)
+    assert (resolver_span.name, resolver_span.attributes) == ("graphql.journeyPlan", {"legs": 2})
+    assert request_span.attributes == {"route": "crs:LBG-crs:SAJ", "outcome": "ok"}
+    assert request_span.parent_span_id == resolver_span.span_id
+    assert request_span.duration_secs >= 0
+
+
+@pytest.mark.asyncio
+async def test_spans_are_exported_to_the_collector_stand_in(tmp_path):
+    path = str(tmp_path / "spans.jsonl")
+    collector = TraceCollector(JsonLinesSpanExporter(path))
+
+    async with TestServer(create_collector_app(collector)) as server:
+        tracer = Tracer(
+            BatchSpanExporter(OtlpHttpSpanExporter(str(server.make_url("/")).rstrip("/")))
+        )
+        with tracer.span("graphql.journeyPlan"):
+            with tracer.span("task_executor.queue"):
+                pass
+        # Posts block, so the exporter is shut down off the loop the collector serves on
+        await asyncio.get_running_loop().run_in_executor(None, tracer.shutdown)
+
+    collector.exporter.shutdown()
+    assert collector.spans == 2
+    assert [span.name for span in read_spans(path)] == [
+        "graphql.journeyPlan",
+        "task_executor.queue",
+    ]
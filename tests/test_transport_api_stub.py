@@ -0,0 +1,84 @@
+import pytest
+from aiohttp import ClientResponseError
+from aiohttp.test_utils import TestServer
+from datetime import datetime, timedelta
+
+from contilio.clients.transport_api import AppCreds, RetryPolicy, TransportApiClient
+from contilio.clients.transport_api.client import AioHttpClient, TransportApiClientException
+from contilio.transport_api_stub import (
+    PUBLIC_JOURNEY_PATH,
+    StubProfile,
+    SyntheticTimetable,
+    TransportApiStub,
+    create_stub_app,
+)
+
+datetime_of_interest = datetime(2030, 1, 7, 9, 0)
+
+
+def transportapi_client(server) -> TransportApiClient:
+    return TransportApiClient(
+        app_creds=AppCreds(app_id="id", app_key="key"),
+        http_client=AioHttpClient(default_timeout=1),
+        base_url=str(server.make_url(PUBLIC_JOURNEY_PATH)),
+        retry_policy=RetryPolicy(max_attempts=1),
+    )
+
+
+def test_synthetic_timetable_is_deterministic_and_wraps_to_the_next_day():
+    leg = SyntheticTimetable(seed=1, unroutable_ratio=0).leg("LBG", "SAJ")
+    assert leg == SyntheticTimetable(seed=1, unroutable_ratio=0).leg("LBG", "SAJ")
+
+    (departure_at, arrival_at), (next_departure_at, _) = leg.departures_from(
+        datetime_of_interest, 2
+    )
+    assert (
+        timedelta(0)
+        <= departure_at - datetime_of_interest
+        < timedelta(minutes=leg.headway_in_minutes)
+    )
+    assert next_departure_at - departure_at == timedelta(minutes=leg.headway_in_minutes)
+    assert arrival_at - departure_at == timedelta(minutes=leg.duration_in_minutes)
+
+    ((first_departure_at, _),) = leg.departures_from(datetime(2030, 1, 7, 23, 59), 1)
+    assert first_departure_at.date() == datetime(2030, 1, 8).date()
+    assert SyntheticTimetable().leg("LBG", "LBG") is None
+
+
+@pytest.mark.asyncio
+async def test_client_answered_from_the_stub_timetable():
+    timetable = SyntheticTimetable(seed=1, unroutable_ratio=0)
+    stub = TransportApiStub(timetable, StubProfile())
+
+    async with TestServer(create_stub_app(stub)) as server:
+        route_plan = await transportapi_client(server).get_train_route_plan(
+            "LBG", "SAJ", datetime_of_interest
+        )
+
+    ((departure_at, arrival_at),) = timetable.leg("LBG", "SAJ").departures_from(
+        datetime_of_interest, 1
+    )
+    assert (route_plan.departure_at, route_plan.arrival_at) == (departure_at, arrival_at)
+
+
+@pytest.mark.asyncio
+async def test_stub_throttles_and_fails_as_per_its_profile():
+    throttled = TransportApiStub(SyntheticTimetable(), StubProfile(requests_per_minute=2))
+    async with TestServer(create_stub_app(throttled)) as server:
+        client = transportapi_client(server)
+        for _ in range(2):
+            try:
+                await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+            except TransportApiClientException:
+                pass
+        with pytest.raises(ClientResponseError) as e:
+            await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        assert e.value.status == 429
+
+    failing = TransportApiStub(SyntheticTimetable(), StubProfile(error_rate=1))
+    async with TestServer(create_stub_app(failing)) as server:
+        with pytest.raises(ClientResponseError) as e:
+            await transportapi_client(server).get_train_route_plan(
+                "LBG", "SAJ", datetime_of_interest
+            )
+        assert e.value.status == 503
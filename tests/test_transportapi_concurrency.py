@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from datetime import datetime
+
+from contilio.clients.transport_api import (
+    AdaptiveConcurrencyLimiter,
+    AppCreds,
+    TransportApiClient,
+    is_transient_error,
+)
+from contilio.clients.transport_api.client import AioHttpClient
+from contilio.clients.transport_api.concurrency import CONCURRENCY_LIMIT, LIMIT_DECREASES
+from tests.fault_injection import fault_injecting_transportapi
+
+datetime_of_interest = datetime(2030, 1, 7, 9, 0)
+
+
+def transportapi_client(url, concurrency_limiter) -> TransportApiClient:
+    return TransportApiClient(
+        app_creds=AppCreds(app_id="id", app_key="key"),
+        http_client=AioHttpClient(default_timeout=5),
+        base_url=url,
+        concurrency_limiter=concurrency_limiter,
+    )
+
+
+@pytest.mark.asyncio
+async def test_limit_backs_off_as_upstream_slows_down_under_load():
+    concurrency_limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=20, latency_slack_secs=0.01, is_drop=is_transient_error, name="backing-off"
+    )
+
+    async with fault_injecting_transportapi() as stub:
+        stub.delay_per_request_in_flight = 0.01
+        client = transportapi_client(stub.url, concurrency_limiter)
+        # Unloaded latencies first, for a baseline
+        for _ in range(20):
+            await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+
+        await asyncio.gather(
+            *[client.get_train_route_plan("LBG", "SAJ", datetime_of_interest) for _ in range(60)]
+        )
+
+    # Settles about where latency reaches twice the baseline, some 3 requests in flight
+    assert concurrency_limiter.limit < 10
+    assert LIMIT_DECREASES.value(client="backing-off") >= 1
+    assert CONCURRENCY_LIMIT.value(client="backing-off") == concurrency_limiter.limit
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_while_upstream_keeps_up():
+    concurrency_limiter = AdaptiveConcurrencyLimiter(initial_limit=4, name="growing")
+
+    async with fault_injecting_transportapi() as stub:
+        client = transportapi_client(stub.url, concurrency_limiter)
+        for _ in range(5):
+            await asyncio.gather(
+                *[
+                    client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+                    for _ in range(concurrency_limiter.limit)
+                ]
+            )
+
+    assert concurrency_limiter.limit > 4
+    assert concurrency_limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limit_holds_through_the_long_tail_of_latencies():
+    concurrency_limiter = AdaptiveConcurrencyLimiter(initial_limit=8, name="long-tailed")
+
+    async with fault_injecting_transportapi() as stub:
+        # Every tenth request is slower than the fastest by far more than the tolerance
+        stub.delays = [0.2 if i % 10 == 5 else 0 for i in range(100)]
+        client = transportapi_client(stub.url, concurrency_limiter)
+        await asyncio.gather(
+            *[client.get_train_route_plan("LBG", "SAJ", datetime_of_interest) for _ in range(100)]
+        )
+
+    # Kept growing, as upstream kept up bar the odd slow request
+    assert concurrency_limiter.limit > 16
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+from datetime import datetime
+
+from contilio.clients.transport_api import (
+    AppCreds,
+    HedgePolicy,
+    RequestHedger,
+    TransportApiClient,
+)
+from contilio.clients.transport_api.client import AioHttpClient
+from contilio.clients.transport_api.hedging import HEDGE_WINS, HEDGEABLE_REQUESTS, HEDGES
+from tests.fault_injection import fault_injecting_transportapi
+
+datetime_of_interest = datetime(2030, 1, 7, 9, 0)
+
+
+@pytest.mark.asyncio
+async def test_slow_request_is_hedged_within_budget():
+    hedger = RequestHedger(HedgePolicy(budget_ratio=0.05, min_samples=20), name="hedged")
+
+    async with fault_injecting_transportapi() as stub:
+        client = TransportApiClient(
+            app_creds=AppCreds(app_id="id", app_key="key"),
+            http_client=AioHttpClient(default_timeout=5),
+            base_url=stub.url,
+            hedger=hedger,
+        )
+        for _ in range(20):
+            await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+
+        # The first is stuck in the tail, its hedge answers straight away
+        stub.delays = [2, 0]
+        started_at = time.monotonic()
+        await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        assert time.monotonic() - started_at < 1
+        # The original lost, yet counts among the latencies for as long as it was waited on
+        await asyncio.sleep(0.05)
+        assert len(hedger._latencies) == 22
+
+        # The budget of 5% is spent, so the next slow one is waited on
+        stub.delays = [0.2]
+        await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+
+    assert HEDGEABLE_REQUESTS.value(client="hedged") == 22
+    assert HEDGES.value(client="hedged") == 1
+    assert HEDGE_WINS.value(client="hedged") == 1
+
+
+@pytest.mark.asyncio
+async def test_quiet_spell_saves_up_no_burst_of_hedges():
+    hedger = RequestHedger(HedgePolicy(budget_ratio=0.05, budget_window=100), name="quiet")
+
+    async def fast():
+        return "fast"
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return "slow"
+
+    for _ in range(1000):
+        await hedger.run(fast)
+
+    # Upstream slows down all at once: every request is past the p95, yet only 5 are hedged
+    await asyncio.gather(*[hedger.run(slow) for _ in range(100)])
+    assert HEDGES.value(client="quiet") == 5
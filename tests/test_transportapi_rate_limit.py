@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from contilio.clients.transport_api import (
+    Priority,
+    RateLimitExceededError,
+    TokenBucketRateLimiter,
+)
+from contilio.clients.transport_api.rate_limit import QUEUE_WAITS, REJECTIONS
+
+
+@pytest.mark.asyncio
+async def test_interactive_requests_overtake_queued_background_requests():
+    rate_limiter = TokenBucketRateLimiter(calls_per_minute=600, burst=1, name="prioritised")
+    let_through = []
+
+    async def request(name, priority):
+        await rate_limiter.acquire(priority)
+        let_through.append(name)
+
+    # Spends the burst, so that everything after has to queue
+    await rate_limiter.acquire(Priority.INTERACTIVE)
+    sweeps = [asyncio.ensure_future(request(f"sweep-{i}", Priority.SWEEP)) for i in range(2)]
+    prefetch = asyncio.ensure_future(request("prefetch", Priority.PREFETCH))
+    await asyncio.sleep(0)
+    interactive = asyncio.ensure_future(request("interactive", Priority.INTERACTIVE))
+
+    await asyncio.gather(*sweeps, prefetch, interactive)
+
+    assert let_through == ["interactive", "prefetch", "sweep-0", "sweep-1"]
+    assert QUEUE_WAITS.value(client="prioritised", priority="sweep") == 2
+
+
+@pytest.mark.asyncio
+async def test_request_expected_to_wait_past_its_deadline_is_rejected_straight_away():
+    rate_limiter = TokenBucketRateLimiter(calls_per_minute=60, burst=1, name="rejecting")
+    await rate_limiter.acquire()
+
+    with pytest.raises(RateLimitExceededError):
+        await asyncio.wait_for(rate_limiter.acquire(deadline_secs=0.5), timeout=0.1)
+
+    assert REJECTIONS.value(client="rejecting", priority="interactive") == 1
@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+
+from aiohttp import ClientResponseError
+
+from contilio.clients.transport_api import (
+    AppCreds,
+    CircuitBreaker,
+    RetryPolicy,
+    TransportApiClient,
+    TransportApiUnavailableError,
+)
+from contilio.clients.transport_api.client import AioHttpClient
+from contilio.clients.transport_api.resilience import CIRCUIT_STATE, RETRIES, CircuitState
+from tests.fault_injection import fault_injecting_transportapi
+
+datetime_of_interest = datetime(2030, 1, 7, 9, 0)
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def transportapi_client(url, circuit_breaker, max_attempts=3) -> TransportApiClient:
+    return TransportApiClient(
+        app_creds=AppCreds(app_id="id", app_key="key"),
+        http_client=AioHttpClient(default_timeout=1),
+        base_url=url,
+        retry_policy=RetryPolicy(max_attempts=max_attempts, base_delay_secs=0.001),
+        circuit_breaker=circuit_breaker,
+    )
+
+
+@pytest.mark.asyncio
+async def test_transient_errors_are_retried():
+    async with fault_injecting_transportapi() as stub:
+        stub.faults = [503, 500]
+        client = transportapi_client(stub.url, CircuitBreaker(name="retried"))
+
+        route_plan = await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+
+        assert route_plan.departure_at == datetime_of_interest + timedelta(minutes=5)
+        assert stub.requests == 3
+        assert RETRIES.value(client="retried") == 2
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_fails_fast_then_probes():
+    clock = FakeClock()
+    circuit_breaker = CircuitBreaker(
+        name="probed", failure_threshold=2, reset_timeout_secs=30, clock=clock
+    )
+
+    async with fault_injecting_transportapi() as stub:
+        stub.faults = [500, 500, 500]
+        client = transportapi_client(stub.url, circuit_breaker, max_attempts=1)
+
+        for _ in range(2):
+            with pytest.raises(ClientResponseError):
+                await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        assert circuit_breaker.state is CircuitState.OPEN
+        assert CIRCUIT_STATE.value(client="probed") == CircuitState.OPEN.value
+
+        with pytest.raises(TransportApiUnavailableError):
+            await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        assert stub.requests == 2
+
+        clock.now += 30
+        with pytest.raises(ClientResponseError):
+            await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        assert circuit_breaker.state is CircuitState.OPEN
+
+        clock.now += 30
+        await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        assert circuit_breaker.state is CircuitState.CLOSED
+        assert stub.requests == 4
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_lets_another_request_probe():
+    clock = FakeClock()
+    circuit_breaker = CircuitBreaker(
+        name="cancelled", failure_threshold=1, reset_timeout_secs=30, clock=clock
+    )
+
+    async with fault_injecting_transportapi() as stub:
+        stub.faults = [500]
+        client = transportapi_client(stub.url, circuit_breaker, max_attempts=1)
+
+        with pytest.raises(ClientResponseError):
+            await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        assert circuit_breaker.state is CircuitState.OPEN
+
+        clock.now += 30
+        stub.delays = [5]
+        probe = asyncio.ensure_future(
+            client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        )
+        await asyncio.sleep(0.1)
+        assert circuit_breaker.state is CircuitState.HALF_OPEN
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+        await client.get_train_route_plan("LBG", "SAJ", datetime_of_interest)
+        assert circuit_breaker.state is CircuitState.CLOSED